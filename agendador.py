@@ -0,0 +1,158 @@
+"""
+Agendador residente: roda conciliação, relatório, liquidação e extrato mensal no mesmo processo.
+
+Sessões HTTP, tokens do Inter e caches ficam em memória entre as execuções, então nenhum ciclo
+paga de novo imports, leitura de certificados e abertura de conexões.
+
+Uso (na pasta dos scripts):
+    python agendador.py
+"""
+import os
+import signal
+import threading
+from datetime import datetime, timedelta
+from dotenv import load_dotenv
+import conciliacao
+import extrato_mensal
+import liquidacao_despesas
+from http_cliente import fechar_sessoes
+from paralelo import registrar_erro
+
+load_dotenv()
+
+INTERVALO_MAXIMO_ESPERA = 30  # Segundos entre verificações da agenda, no máximo
+
+
+def _horario(variavel, padrao):
+    horas, minutos = os.getenv(variavel, padrao).split(":")
+    return int(horas), int(minutos)
+
+
+def a_cada(minutos):
+    """Agenda de intervalo fixo; a primeira execução é logo ao iniciar"""
+    def proxima(ultima, agora):
+        return agora if ultima is None else ultima + timedelta(minutes=minutos)
+    return proxima
+
+
+def diariamente(hora, minuto):
+    def proxima(ultima, agora):
+        referencia = ultima or agora
+        horario = referencia.replace(hour=hora, minute=minuto, second=0, microsecond=0)
+        return horario if horario > referencia else horario + timedelta(days=1)
+    return proxima
+
+
+def mensalmente(dia, hora, minuto):
+    def proxima(ultima, agora):
+        referencia = ultima or agora
+        horario = referencia.replace(day=dia, hour=hora, minute=minuto, second=0, microsecond=0)
+        if horario <= referencia:
+            horario = (horario.replace(day=28) + timedelta(days=4)).replace(day=dia)
+        return horario
+    return proxima
+
+
+def tarefas_padrao():
+    """Agenda recomendada no README; horários configuráveis pelo .env dos scripts"""
+    return [
+        {
+            'nome': 'conciliacao',
+            'trava': 'conciliacao',
+            'agenda': a_cada(int(os.getenv('AGENDA_CONCILIACAO_MINUTOS', 30))),
+            'executar': lambda: conciliacao.main(manter_conexoes=True),
+        },
+        {
+            # Mesma trava da conciliação rápida: as duas nunca enviam o OFX ao mesmo tempo
+            'nome': 'conciliacao --enviar-email',
+            'trava': 'conciliacao',
+            'agenda': diariamente(*_horario('AGENDA_EMAIL_HORARIO', '18:00')),
+            'executar': lambda: conciliacao.main(enviar_email=True, manter_conexoes=True),
+        },
+        {
+            'nome': 'liquidacao_despesas',
+            'trava': 'liquidacao_despesas',
+            'agenda': diariamente(*_horario('AGENDA_LIQUIDACAO_HORARIO', '09:00')),
+            'executar': lambda: liquidacao_despesas.main(manter_conexoes=True),
+        },
+        {
+            # No início do mês baixa o extrato do mês que fechou
+            'nome': 'extrato_mensal',
+            'trava': 'extrato_mensal',
+            'agenda': mensalmente(min(28, int(os.getenv('AGENDA_EXTRATO_DIA', 1))), *_horario('AGENDA_EXTRATO_HORARIO', '06:00')),
+            'executar': lambda: extrato_mensal.main(opcao='2', manter_conexoes=True),
+        },
+    ]
+
+
+class Agendador:
+    def __init__(self, tarefas):
+        self.tarefas = tarefas
+        self.parar = threading.Event()
+        self._travas = {tarefa['trava']: threading.Lock() for tarefa in tarefas}
+        self._threads = []
+        agora = datetime.now()
+        for tarefa in tarefas:
+            tarefa['proxima_execucao'] = tarefa['agenda'](None, agora)
+
+    def _rodar(self, tarefa, trava):
+        inicio = datetime.now()
+        try:
+            print(f"\n🕒 [{inicio:%d/%m %H:%M}] Iniciando {tarefa['nome']}")
+            tarefa['executar']()
+            print(f"🕒 {tarefa['nome']} terminou em {(datetime.now() - inicio).total_seconds():.0f}s")
+        except Exception as e:
+            print(f"❌ Erro na tarefa {tarefa['nome']}: {str(e)}")
+            registrar_erro(f"agendador/{tarefa['nome']}", e)
+        finally:
+            trava.release()
+
+    def _disparar_vencidas(self, agora):
+        # A tarefa vencida há mais tempo tem a preferência pela trava
+        for tarefa in sorted(self.tarefas, key=lambda t: t['proxima_execucao']):
+            if tarefa['proxima_execucao'] > agora:
+                continue
+            trava = self._travas[tarefa['trava']]
+            # Se a execução anterior ainda não acabou, a tarefa espera; execuções perdidas viram uma só
+            if not trava.acquire(blocking=False):
+                continue
+            tarefa['proxima_execucao'] = tarefa['agenda'](tarefa['proxima_execucao'], agora)
+            while tarefa['proxima_execucao'] <= agora:
+                tarefa['proxima_execucao'] = tarefa['agenda'](tarefa['proxima_execucao'], agora)
+            thread = threading.Thread(target=self._rodar, args=(tarefa, trava), name=tarefa['nome'])
+            thread.start()
+            self._threads.append(thread)
+        self._threads = [thread for thread in self._threads if thread.is_alive()]
+
+    def executar(self):
+        """Laço principal; volta quando `parar` é sinalizado e as tarefas em andamento terminam"""
+        for tarefa in self.tarefas:
+            print(f"📅 {tarefa['nome']}: próxima execução em {tarefa['proxima_execucao']:%d/%m %H:%M}")
+        while not self.parar.is_set():
+            agora = datetime.now()
+            self._disparar_vencidas(agora)
+            proxima = min(tarefa['proxima_execucao'] for tarefa in self.tarefas)
+            self.parar.wait(min(INTERVALO_MAXIMO_ESPERA, max(1, (proxima - datetime.now()).total_seconds())))
+
+        if self._threads:
+            print(f"⏳ Aguardando {len(self._threads)} tarefa(s) em andamento terminar...")
+        for thread in self._threads:
+            thread.join()
+        fechar_sessoes()
+        print("👋 Agendador encerrado")
+
+    def encerrar(self, *_):
+        if not self.parar.is_set():
+            print("\n🛑 Encerrando: nenhuma tarefa nova será iniciada")
+        self.parar.set()
+
+
+def main():
+    agendador = Agendador(tarefas_padrao())
+    signal.signal(signal.SIGINT, agendador.encerrar)
+    signal.signal(signal.SIGTERM, agendador.encerrar)
+    agendador.executar()
+
+
+if __name__ == "__main__":
+    main()
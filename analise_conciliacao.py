@@ -0,0 +1,232 @@
+from datetime import datetime
+from itertools import chain, repeat
+
+try:
+    import numpy as np
+except ImportError:  # Sem numpy a análise roda no laço em Python puro (mesmo resultado, mais lenta)
+    np = None
+
+LADOS = (
+    # (campo do valor, campo da data explícita, campo da descrição)
+    ("valor_banco", "data_banco", "descricao_banco"),
+    ("valor_software", "data_software", "descricao_software"),
+)
+
+LIMITE_EXATO = 2 ** 53  # Somas em float64 de centavos inteiros são exatas até aqui
+LINHAS_POR_PARTE = 20_000  # Itens analisados juntos em cada bloco vetorizado
+
+
+def para_centavos(valor):
+    """Converte '1234,56' / '1234.56' / 1234.56 em centavos inteiros (123456)"""
+    if isinstance(valor, str):
+        valor = valor.replace(",", ".")
+    return round(float(valor or 0) * 100)
+
+
+def _data_reportavel(data, hoje):
+    # Só entra no relatório se for até o dia atual (ou se a data não puder ser convertida)
+    try:
+        return datetime.strptime(data, "%m/%d/%Y").date() <= hoje
+    except (TypeError, ValueError):
+        return True
+
+
+def _centavos_do_texto(valores):
+    """
+    Centavos de uma coluna de valores ('1234,56', '1234.56'): a vírgula é trocada uma única vez no texto
+    da coluna inteira e a conversão sai num só np.array; o arredondamento é o mesmo de para_centavos.
+    Vazio, None ou texto que não é número dá TypeError/ValueError.
+    """
+    texto = "\n".join(valores).replace(",", ".")  # TypeError com None ou número
+    numeros = np.array(texto.split("\n"), dtype=np.float64)  # ValueError com vazio ou texto
+    if not np.isfinite(numeros).all():
+        raise ValueError("coluna com nan ou infinito")
+    return np.rint(numeros * 100)
+
+
+def _centavos_em_lote(valores):
+    """Converte uma coluna de valores ('1234,56', '1234.56', None, '') em centavos int64; vazios valem 0"""
+    try:
+        centavos = _centavos_do_texto(valores)
+    except (TypeError, ValueError):
+        # Algum vazio, None, número ou outro formato: converte um a um (inválidos continuam dando erro)
+        centavos = np.fromiter((para_centavos(v) if v else 0 for v in valores), dtype=np.float64,
+                               count=len(valores))
+    if len(centavos) and np.abs(centavos).sum() >= LIMITE_EXATO:
+        raise OverflowError("Valores grandes demais para a soma exata em centavos")
+    return centavos.astype(np.int64)
+
+
+def _codigos(valores):
+    """Código inteiro denso de cada valor + a lista de valores distintos (na ordem em que aparecem)"""
+    distintos = list(dict.fromkeys(valores))
+    codigo = {valor: i for i, valor in enumerate(distintos)}
+    return np.fromiter(map(codigo.__getitem__, valores), dtype=np.int64, count=len(valores)), distintos
+
+
+def _partes_do_lote(lote, linhas_por_parte=LINHAS_POR_PARTE):
+    """Agrupa condomínios pequenos na mesma parte; as colunas de cada parte cabem no cache do processador"""
+    parte, linhas = {}, 0
+    for condominio, itens in lote.items():
+        if parte and linhas + len(itens) > linhas_por_parte:
+            yield parte
+            parte, linhas = {}, 0
+        parte[condominio] = itens
+        linhas += len(itens)
+    if parte:
+        yield parte
+
+
+def _analisar_vetorizado(lote):
+    condominios = list(lote)
+    quantidades = [len(itens) for itens in lote.values()]
+    itens = list(chain.from_iterable(lote.values()))
+    indice_condominio = np.repeat(np.arange(len(condominios), dtype=np.int64), quantidades)
+    datas_gerais = list(map(dict.get, itens, repeat("data")))
+
+    # Colunas de cada lado, uma linha por item: valor (0 quando ausente) e data do lado
+    colunas = []
+    for campo_valor, campo_data, _ in LADOS:
+        valores = list(map(dict.get, itens, repeat(campo_valor), repeat("0")))
+        explicitas = list(map(dict.get, itens, repeat(campo_data)))
+        # Pega data (de preferência a data explícita, senão a geral)
+        if any(explicitas):
+            datas = [explicita or geral for explicita, geral in zip(explicitas, datas_gerais)]
+        else:
+            datas = datas_gerais
+        colunas.append((valores, _centavos_em_lote(valores), datas))
+
+    if colunas[0][2] is colunas[1][2]:
+        codigos, datas_unicas = _codigos(datas_gerais)
+        codigos_lados = (codigos, codigos)
+    else:
+        codigos, datas_unicas = _codigos(colunas[0][2] + colunas[1][2])
+        codigos_lados = (codigos[:len(itens)], codigos[len(itens):])
+
+    # Soma por (condomínio, data) de cada lado com um único bincount; itens sem valor somam 0
+    quantidade_datas = len(datas_unicas)
+    quantidade_grupos = len(condominios) * quantidade_datas
+    grupos, somas, totais = [], [], []
+    for lado, (_, centavos, _) in enumerate(colunas):
+        grupo = indice_condominio * quantidade_datas + codigos_lados[lado]
+        grupos.append(grupo)
+        somas.append(np.bincount(grupo, weights=centavos, minlength=quantidade_grupos))
+        totais.append(np.bincount(indice_condominio, weights=centavos, minlength=len(condominios)))
+
+    hoje = datetime.today().date()
+    reportaveis = {}
+    divergentes = []
+    for grupo in np.flatnonzero(somas[0] != somas[1]).tolist():
+        data = datas_unicas[grupo % quantidade_datas]
+        if data not in reportaveis:
+            reportaveis[data] = _data_reportavel(data, hoje)
+        if reportaveis[data]:
+            divergentes.append(grupo)
+
+    # Detalhes só são montados para os grupos com diferença (e só itens com valor naquele lado)
+    detalhes = {grupo: ([], []) for grupo in divergentes}
+    if divergentes:
+        alvo = np.zeros(quantidade_grupos, dtype=bool)
+        alvo[divergentes] = True
+        for lado, (valores, centavos, _) in enumerate(colunas):
+            campo_valor, _, campo_descricao = LADOS[lado]
+            linhas = np.flatnonzero(alvo[grupos[lado]])
+            for linha, grupo, valor in zip(linhas.tolist(), grupos[lado][linhas].tolist(), centavos[linhas].tolist()):
+                item = itens[linha]
+                if item.get(campo_valor):
+                    detalhes[grupo][lado].append({
+                        'valor': valor / 100,
+                        'descricao': item.get(campo_descricao)
+                    })
+
+    diferencas = [[] for _ in condominios]
+    for grupo in sorted(divergentes, key=lambda g: (g // quantidade_datas, str(datas_unicas[g % quantidade_datas]))):
+        diferencas[grupo // quantidade_datas].append({
+            'data': datas_unicas[grupo % quantidade_datas],
+            'valor_banco': round(somas[0][grupo]) / 100,
+            'valor_software': round(somas[1][grupo]) / 100,
+            'detalhes_banco': detalhes[grupo][0],
+            'detalhes_software': detalhes[grupo][1],
+        })
+
+    return {
+        condominio: {
+            'conciliado': not diferencas[i],
+            'diferencas': diferencas[i],
+            'total_banco': round(totais[0][i]) / 100,
+            'total_software': round(totais[1][i]) / 100,
+        }
+        for i, condominio in enumerate(condominios)
+    }
+
+
+def _centavos_do_item(valor):
+    # Texto é o caso comum: sem a chamada a para_centavos (números e inválidos continuam passando por ela)
+    if type(valor) is str:
+        return round(float(valor.replace(",", ".")) * 100)
+    return para_centavos(valor)
+
+
+def _analisar_um(itens, hoje):
+    # Por lado: soma em centavos e itens de cada data (os detalhes só são montados nas datas divergentes)
+    lados = [(campo_valor, campo_data, {}, {}) for campo_valor, campo_data, _ in LADOS]
+    for item in itens:
+        geral = item.get("data")
+        for campo_valor, campo_data, totais, itens_por_data in lados:
+            valor = item.get(campo_valor)
+            if not valor:
+                continue
+            data = item.get(campo_data) or geral
+            totais[data] = totais.get(data, 0) + _centavos_do_item(valor)
+            if data in itens_por_data:
+                itens_por_data[data].append(item)
+            else:
+                itens_por_data[data] = [item]
+
+    (_, _, totais_banco, itens_banco), (_, _, totais_software, itens_software) = lados
+    diferencas = []
+    for data in sorted(totais_banco.keys() | totais_software.keys(), key=str):
+        banco, software = totais_banco.get(data, 0), totais_software.get(data, 0)
+        if banco != software and _data_reportavel(data, hoje):
+            detalhes = [
+                [{'valor': _centavos_do_item(item[campo_valor]) / 100, 'descricao': item.get(campo_descricao)}
+                 for item in itens_por_data.get(data, ())]
+                for itens_por_data, (campo_valor, _, campo_descricao) in zip((itens_banco, itens_software), LADOS)
+            ]
+            diferencas.append({
+                'data': data,
+                'valor_banco': banco / 100,
+                'valor_software': software / 100,
+                'detalhes_banco': detalhes[0],
+                'detalhes_software': detalhes[1],
+            })
+
+    return {
+        'conciliado': not diferencas,
+        'diferencas': diferencas,
+        'total_banco': sum(totais_banco.values()) / 100,
+        'total_software': sum(totais_software.values()) / 100,
+    }
+
+
+def analisar_conciliacoes(lote):
+    """
+    Analisa as conciliações de vários condomínios de uma vez, em centavos inteiros.
+
+    Com numpy, todos os itens do lote viram colunas (condomínio, data, centavos) e as somas por
+    data saem de um único bincount por lado; sem numpy, roda item a item. Em ambos os casos as
+    somas são exatas, sem erro de arredondamento de float.
+
+    Args:
+        lote (dict): {condominio: itens retornados por get_conciliacao_atual}
+
+    Returns:
+        dict: {condominio: {'conciliado', 'diferencas', 'total_banco', 'total_software'}}
+    """
+    if np is not None:
+        analises = {}
+        for parte in _partes_do_lote(lote):
+            analises.update(_analisar_vetorizado(parte))
+        return analises
+    hoje = datetime.today().date()
+    return {condominio: _analisar_um(itens, hoje) for condominio, itens in lote.items()}
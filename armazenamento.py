@@ -0,0 +1,308 @@
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from arquivos import caminho_cache
+
+ARQUIVO_BANCO = 'transacoes.db'
+ENDPOINT_EXTRATO = '/banking/v2/extrato/completo'  # Endpoint cujas respostas ficam na tabela transacoes
+
+_local = threading.local()
+
+_ESQUEMA = """
+CREATE TABLE IF NOT EXISTS transacoes (
+    condominio      TEXT    NOT NULL,
+    id_transacao    TEXT    NOT NULL,
+    data_transacao  TEXT    NOT NULL,
+    valor_centavos  INTEGER NOT NULL,
+    tipo_operacao   TEXT,
+    tipo_transacao  TEXT,
+    ordem           INTEGER NOT NULL,
+    dados           TEXT    NOT NULL,
+    PRIMARY KEY (condominio, id_transacao)
+);
+CREATE INDEX IF NOT EXISTS idx_transacoes_data ON transacoes (condominio, data_transacao, ordem);
+CREATE INDEX IF NOT EXISTS idx_transacoes_valor ON transacoes (condominio, valor_centavos);
+
+-- Janela recém-baixada, antes de entrar em transacoes (por conexão)
+CREATE TEMP TABLE IF NOT EXISTS transacoes_novas (
+    condominio      TEXT    NOT NULL,
+    id_transacao    TEXT    NOT NULL,
+    data_transacao  TEXT    NOT NULL,
+    valor_centavos  INTEGER NOT NULL,
+    tipo_operacao   TEXT,
+    tipo_transacao  TEXT,
+    ordem           INTEGER NOT NULL,
+    dados           TEXT    NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS cursores (
+    condominio  TEXT NOT NULL,
+    mes         TEXT NOT NULL,
+    cursor      TEXT NOT NULL,
+    PRIMARY KEY (condominio, mes)
+);
+
+CREATE TABLE IF NOT EXISTS digests (
+    condominio  TEXT NOT NULL,
+    mes         TEXT NOT NULL,
+    digest      TEXT NOT NULL,
+    PRIMARY KEY (condominio, mes)
+);
+
+CREATE TABLE IF NOT EXISTS extratos_baixados (
+    condominio  TEXT NOT NULL,
+    endpoint    TEXT NOT NULL,
+    data_inicio TEXT NOT NULL,
+    data_fim    TEXT NOT NULL,
+    baixado_em  REAL NOT NULL,
+    PRIMARY KEY (condominio, endpoint, data_inicio, data_fim)
+);
+
+CREATE TABLE IF NOT EXISTS liquidacoes (
+    id_parcela      TEXT    NOT NULL PRIMARY KEY,
+    condominio      TEXT    NOT NULL,
+    id_despesa      TEXT,
+    status          TEXT    NOT NULL,
+    data_pagamento  TEXT,
+    valor_centavos  INTEGER,
+    mensagem        TEXT,
+    registrado_em   TEXT    NOT NULL DEFAULT (datetime('now', 'localtime'))
+);
+"""
+
+# Situações do diário de liquidações
+LIQUIDACAO_ENVIANDO = 'enviando'  # PUT em andamento (ou interrompido sem resposta)
+LIQUIDACAO_LIQUIDADA = 'liquidada'
+LIQUIDACAO_RECUSADA = 'recusada'  # A Superlógica respondeu e não liquidou: pode tentar de novo
+
+
+def conexao():
+    """Conexão SQLite da thread atual (WAL, para vários scripts lendo e escrevendo ao mesmo tempo)"""
+    con = getattr(_local, 'conexao', None)
+    if con is None:
+        con = sqlite3.connect(caminho_cache(ARQUIVO_BANCO), timeout=30)
+        con.execute("PRAGMA journal_mode=WAL")
+        con.execute("PRAGMA synchronous=NORMAL")
+        con.executescript(_ESQUEMA)
+        _local.conexao = con
+    return con
+
+
+def _id_transacao(transacao, repeticoes):
+    id_transacao = transacao.get('idTransacao')
+    if id_transacao:
+        return str(id_transacao)
+    # Sem id do banco: o conteúdo da transação (que inclui a data) mais quantas idênticas já vieram
+    # no download, para duas tarifas iguais no mesmo dia continuarem sendo duas linhas
+    conteudo = hashlib.sha1(json.dumps(transacao, sort_keys=True).encode()).hexdigest()
+    repeticoes[conteudo] = repeticoes.get(conteudo, 0) + 1
+    return f'h:{conteudo}:{repeticoes[conteudo]}'
+
+
+def _centavos(valor):
+    return int(round(float(valor or 0) * 100))
+
+
+def _substituir_janela(con, condominio, transacoes, data_inicio, data_fim):
+    # Gerador: as transações podem vir de um iterável grande sem ficar todas na memória
+    repeticoes = {}
+    linhas = (
+        (
+            condominio,
+            _id_transacao(t, repeticoes),
+            t.get('dataTransacao', ''),
+            _centavos(t.get('valor')),
+            t.get('tipoOperacao'),
+            t.get('tipoTransacao'),
+            ordem,
+            json.dumps(t, ensure_ascii=False),
+        )
+        for ordem, t in enumerate(transacoes)
+    )
+    con.execute("DELETE FROM transacoes_novas")
+    con.executemany("INSERT INTO transacoes_novas VALUES (?, ?, ?, ?, ?, ?, ?, ?)", linhas)
+    con.execute(
+        "DELETE FROM transacoes WHERE condominio = ? AND data_transacao BETWEEN ? AND ?",
+        (condominio, data_inicio, data_fim),
+    )
+    # Com a janela apagada, um id que ainda está no livro é de uma transação de fora dela. No mesmo mês
+    # é a mesma transação com a data alterada pelo banco: a linha antiga sai e fica só a nova
+    con.execute(
+        "DELETE FROM transacoes WHERE condominio = ? AND id_transacao IN ("
+        "SELECT n.id_transacao FROM transacoes_novas n JOIN transacoes t "
+        "ON t.condominio = n.condominio AND t.id_transacao = n.id_transacao "
+        "AND substr(t.data_transacao, 1, 7) = substr(n.data_transacao, 1, 7))",
+        (condominio,),
+    )
+    # Em outro mês o banco reaproveitou o id: a linha antiga fica e a nova entra com a data no id
+    colisoes = con.execute(
+        "SELECT DISTINCT n.id_transacao, n.data_transacao, t.data_transacao FROM transacoes_novas n "
+        "JOIN transacoes t ON t.condominio = n.condominio AND t.id_transacao = n.id_transacao"
+    ).fetchall()
+    for id_transacao, data_nova, data_antiga in colisoes:
+        print(f"⚠️  {condominio}: a transação {id_transacao} de {data_nova} tem o mesmo id de uma de "
+              f"{data_antiga}; as duas foram mantidas")
+    if colisoes:
+        con.execute(
+            "UPDATE transacoes_novas SET id_transacao = id_transacao || '@' || data_transacao "
+            "WHERE id_transacao IN (SELECT id_transacao FROM transacoes WHERE condominio = ?)",
+            (condominio,),
+        )
+    # OR REPLACE só junta ids repetidos dentro do próprio download
+    con.execute("INSERT OR REPLACE INTO transacoes SELECT * FROM transacoes_novas")
+    con.execute("DELETE FROM transacoes_novas")
+    _registrar_download(con, condominio, data_inicio, data_fim)
+
+
+def _registrar_download(con, condominio, data_inicio, data_fim):
+    # Downloads contidos no novo ficam obsoletos: o que eles tinham acabou de ser substituído
+    con.execute(
+        "DELETE FROM extratos_baixados WHERE condominio = ? AND endpoint = ? AND data_inicio >= ? AND data_fim <= ?",
+        (condominio, ENDPOINT_EXTRATO, data_inicio, data_fim),
+    )
+    con.execute(
+        "INSERT INTO extratos_baixados VALUES (?, ?, ?, ?, ?)",
+        (condominio, ENDPOINT_EXTRATO, data_inicio, data_fim, time.time()),
+    )
+
+
+def downloads_cobrindo(condominio, data_inicio, data_fim, endpoint=ENDPOINT_EXTRATO):
+    """Quando (epoch) foram feitos os downloads do endpoint que cobrem todo o período, do mais recente ao mais antigo"""
+    cursor = conexao().execute(
+        "SELECT baixado_em FROM extratos_baixados WHERE condominio = ? AND endpoint = ? "
+        "AND data_inicio <= ? AND data_fim >= ? ORDER BY baixado_em DESC",
+        (condominio, endpoint, data_inicio, data_fim),
+    )
+    return [baixado_em for (baixado_em,) in cursor]
+
+
+def gravar_transacoes(condominio, transacoes, data_inicio, data_fim):
+    """
+    Substitui, numa única transação do banco, tudo o que o condomínio tinha entre data_inicio e data_fim
+    pelas transações recém-baixadas. A ordem em que o banco devolveu é guardada em `ordem` e o
+    download fica registrado em extratos_baixados (cache de respostas do extrato).
+    """
+    con = conexao()
+    with con:
+        _substituir_janela(con, condominio, transacoes, data_inicio, data_fim)
+
+
+def iterar_transacoes_do_periodo(condominio, data_inicio, data_fim):
+    """
+    Gera as transações do condomínio no período, em ordem de data (e na ordem do banco dentro do dia),
+    lendo do cursor do SQLite sem montar a lista inteira. Usa a conexão da thread que consumir o gerador.
+    """
+    cursor = conexao().execute(
+        "SELECT dados FROM transacoes WHERE condominio = ? AND data_transacao BETWEEN ? AND ? "
+        "ORDER BY data_transacao, ordem",
+        (condominio, data_inicio, data_fim),
+    )
+    for (dados,) in cursor:
+        yield json.loads(dados)
+
+
+def transacoes_do_periodo(condominio, data_inicio, data_fim):
+    """Transações do condomínio no período, em ordem de data (e na ordem do banco dentro do dia)"""
+    return list(iterar_transacoes_do_periodo(condominio, data_inicio, data_fim))
+
+
+def ler_cursor(condominio, mes):
+    linha = conexao().execute(
+        "SELECT cursor FROM cursores WHERE condominio = ? AND mes = ?", (condominio, mes)
+    ).fetchone()
+    return linha[0] if linha else None
+
+
+def sincronizar(condominio, mes, transacoes, data_inicio, data_fim):
+    """Grava a janela baixada e avança o cursor do mês de uma vez só"""
+    con = conexao()
+    with con:
+        _substituir_janela(con, condominio, transacoes, data_inicio, data_fim)
+        con.execute(
+            "INSERT OR REPLACE INTO cursores VALUES (?, ?, ?)", (condominio, mes, data_fim)
+        )
+
+
+def ler_digest(condominio, mes):
+    """Digest do extrato que foi conciliado por último no mês (None se nunca conciliou)"""
+    linha = conexao().execute(
+        "SELECT digest FROM digests WHERE condominio = ? AND mes = ?", (condominio, mes)
+    ).fetchone()
+    return linha[0] if linha else None
+
+
+def gravar_digest(condominio, mes, digest):
+    con = conexao()
+    with con:
+        con.execute("INSERT OR REPLACE INTO digests VALUES (?, ?, ?)", (condominio, mes, digest))
+
+
+def liquidacoes_registradas(ids_parcela):
+    """
+    Parcelas do diário que não devem ser enviadas de novo: já liquidadas ou com um envio
+    sem resposta conhecida (reenviar poderia liquidar duas vezes).
+    """
+    ids_parcela = [str(i) for i in ids_parcela]
+    registradas = set()
+    con = conexao()
+    # Consulta em blocos para não passar do limite de parâmetros do SQLite
+    for inicio in range(0, len(ids_parcela), 500):
+        bloco = ids_parcela[inicio:inicio + 500]
+        cursor = con.execute(
+            f"SELECT id_parcela FROM liquidacoes WHERE status != ? AND id_parcela IN ({','.join('?' * len(bloco))})",
+            [LIQUIDACAO_RECUSADA, *bloco],
+        )
+        registradas.update(id_parcela for (id_parcela,) in cursor)
+    return registradas
+
+
+def registrar_liquidacao(id_parcela, condominio, id_despesa, status, data_pagamento=None, valor_centavos=None,
+                         mensagem=None):
+    """Grava (ou atualiza) a situação da liquidação da parcela no diário"""
+    con = conexao()
+    with con:
+        con.execute(
+            "INSERT OR REPLACE INTO liquidacoes "
+            "(id_parcela, condominio, id_despesa, status, data_pagamento, valor_centavos, mensagem) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (str(id_parcela), condominio, id_despesa, status, data_pagamento, valor_centavos, mensagem),
+        )
+
+
+def liquidacoes_enviando(condominio=None, desde=None):
+    """
+    Parcelas com envio sem resposta ('enviando'), da mais antiga à mais recente; opcionalmente só as
+    de um condomínio e/ou registradas a partir de `desde` ('AAAA-MM-DD').
+    """
+    condicoes, parametros = ["status = ?"], [LIQUIDACAO_ENVIANDO]
+    if condominio is not None:
+        condicoes.append("condominio = ?")
+        parametros.append(condominio)
+    if desde is not None:
+        condicoes.append("registrado_em >= ?")
+        parametros.append(desde)
+    cursor = conexao().execute(
+        "SELECT id_parcela, condominio, id_despesa, data_pagamento, valor_centavos, registrado_em "
+        f"FROM liquidacoes WHERE {' AND '.join(condicoes)} ORDER BY registrado_em",
+        parametros,
+    )
+    colunas = [coluna[0] for coluna in cursor.description]
+    return [dict(zip(colunas, linha)) for linha in cursor]
+
+
+def limpar_liquidacoes_enviando(ids_parcela=None):
+    """
+    Tira do diário as parcelas 'enviando' (todas, ou só as de ids_parcela) para que voltem a ser
+    enviadas. Retorna quantas foram removidas.
+    """
+    con = conexao()
+    with con:
+        if not ids_parcela:
+            return con.execute("DELETE FROM liquidacoes WHERE status = ?", (LIQUIDACAO_ENVIANDO,)).rowcount
+        ids_parcela = [str(i) for i in ids_parcela]
+        return con.execute(
+            f"DELETE FROM liquidacoes WHERE status = ? AND id_parcela IN ({','.join('?' * len(ids_parcela))})",
+            [LIQUIDACAO_ENVIANDO, *ids_parcela],
+        ).rowcount
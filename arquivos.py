@@ -0,0 +1,62 @@
+import json
+import os
+import time
+from contextlib import contextmanager
+
+CACHE_DIR = os.getenv('CACHE_DIR', '.cache')
+
+
+def caminho_cache(nome_arquivo):
+    """Caminho de um arquivo de estado local dentro de CACHE_DIR (criado se não existir)"""
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    return os.path.join(CACHE_DIR, nome_arquivo)
+
+
+@contextmanager
+def trava_arquivo(caminho, timeout=30, validade=60):
+    """
+    Trava entre processos baseada em arquivo <caminho>.lock (funciona em Windows e Linux).
+    Travas mais velhas que `validade` segundos são consideradas abandonadas e removidas.
+    """
+    caminho_lock = caminho + '.lock'
+    limite = time.monotonic() + timeout
+    while True:
+        try:
+            fd = os.open(caminho_lock, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+            break
+        except FileExistsError:
+            try:
+                if time.time() - os.path.getmtime(caminho_lock) > validade:
+                    os.remove(caminho_lock)
+                    continue
+            except FileNotFoundError:
+                continue
+            if time.monotonic() > limite:
+                raise TimeoutError(f"Não foi possível travar {caminho}")
+            time.sleep(0.05)
+    try:
+        os.write(fd, str(os.getpid()).encode())
+        os.close(fd)
+        yield
+    finally:
+        try:
+            os.remove(caminho_lock)
+        except FileNotFoundError:
+            pass
+
+
+def ler_json(caminho, padrao=None):
+    """Lê um arquivo JSON, retornando `padrao` se ele não existir ou estiver corrompido"""
+    try:
+        with open(caminho, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (json.JSONDecodeError, FileNotFoundError):
+        return padrao
+
+
+def gravar_json_atomico(caminho, dados):
+    """Grava JSON num arquivo temporário e troca de uma vez, para nunca deixar o arquivo pela metade"""
+    temporario = f'{caminho}.{os.getpid()}.tmp'
+    with open(temporario, "w", encoding="utf-8") as f:
+        json.dump(dados, f, ensure_ascii=False, indent=2)
+    os.replace(temporario, caminho)
@@ -0,0 +1,94 @@
+"""
+Benchmark de analisar_conciliacao: versão em centavos inteiros (Python puro e numpy) contra a
+versão antiga em float. Também confere que as duas versões em centavos dão o mesmo resultado.
+
+Uso (na pasta dos scripts):
+    python benchmarks/bench_analise_conciliacao.py [itens_por_condominio] [condominios]
+"""
+import os
+import sys
+import time
+from collections import defaultdict
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from analise_conciliacao import _analisar_um  # noqa: E402
+from conciliacao import analisar_conciliacao, analisar_conciliacoes  # noqa: E402
+from dados_sinteticos import gerar_itens_conciliacao  # noqa: E402
+
+
+def analisar_conciliacao_float(itens):
+    """Implementação anterior (float + defaultdict), mantida só como referência de desempenho"""
+    totais_software = defaultdict(float)
+    totais_banco = defaultdict(float)
+    detalhes_por_data = defaultdict(lambda: {'software': [], 'banco': []})
+    for item in itens:
+        valor_banco = float(item.get("valor_banco", "0").replace(",", "."))
+        valor_software = float(item.get("valor_software", "0").replace(",", "."))
+        data_banco = item.get("data_banco") or item.get("data")
+        data_software = item.get("data_software") or item.get("data")
+        if item.get("valor_banco"):
+            totais_banco[data_banco] += valor_banco
+            detalhes_por_data[data_banco]['banco'].append({'valor': valor_banco, 'descricao': item.get("descricao_banco")})
+        if item.get("valor_software"):
+            totais_software[data_software] += valor_software
+            detalhes_por_data[data_software]['software'].append({'valor': valor_software, 'descricao': item.get("descricao_software")})
+    diferencas = []
+    for data in sorted(set(totais_banco.keys()) | set(totais_software.keys())):
+        valor_banco = round(totais_banco.get(data, 0.0), 2)
+        valor_software = round(totais_software.get(data, 0.0), 2)
+        try:
+            data_dt = datetime.strptime(data, "%m/%d/%Y")
+        except ValueError:
+            data_dt = None
+        if abs(valor_banco - valor_software) > 0.001 and (data_dt is None or data_dt.date() <= datetime.today().date()):
+            diferencas.append({'data': data, 'valor_banco': valor_banco, 'valor_software': valor_software,
+                               'detalhes_banco': detalhes_por_data[data]['banco'],
+                               'detalhes_software': detalhes_por_data[data]['software']})
+    return {'conciliado': not diferencas, 'diferencas': diferencas,
+            'total_banco': round(sum(totais_banco.values()), 2),
+            'total_software': round(sum(totais_software.values()), 2)}
+
+
+def cronometrar(funcao, repeticoes=3):
+    melhor = float("inf")
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        funcao()
+        melhor = min(melhor, time.perf_counter() - inicio)
+    return melhor
+
+
+def main():
+    por_condominio = int(sys.argv[1]) if len(sys.argv) > 1 else 20_000
+    quantidade_condominios = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    lote = {
+        f"Condomínio {i} (C{i})": gerar_itens_conciliacao(por_condominio, semente=i)
+        for i in range(quantidade_condominios)
+    }
+    total_itens = por_condominio * quantidade_condominios
+    print(f"{quantidade_condominios} condomínios x {por_condominio:,} itens = {total_itens:,} itens")
+
+    hoje = datetime.today().date()
+    tempo_float = cronometrar(lambda: [analisar_conciliacao_float(itens) for itens in lote.values()])
+    tempo_puro = cronometrar(lambda: [_analisar_um(itens, hoje) for itens in lote.values()])
+    tempo_um_a_um = cronometrar(lambda: [analisar_conciliacao(itens) for itens in lote.values()])
+    tempo_lote = cronometrar(lambda: analisar_conciliacoes(lote))
+
+    print(f"{'float (anterior)':<32} {tempo_float:8.3f}s")
+    print(f"{'centavos, Python puro':<32} {tempo_puro:8.3f}s  {tempo_float / tempo_puro:5.1f}x")
+    print(f"{'centavos, numpy por condomínio':<32} {tempo_um_a_um:8.3f}s  {tempo_float / tempo_um_a_um:5.1f}x")
+    print(f"{'centavos, numpy em lote':<32} {tempo_lote:8.3f}s  {tempo_float / tempo_lote:5.1f}x")
+
+    # Mesmo resultado em Python puro e em numpy; mesmas datas divergentes que a versão em float
+    analises = analisar_conciliacoes(lote)
+    for condominio, itens in lote.items():
+        assert analises[condominio] == _analisar_um(itens, hoje)
+    for itens in list(lote.values())[:3]:
+        assert [d['data'] for d in analisar_conciliacao(itens)['diferencas']] == \
+            [d['data'] for d in analisar_conciliacao_float(itens)['diferencas']]
+
+
+if __name__ == "__main__":
+    main()
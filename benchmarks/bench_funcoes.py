@@ -0,0 +1,121 @@
+"""
+Microbenchmarks das funções puras (sem rede nem disco) dos três scripts, em 1k, 10k e 100k registros.
+
+Para cada função e tamanho informa o tempo por chamada (melhor de algumas repetições) e a
+memória da chamada (pico alocado durante a chamada e blocos que continuam alocados no resultado,
+medidos com tracemalloc numa passada à parte). Os resultados podem ser gravados em JSON e
+comparados com uma execução anterior.
+
+Uso (na pasta dos scripts):
+    python benchmarks/bench_funcoes.py --salvar antes.json
+    python benchmarks/bench_funcoes.py --comparar antes.json
+    python benchmarks/bench_funcoes.py --tamanhos 1000 10000 --funcoes build_ofx conciliar_despesas
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from conciliacao import analisar_conciliacao, exibir_resultado_conciliacao, obter_ultima_transacao  # noqa: E402
+from extrato_mensal import build_ofx  # noqa: E402
+from liquidacao_despesas import (  # noqa: E402
+    conciliar_despesas, localizar_pagamentos_concessionarias, tratar_despesas_superlogica,
+)
+from dados_sinteticos import (  # noqa: E402
+    gerar_despesas_e_pagamentos, gerar_despesas_superlogica, gerar_itens_conciliacao, gerar_transacoes_inter,
+)
+
+TAMANHOS_PADRAO = (1_000, 10_000, 100_000)
+TEMPO_MINIMO = 0.2  # Segundos de medição por função e tamanho (chamadas rápidas repetem mais)
+
+
+def _preparar_exibir(quantidade):
+    # Um mês com muitos dias divergentes, para exibir_resultado_conciliacao ter o que formatar
+    analise = analisar_conciliacao(gerar_itens_conciliacao(quantidade, dias_divergentes=28))
+    analise['diferencas'] = (analise['diferencas'] * (quantidade // max(1, len(analise['diferencas'])) + 1))[:quantidade]
+    return (analise,)
+
+
+def _preparar_localizar(quantidade):
+    transacoes = [dict(t, dataEntrada=t['dataTransacao']) for t in gerar_transacoes_inter(quantidade)]
+    return ({'transacoes': transacoes},)
+
+
+# nome -> (prepara os argumentos para N registros, função medida)
+CASOS = {
+    'build_ofx': (lambda n: (gerar_transacoes_inter(n), 1234.56, "2025-05-01", "2025-05-31"), build_ofx),
+    'analisar_conciliacao': (lambda n: (gerar_itens_conciliacao(n),), analisar_conciliacao),
+    'exibir_resultado_conciliacao': (_preparar_exibir, exibir_resultado_conciliacao),
+    'obter_ultima_transacao': (lambda n: (gerar_transacoes_inter(n),), obter_ultima_transacao),
+    'tratar_despesas_superlogica': (lambda n: (gerar_despesas_superlogica(n),), tratar_despesas_superlogica),
+    'localizar_pagamentos_concessionarias': (_preparar_localizar, localizar_pagamentos_concessionarias),
+    'conciliar_despesas': (lambda n: gerar_despesas_e_pagamentos(n), conciliar_despesas),
+}
+
+
+def medir(funcao, argumentos):
+    """(segundos por chamada, pico alocado em bytes, blocos de memória retidos pelo resultado)"""
+    funcao(*argumentos)  # Aquece caches (regras compiladas, lru_cache de datas)
+
+    chamadas, inicio = 0, time.perf_counter()
+    melhor = float('inf')
+    while chamadas < 3 or time.perf_counter() - inicio < TEMPO_MINIMO:
+        antes = time.perf_counter()
+        funcao(*argumentos)
+        melhor = min(melhor, time.perf_counter() - antes)
+        chamadas += 1
+
+    # Alocações numa passada separada: o tracemalloc deixa as chamadas bem mais lentas
+    tracemalloc.start()
+    antes = tracemalloc.take_snapshot()
+    tracemalloc.reset_peak()
+    resultado = funcao(*argumentos)
+    _, pico = tracemalloc.get_traced_memory()
+    depois = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    blocos = sum(max(0, diferenca.count_diff) for diferenca in depois.compare_to(antes, 'lineno'))
+    del resultado
+    return melhor, pico, blocos
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--tamanhos', type=int, nargs='+', default=list(TAMANHOS_PADRAO))
+    parser.add_argument('--funcoes', nargs='+', choices=list(CASOS), default=list(CASOS))
+    parser.add_argument('--salvar', help='Grava os resultados em JSON')
+    parser.add_argument('--comparar', help='JSON de uma execução anterior; mostra a variação de tempo e memória')
+    args = parser.parse_args()
+
+    anteriores = {}
+    if args.comparar:
+        with open(args.comparar, encoding='utf-8') as arquivo:
+            anteriores = {(r['funcao'], r['tamanho']): r for r in json.load(arquivo)['resultados']}
+
+    print(f"{'função':<38} {'registros':>9} {'por chamada':>12} {'pico':>10} {'blocos':>9}")
+    resultados = []
+    for nome in args.funcoes:
+        preparar, funcao = CASOS[nome]
+        for tamanho in args.tamanhos:
+            segundos, pico, blocos = medir(funcao, preparar(tamanho))
+            linha = f"{nome:<38} {tamanho:>9,} {segundos * 1000:9.3f} ms {pico / 1024 / 1024:6.2f} MiB {blocos:>9,}"
+            anterior = anteriores.get((nome, tamanho))
+            if anterior:
+                linha += (f"   tempo {segundos / anterior['segundos']:5.2f}x"
+                          f"  pico {pico / max(1, anterior['pico_bytes']):5.2f}x")
+            print(linha)
+            resultados.append({'funcao': nome, 'tamanho': tamanho, 'segundos': segundos,
+                               'pico_bytes': pico, 'blocos': blocos})
+
+    if args.salvar:
+        with open(args.salvar, 'w', encoding='utf-8') as arquivo:
+            json.dump({'python': platform.python_version(), 'resultados': resultados}, arquivo, indent=2)
+        print(f"💾 Resultados gravados em {args.salvar}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,52 @@
+"""
+Benchmark da leitura incremental do PDF do Banco Inter: pico de memória do PDF em base64 lido em
+blocos (como response.iter_content) contra json.loads + b64decode.
+
+Uso (na pasta dos scripts):
+    python benchmarks/bench_json_incremental.py [tamanho_pdf_mib]
+"""
+import base64
+import io
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from json_incremental import TAMANHO_BLOCO, gravar_base64  # noqa: E402
+
+
+def em_blocos(dados):
+    for inicio in range(0, len(dados), TAMANHO_BLOCO):
+        yield dados[inicio:inicio + TAMANHO_BLOCO]
+
+
+def medir(descricao, funcao):
+    tracemalloc.start()
+    inicio = time.perf_counter()
+    funcao()
+    duracao = time.perf_counter() - inicio
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{descricao:<36} {duracao:8.3f}s  pico {pico / 1024 / 1024:8.2f} MiB")
+
+
+def main():
+    tamanho_pdf = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    conteudo = os.urandom(tamanho_pdf * 1024 * 1024)
+    corpo_pdf = json.dumps({"pdf": base64.b64encode(conteudo).decode()}).encode()
+    print(f"PDF de {tamanho_pdf} MiB ({len(corpo_pdf) / 1024 / 1024:.1f} MiB em base64)")
+
+    # A resposta em si fica fora da medição: com stream=True ela nunca estaria inteira na memória
+    with open(os.devnull, "wb") as destino:
+        medir("PDF: json.loads + b64decode",
+              lambda: destino.write(base64.b64decode(json.loads(b"".join(em_blocos(corpo_pdf)))["pdf"])))
+        medir("PDF: gravar_base64", lambda: gravar_base64(em_blocos(corpo_pdf), "pdf", destino))
+
+    assert gravar_base64(em_blocos(corpo_pdf), "pdf", io.BytesIO()) == len(conteudo)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+"""
+Benchmark do gerador de OFX.
+
+Uso (na pasta dos scripts):
+    python benchmarks/bench_ofx.py [quantidade]
+"""
+import io
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from extrato_mensal import build_ofx, escrever_ofx  # noqa: E402
+from dados_sinteticos import gerar_transacoes_inter  # noqa: E402
+
+
+def medir(descricao, quantidade, funcao):
+    inicio = time.perf_counter()
+    funcao()
+    duracao = time.perf_counter() - inicio
+
+    # Memória medida numa segunda passada, para o tracemalloc não distorcer o tempo
+    tracemalloc.start()
+    funcao()
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{descricao:<32} {duracao:8.3f}s  {quantidade / duracao:>12,.0f} transações/s  pico {pico / 1024 / 1024:8.2f} MiB")
+
+
+def main():
+    quantidade = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    transacoes = gerar_transacoes_inter(quantidade)
+    print(f"OFX com {quantidade:,} transações")
+
+    with open(os.devnull, "w", encoding="utf-8") as destino:
+        medir("escrever_ofx (streaming)", quantidade,
+              lambda: escrever_ofx(destino, transacoes, 1234.56, "2025-05-01", "2025-05-31"))
+    medir("build_ofx (string inteira)", quantidade,
+          lambda: build_ofx(transacoes, 1234.56, "2025-05-01", "2025-05-31"))
+
+    # Confere que as duas formas geram exatamente o mesmo documento
+    buffer = io.StringIO()
+    escrever_ofx(buffer, transacoes, 1234.56, "2025-05-01", "2025-05-31")
+    assert buffer.getvalue() == build_ofx(transacoes, 1234.56, "2025-05-01", "2025-05-31")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""
+Benchmark de conciliar_despesas: pareamento indexado por valor (listas ordenadas por data) contra a varredura antiga.
+Só o pareamento é medido; nenhuma liquidação é enviada.
+
+Uso (na pasta dos scripts):
+    python benchmarks/bench_pareamento.py [despesas]
+"""
+import os
+import sys
+import time
+from collections import Counter
+from datetime import timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import liquidacao_despesas  # noqa: E402
+from liquidacao_despesas import conciliar_despesas  # noqa: E402
+from pareamento import TOLERANCIA_DIAS, converter_data  # noqa: E402
+from dados_sinteticos import gerar_despesas_e_pagamentos  # noqa: E402
+
+
+def datas_compativeis(data_vencimento, data_pagamento, tolerancia_dias=TOLERANCIA_DIAS):
+    """Retorna True se o pagamento for >= vencimento e <= vencimento + tolerância (usada só pela varredura)"""
+    dt_venc = converter_data(data_vencimento)
+    dt_pag = converter_data(data_pagamento)
+    return dt_venc <= dt_pag <= (dt_venc + timedelta(days=tolerancia_dias))
+
+
+def conciliar_varredura(despesas, pagamentos):
+    """Implementação anterior (varre todos os pagamentos por despesa), mantida só como referência"""
+    liquidadas = []
+    for despesa in despesas:
+        valor = float(despesa['VL_VALOR_PDES'])
+        for conta, nome in (('2.2.1', 'CEMIG'), ('2.2.2', 'COPASA')):
+            if conta in despesa['ID_CONTA_CATEGORIA']:
+                for pagamento in pagamentos[nome]:
+                    if (abs(float(pagamento['valor']) - valor) < 0.01
+                            and datas_compativeis(despesa['DT_VENCIMENTO_PDES'], pagamento['dataEntrada'])):
+                        liquidadas.append(despesa['ID_DESPESA_DES'])
+                        break
+                break
+    return liquidadas
+
+
+def main():
+    quantidade = int(sys.argv[1]) if len(sys.argv) > 1 else 5_000
+    despesas, pagamentos = gerar_despesas_e_pagamentos(quantidade)
+    liquidacao_despesas.print = lambda *args, **kwargs: None
+
+    inicio = time.perf_counter()
+    anteriores = conciliar_varredura(despesas, pagamentos)
+    tempo_varredura = time.perf_counter() - inicio
+
+    liquidacao_despesas.converter_data.cache_clear()
+    inicio = time.perf_counter()
+    liquidadas = conciliar_despesas(despesas, pagamentos)
+    tempo_indexado = time.perf_counter() - inicio
+
+    print(f"{quantidade:,} despesas x {sum(map(len, pagamentos.values())):,} pagamentos")
+    print(f"{'varredura (anterior)':<24} {tempo_varredura:8.3f}s  {len(anteriores):,} liquidadas")
+    print(f"{'indexado por valor':<24} {tempo_indexado:8.3f}s  {len(liquidadas):,} liquidadas  "
+          f"{tempo_varredura / tempo_indexado:6.1f}x")
+
+    # Um a um: cada (concessionária, valor, data) não é usado mais vezes do que aparece no extrato
+    disponiveis = Counter((nome, float(p['valor']), p['dataEntrada']) for nome, lista in pagamentos.items() for p in lista)
+    usados = Counter((d['nome'], d['valor'], d['data_pagamento']) for d in liquidadas)
+    assert all(usados[chave] <= disponiveis[chave] for chave in usados)
+
+
+if __name__ == "__main__":
+    main()
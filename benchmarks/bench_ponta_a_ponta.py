@@ -0,0 +1,188 @@
+"""
+Benchmark ponta a ponta: roda os scripts de verdade contra servidores locais do Inter e da Superlógica.
+
+Cria N pastas de condomínio sintéticas (com .env e certificado autoassinado para o mTLS), sobe os
+servidores simulados (servidores_simulados.py) e executa cada script num processo separado, como
+no agendamento real. Para cada script informa o tempo total, as requisições por condomínio (por
+endpoint) e o pico de memória (RSS) do processo. Nenhuma API real é acessada.
+
+Uso (na pasta dos scripts; precisa do openssl no PATH):
+    python benchmarks/bench_ponta_a_ponta.py --condominios 20 --latencia-ms 80 --taxa-erro 0.02
+    python benchmarks/bench_ponta_a_ponta.py --scripts conciliacao conciliacao --saida resultado.json
+"""
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from collections import defaultdict
+
+PASTA_BENCHMARKS = os.path.dirname(os.path.abspath(__file__))
+PASTA_SCRIPTS = os.path.dirname(PASTA_BENCHMARKS)
+sys.path.insert(0, PASTA_BENCHMARKS)
+sys.path.insert(0, PASTA_SCRIPTS)
+
+from condominios import ARQUIVO_CERTIFICADO, ARQUIVO_CHAVE  # noqa: E402
+from servidores_simulados import (  # noqa: E402
+    ID_CONDOMINIO_BASE, ROTAS_INTER, ROTAS_SUPERLOGICA, Configuracao, client_id, iniciar_servidor,
+)
+
+# Como cada script é chamado; extrato_mensal pergunta o mês no terminal (2 = mês anterior, como no agendador)
+COMANDOS = {
+    'conciliacao': (['conciliacao.py'], None),
+    'liquidacao_despesas': (['liquidacao_despesas.py'], None),
+    'extrato_mensal': (['extrato_mensal.py'], '2\n'),
+}
+
+
+def gerar_certificado(caminho_cert, caminho_chave, nome, ip=False):
+    """Certificado RSA autoassinado (openssl), válido por 2 dias"""
+    extensao = 'subjectAltName=IP:127.0.0.1,DNS:localhost' if ip else 'basicConstraints=critical,CA:FALSE'
+    subprocess.run(
+        ['openssl', 'req', '-x509', '-newkey', 'rsa:2048', '-nodes', '-days', '2',
+         '-keyout', caminho_chave, '-out', caminho_cert, '-subj', f'/CN={nome}', '-addext', extensao],
+        check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+
+
+def preparar_ambiente(pasta, quantidade):
+    """
+    Monta pasta/CONDOMÍNIOS com `quantidade` condomínios e pasta/SCRIPTS (diretório de trabalho).
+
+    Returns:
+        (pasta SCRIPTS, certificado do servidor, chave do servidor, PEM com os certificados dos condomínios)
+    """
+    pasta_condominios = os.path.join(pasta, 'CONDOMÍNIOS')
+    pasta_scripts = os.path.join(pasta, 'SCRIPTS')
+    os.makedirs(pasta_scripts)
+
+    cert_servidor = os.path.join(pasta, 'servidor.crt')
+    chave_servidor = os.path.join(pasta, 'servidor.key')
+    gerar_certificado(cert_servidor, chave_servidor, 'localhost', ip=True)
+
+    certificados_clientes = os.path.join(pasta, 'clientes.pem')
+    with open(certificados_clientes, 'w') as todos:
+        for indice in range(quantidade):
+            nome = f"Condominio Bench {indice:04d} (CB{indice:04d})"
+            pasta_condominio = os.path.join(pasta_condominios, nome)
+            os.makedirs(pasta_condominio)
+            cert = os.path.join(pasta_condominio, ARQUIVO_CERTIFICADO)
+            gerar_certificado(cert, os.path.join(pasta_condominio, ARQUIVO_CHAVE), f'cb{indice:04d}')
+            with open(os.path.join(pasta_condominio, '.env'), 'w') as env:
+                env.write(f"ClientID={client_id(indice)}\nClientSecret=segredo-{indice}\n"
+                          f"idCondominio={ID_CONDOMINIO_BASE + indice}\n")
+            with open(cert) as pem:
+                todos.write(pem.read())
+    return pasta_scripts, cert_servidor, chave_servidor, certificados_clientes
+
+
+def executar_script(script, pasta_scripts, ambiente, log):
+    """Roda o script num processo novo; retorna (segundos, pico de RSS em MiB, código de saída)"""
+    argumentos, entrada = COMANDOS[script]
+    inicio = time.perf_counter()
+    processo = subprocess.Popen(
+        [sys.executable, os.path.join(PASTA_SCRIPTS, argumentos[0]), *argumentos[1:]],
+        cwd=pasta_scripts, env=ambiente, stdin=subprocess.PIPE, stdout=log, stderr=subprocess.STDOUT,
+    )
+    if entrada:
+        processo.stdin.write(entrada.encode())
+    processo.stdin.close()
+    # wait4 devolve o uso de recursos só deste processo (ru_maxrss em KiB no Linux)
+    _, status, uso = os.wait4(processo.pid, 0)
+    processo.returncode = os.waitstatus_to_exitcode(status)
+    return time.perf_counter() - inicio, uso.ru_maxrss / 1024, processo.returncode
+
+
+def resumir_contagem(contagem, quantidade):
+    por_endpoint = defaultdict(int)
+    for (endpoint, _), requisicoes in contagem.items():
+        por_endpoint[endpoint] += requisicoes
+    return {
+        'total': sum(por_endpoint.values()),
+        'por_condominio': sum(por_endpoint.values()) / quantidade,
+        'por_endpoint': {endpoint: requisicoes / quantidade for endpoint, requisicoes in sorted(por_endpoint.items())},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--condominios', type=int, default=10)
+    parser.add_argument('--transacoes', type=int, default=2000, help='Transações por condomínio por mês')
+    parser.add_argument('--despesas', type=int, default=40, help='Despesas pendentes por condomínio')
+    parser.add_argument('--latencia-ms', type=float, default=50.0, help='Latência média de cada resposta')
+    parser.add_argument('--taxa-erro', type=float, default=0.0, help='Fração de respostas 503 (com Retry-After)')
+    parser.add_argument('--scripts', nargs='+', choices=sorted(COMANDOS), default=list(COMANDOS),
+                        help='Scripts executados em sequência, com o mesmo .cache (repita para medir a segunda execução)')
+    parser.add_argument('--workers', type=int, help='MAX_WORKERS dos scripts')
+    parser.add_argument('--saida', help='Grava o resultado em JSON, para comparar execuções')
+    parser.add_argument('--manter-pasta', action='store_true', help='Não apaga a pasta temporária (logs e arquivos gerados)')
+    args = parser.parse_args()
+
+    pasta = tempfile.mkdtemp(prefix='bench_ponta_a_ponta_')
+    print(f"🏗️  Gerando {args.condominios} condomínio(s) com certificados em {pasta}...")
+    pasta_scripts, cert_servidor, chave_servidor, certificados_clientes = preparar_ambiente(pasta, args.condominios)
+
+    configuracao = Configuracao(transacoes=args.transacoes, despesas=args.despesas,
+                                latencia_ms=args.latencia_ms, taxa_erro=args.taxa_erro)
+    servidor_inter, url_inter = iniciar_servidor(ROTAS_INTER, configuracao, cert_servidor, chave_servidor,
+                                                 certificados_clientes)
+    servidor_superlogica, url_superlogica = iniciar_servidor(ROTAS_SUPERLOGICA, configuracao, cert_servidor,
+                                                             chave_servidor)
+
+    ambiente = dict(
+        os.environ,
+        INTER_URL_BASE=url_inter,
+        SUPERLOGICA_URL_BASE=url_superlogica,
+        REQUESTS_CA_BUNDLE=cert_servidor,  # Confia no certificado autoassinado dos servidores locais
+        CACHE_DIR=os.path.join(pasta_scripts, '.cache'),
+        APP_TOKEN='bench', ACCESS_TOKEN='bench',
+        EMAIL_REMETENTE='', EMAIL_SENHA='', EMAIL_DESTINATARIO='',
+        PYTHONUNBUFFERED='1',
+    )
+    if args.workers:
+        ambiente['MAX_WORKERS'] = str(args.workers)
+
+    print(f"{'script':<22} {'tempo':>8} {'req/cond':>9} {'erros':>6} {'pico RSS':>10}  saída")
+    resultados = []
+    try:
+        for ordem, script in enumerate(args.scripts):
+            configuracao.zerar_contagem()
+            caminho_log = os.path.join(pasta, f'{ordem:02d}_{script}.log')
+            with open(caminho_log, 'wb') as log:
+                duracao, pico_mib, codigo = executar_script(script, pasta_scripts, ambiente, log)
+            with configuracao.lock:
+                requisicoes = resumir_contagem(configuracao.contagem, args.condominios)
+                erros = sum(configuracao.erros.values())
+            print(f"{script:<22} {duracao:7.2f}s {requisicoes['por_condominio']:9.1f} {erros:6d} "
+                  f"{pico_mib:7.1f} MiB  {codigo}")
+            for endpoint, media in requisicoes['por_endpoint'].items():
+                print(f"    {endpoint:<40} {media:6.1f} req/condomínio")
+            if codigo != 0:
+                with open(caminho_log, encoding='utf-8', errors='replace') as log:
+                    print(''.join(log.readlines()[-15:]))
+            resultados.append({
+                'script': script, 'segundos': round(duracao, 3), 'pico_rss_mib': round(pico_mib, 1),
+                'codigo_saida': codigo, 'erros_simulados': erros, 'requisicoes': requisicoes,
+            })
+    finally:
+        servidor_inter.shutdown()
+        servidor_superlogica.shutdown()
+        if args.manter_pasta:
+            print(f"📁 Logs e arquivos em {pasta}")
+        else:
+            shutil.rmtree(pasta, ignore_errors=True)
+
+    if args.saida:
+        with open(args.saida, 'w', encoding='utf-8') as arquivo:
+            json.dump({
+                'parametros': {chave: valor for chave, valor in vars(args).items() if chave not in ('saida', 'manter_pasta')},
+                'resultados': resultados,
+            }, arquivo, ensure_ascii=False, indent=2)
+        print(f"💾 Resultado gravado em {args.saida}")
+
+
+if __name__ == '__main__':
+    main()
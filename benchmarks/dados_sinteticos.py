@@ -0,0 +1,131 @@
+"""Geradores de dados sintéticos no formato das APIs do Banco Inter e da Superlógica."""
+import random
+from datetime import date, timedelta
+
+TIPOS_TRANSACAO = ["PIX", "DEBITO_AUTOMATICO", "PAGAMENTO", "COMPRA_DEBITO", "OUTROS", "DARF", "TARIFA"]
+
+
+def gerar_transacoes_inter(quantidade, ano=2025, mes=5, semente=42):
+    """
+    Transações no formato do /banking/v2/extrato/completo, espalhadas pelos dias do mês.
+    O idTransacao leva o ano e o mês: como no banco, meses diferentes nunca repetem um id.
+    """
+    aleatorio = random.Random(semente)
+    inicio = date(ano, mes, 1)
+    transacoes = []
+    for i in range(quantidade):
+        tipo_transacao = aleatorio.choice(TIPOS_TRANSACAO)
+        dia = inicio + timedelta(days=aleatorio.randrange(28))
+        transacoes.append({
+            "idTransacao": f"{ano:04d}{mes:02d}{i:08d}",
+            "dataInclusao": f"{dia.isoformat()} 10:{i % 60:02d}:00",
+            "dataTransacao": dia.isoformat(),
+            "tipoTransacao": tipo_transacao,
+            "tipoOperacao": aleatorio.choice("CD"),
+            "valor": f"{aleatorio.randint(100, 5_000_00) / 100:.2f}",
+            "titulo": "DARF Numerado" if tipo_transacao == "DARF" else tipo_transacao.title(),
+            "descricao": f"CONDOMINIO TESTE {i % 97} CEMIG COPASA"[: 12 + i % 20],
+            "detalhes": {"endToEndId": f"E{aleatorio.randrange(10**8):08d}202505202050bX9x5sS8lY9"},
+        })
+    return transacoes
+
+
+def gerar_itens_conciliacao(quantidade, ano=2025, mes=5, dias_divergentes=2, semente=7):
+    """
+    Itens no formato do /v2/condor/conciliacao da Superlógica (valores com vírgula, datas MM/DD/AAAA).
+    Só `dias_divergentes` dias do mês têm diferença entre banco e software, como numa conciliação real.
+    """
+    aleatorio = random.Random(semente)
+    divergentes = set(aleatorio.sample(range(1, 29), dias_divergentes))
+    itens = []
+    for i in range(quantidade):
+        dia = aleatorio.randrange(1, 29)
+        data = f"{mes:02d}/{dia:02d}/{ano}"
+        centavos = aleatorio.randint(100, 5_000_00)
+        valor_software = centavos
+        if dia in divergentes and aleatorio.random() < 0.05:
+            valor_software += aleatorio.choice((-1, 1)) * aleatorio.randint(1, 10_000)
+        item = {
+            "data": data,
+            "valor_banco": f"{centavos // 100},{centavos % 100:02d}",
+            "descricao_banco": f"Pix recebido {i}",
+            "valor_software": f"{valor_software // 100}.{valor_software % 100:02d}",
+            "descricao_software": f"Recebimento unidade {i % 300}",
+        }
+        itens.append(item)
+    return itens
+
+
+def gerar_despesas_superlogica(quantidade, ano=2025, mes=5, id_condominio='1', semente=11):
+    """
+    Despesas pendentes como vêm do /v2/condor/despesas/index da Superlógica (antes de
+    tratar_despesas_superlogica): chaves minúsculas, vencimento MM/DD/AAAA e apropriações por conta.
+    Os ids de despesa e parcela levam o ano e o mês, para não repetir entre meses.
+    """
+    aleatorio = random.Random(semente)
+    inicio = date(ano, mes, 1)
+    base_ids = (ano * 100 + mes) * 10**9 + semente * 100_000
+    despesas = []
+    for i in range(quantidade):
+        concessionaria, conta = aleatorio.choice((('CEMIG', '2.2.1'), ('COPASA', '2.2.2')))
+        vencimento = inicio + timedelta(days=aleatorio.randrange(25))
+        centavos = aleatorio.randint(50_00, 3_000_00)
+        # Parte das despesas também tem apropriação numa conta fora das regras
+        apropriacao = [{'st_conta_cont': conta}]
+        if aleatorio.random() < 0.5:
+            apropriacao.insert(0, {'st_conta_cont': '1.1.1'})
+        despesas.append({
+            'id_despesa_des': str(base_ids + i),
+            'id_parcela_pdes': str(base_ids + 50_000 + i),
+            'id_contato_con': str(aleatorio.randrange(1, 50)),
+            'st_nome_con': concessionaria,
+            'dt_vencimento_pdes': vencimento.strftime('%m/%d/%Y'),
+            'id_forma_pag': '0',
+            'id_contabanco_cb': str(id_condominio),
+            'vl_valor_pdes': f"{centavos / 100:.2f}",
+            'id_condominio_cond': str(id_condominio),
+            'apropriacao': apropriacao,
+        })
+    return despesas
+
+
+def gerar_despesas_e_pagamentos(quantidade, ano=2025, mes=5, semente=11):
+    """
+    Despesas pendentes no formato de tratar_despesas_superlogica e os débitos CEMIG/COPASA do extrato
+    (formato de localizar_pagamentos_concessionarias). Cerca de 80% das despesas têm um pagamento
+    correspondente entre o vencimento e vencimento + 5 dias; os demais débitos são de outras contas.
+    """
+    aleatorio = random.Random(semente)
+    inicio = date(ano, mes, 1)
+    despesas = []
+    pagamentos = {'CEMIG': [], 'COPASA': []}
+    for i in range(quantidade):
+        concessionaria, conta = aleatorio.choice((('CEMIG', '2.2.1'), ('COPASA', '2.2.2')))
+        vencimento = inicio + timedelta(days=aleatorio.randrange(25))
+        centavos = aleatorio.randint(50_00, 3_000_00)
+        despesas.append({
+            'ID_DESPESA_DES': str(10_000 + i),
+            'ID_PARCELA_PDES': str(20_000 + i),
+            'ID_CONTATO_CON': str(aleatorio.randrange(1, 50)),
+            'ST_NOME_CON': concessionaria,
+            'DT_VENCIMENTO_PDES': vencimento.strftime('%m/%d/%Y'),
+            'ID_FORMA_PAG': '0',
+            'ID_CONTABANCO_CB': '1',
+            'VL_VALOR_PDES': f"{centavos / 100:.2f}",
+            'ID_CONDOMINIO_COND': '1',
+            'ID_CONTA_CATEGORIA': ['1.1.1', conta],
+        })
+        if aleatorio.random() < 0.8:
+            pago_em = vencimento + timedelta(days=aleatorio.randrange(6))
+        else:
+            pago_em, centavos = inicio + timedelta(days=aleatorio.randrange(28)), aleatorio.randint(50_00, 3_000_00)
+        pagamentos[concessionaria].append({
+            'dataEntrada': pago_em.isoformat(),
+            'tipoOperacao': 'D',
+            'valor': f"{centavos / 100:.2f}",
+            'titulo': 'Pagamento',
+            'descricao': f"{concessionaria} CONTA {i}",
+        })
+    for lista in pagamentos.values():
+        aleatorio.shuffle(lista)
+    return despesas, pagamentos
@@ -0,0 +1,275 @@
+"""
+Servidores HTTPS locais que imitam as APIs do Banco Inter e da Superlógica, para o benchmark ponta a ponta.
+
+Os dados de cada condomínio são sintéticos e determinísticos (mesma semente, mesmas respostas). O
+condomínio é identificado pelo token (Inter) ou pelo idCondominio/idConta (Superlógica), então
+cada servidor sabe quantas requisições recebeu por endpoint e por condomínio.
+"""
+import base64
+import json
+import random
+import ssl
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timedelta
+from functools import lru_cache
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+from dados_sinteticos import gerar_despesas_superlogica, gerar_itens_conciliacao, gerar_transacoes_inter
+
+ID_CONDOMINIO_BASE = 1000  # idCondominio do condomínio i é ID_CONDOMINIO_BASE + i (idConta também)
+
+
+def client_id(indice):
+    return f"cliente-{indice:04d}"
+
+
+class Configuracao:
+    """Parâmetros dos servidores; podem mudar entre as execuções dos scripts"""
+
+    def __init__(self, transacoes=2000, despesas=40, itens_conciliacao=300, tamanho_pdf=200_000,
+                 latencia_ms=0.0, taxa_erro=0.0, semente=1):
+        self.transacoes = transacoes
+        self.despesas = despesas
+        self.itens_conciliacao = itens_conciliacao
+        self.tamanho_pdf = tamanho_pdf
+        self.latencia_ms = latencia_ms
+        self.taxa_erro = taxa_erro
+        self.aleatorio = random.Random(semente)
+        self.contagem = Counter()  # (endpoint, condomínio) -> requisições
+        self.erros = Counter()  # endpoint -> respostas de erro simuladas
+        self.lock = threading.Lock()
+
+    def zerar_contagem(self):
+        with self.lock:
+            self.contagem.clear()
+            self.erros.clear()
+
+
+@lru_cache(maxsize=256)
+def _dados_do_mes(indice, ano, mes, transacoes, despesas):
+    """Extrato do mês (com os débitos das concessionárias) e despesas pendentes do condomínio"""
+    extrato = gerar_transacoes_inter(transacoes, ano=ano, mes=mes, semente=indice)
+    brutas = gerar_despesas_superlogica(despesas, ano=ano, mes=mes, id_condominio=ID_CONDOMINIO_BASE + indice,
+                                        semente=indice)
+    aleatorio = random.Random(indice * 7919 + mes)
+    for i, despesa in enumerate(brutas):
+        # Cerca de 80% das despesas foram pagas entre o vencimento e vencimento + 5 dias
+        if aleatorio.random() < 0.8:
+            vencimento = datetime.strptime(despesa['dt_vencimento_pdes'], '%m/%d/%Y').date()
+            pago_em = vencimento + timedelta(days=aleatorio.randrange(6))
+            extrato.append({
+                "idTransacao": f"c{indice:04d}{ano:04d}{mes:02d}{i:06d}",
+                "dataInclusao": f"{pago_em.isoformat()} 08:00:00",
+                "dataTransacao": pago_em.isoformat(),
+                "tipoTransacao": "PAGAMENTO",
+                "tipoOperacao": "D",
+                "valor": despesa['vl_valor_pdes'],
+                "titulo": "Pagamento",
+                "descricao": f"{despesa['st_nome_con']} CONTA {i}",
+            })
+    extrato.sort(key=lambda t: (t['dataTransacao'], t['dataInclusao']))
+    return extrato, brutas
+
+
+class _Manipulador(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'  # Keep-alive, como as APIs reais
+    configuracao = None
+    rotas = {}
+
+    def log_message(self, *args):
+        pass
+
+    def _responder(self, status, corpo=None, cabecalhos=None):
+        dados = json.dumps(corpo if corpo is not None else {}).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(dados)))
+        for nome, valor in (cabecalhos or {}).items():
+            self.send_header(nome, valor)
+        self.end_headers()
+        self.wfile.write(dados)
+
+    def _tratar(self):
+        partes = urlsplit(self.path)
+        params = {chave: valores[0] for chave, valores in parse_qs(partes.query).items()}
+        tamanho = int(self.headers.get('Content-Length') or 0)
+        corpo = self.rfile.read(tamanho) if tamanho else b''
+        rota = self.rotas.get((self.command, partes.path))
+        if rota is None:
+            self._responder(404, {'erro': f'{self.command} {partes.path} não simulado'})
+            return
+
+        configuracao = self.configuracao
+        if configuracao.latencia_ms:
+            # Latência com variação de ±50% em torno da média
+            time.sleep(configuracao.latencia_ms / 1000 * (0.5 + configuracao.aleatorio.random()))
+        with configuracao.lock:
+            falhar = configuracao.aleatorio.random() < configuracao.taxa_erro
+            if falhar:
+                configuracao.erros[partes.path] += 1
+        if falhar:
+            self._responder(503, {'erro': 'indisponível (simulado)'}, {'Retry-After': '1'})
+            return
+
+        condominio, status, resposta = rota(self, params, corpo)
+        with configuracao.lock:
+            configuracao.contagem[(partes.path, condominio)] += 1
+        self._responder(status, resposta)
+
+    do_GET = do_POST = do_PUT = _tratar
+
+
+# --- Banco Inter ---------------------------------------------------------------------------------
+
+def _indice_do_token(manipulador):
+    token = manipulador.headers.get('Authorization', '').removeprefix('Bearer ')
+    return int(token.rsplit('-', 1)[-1]) if token.startswith('token-') else None
+
+
+def _token(manipulador, params, corpo):
+    dados = {chave: valores[0] for chave, valores in parse_qs(corpo.decode()).items()}
+    indice = int(dados.get('client_id', 'cliente-0').rsplit('-', 1)[-1])
+    return indice, 200, {'access_token': f"token-{indice}", 'expires_in': 3600, 'token_type': 'Bearer'}
+
+
+def _periodo(params):
+    inicio = datetime.strptime(params['dataInicio'], '%Y-%m-%d').date()
+    return inicio, params['dataInicio'], params['dataFim']
+
+
+def _transacoes(manipulador, params):
+    indice = _indice_do_token(manipulador)
+    inicio, data_inicio, data_fim = _periodo(params)
+    configuracao = manipulador.configuracao
+    extrato, _ = _dados_do_mes(indice, inicio.year, inicio.month, configuracao.transacoes, configuracao.despesas)
+    return indice, [t for t in extrato if data_inicio <= t['dataTransacao'] <= data_fim]
+
+
+def _saldo(manipulador, params, corpo):
+    return _indice_do_token(manipulador), 200, {'disponivel': 12345.67, 'bloqueadoCheque': 0, 'limite': 0}
+
+
+def _extrato(manipulador, params, corpo):
+    indice, transacoes = _transacoes(manipulador, params)
+    return indice, 200, {'transacoes': transacoes}
+
+
+def _extrato_completo(manipulador, params, corpo):
+    indice, transacoes = _transacoes(manipulador, params)
+    tamanho_pagina = int(params.get('tamanhoPagina', 50))
+    pagina = int(params.get('pagina', 0))
+    total_paginas = max(1, -(-len(transacoes) // tamanho_pagina))
+    return indice, 200, {
+        'totalPaginas': total_paginas,
+        'totalElementos': len(transacoes),
+        'ultimaPagina': pagina >= total_paginas - 1,
+        'primeiraPagina': pagina == 0,
+        'tamanhoPagina': tamanho_pagina,
+        'numeroDeElementos': len(transacoes[pagina * tamanho_pagina:(pagina + 1) * tamanho_pagina]),
+        'transacoes': transacoes[pagina * tamanho_pagina:(pagina + 1) * tamanho_pagina],
+    }
+
+
+def _extrato_exportar(manipulador, params, corpo):
+    indice = _indice_do_token(manipulador)
+    pdf = b'%PDF-1.4\n' + bytes(manipulador.configuracao.tamanho_pdf)
+    return indice, 200, {'pdf': base64.b64encode(pdf).decode()}
+
+
+ROTAS_INTER = {
+    ('POST', '/oauth/v2/token'): _token,
+    ('GET', '/banking/v2/saldo'): _saldo,
+    ('GET', '/banking/v2/extrato'): _extrato,
+    ('GET', '/banking/v2/extrato/completo'): _extrato_completo,
+    ('GET', '/banking/v2/extrato/exportar'): _extrato_exportar,
+}
+
+
+# --- Superlógica ---------------------------------------------------------------------------------
+
+def _indice_superlogica(params):
+    id_condominio = params.get('idCondominio') or params.get('idConta')
+    return int(id_condominio) - ID_CONDOMINIO_BASE if id_condominio else None
+
+
+def _contabancos(manipulador, params, corpo):
+    indice = _indice_superlogica(params)
+    return indice, 200, [{'id_contabanco_cb': str(ID_CONDOMINIO_BASE + indice), 'st_descricao_cb': 'Banco Inter'}]
+
+
+def _conciliacao_delete(manipulador, params, corpo):
+    return _indice_superlogica(params), 200, [{'status': '200', 'msg': 'Removido'}]
+
+
+def _conciliacao_put(manipulador, params, corpo):
+    # O corpo é multipart; o idConta vem no campo ID_CONTABANCO_CB
+    indice = None
+    trecho = corpo.split(b'name="ID_CONTABANCO_CB"', 1)
+    if len(trecho) == 2:
+        indice = int(trecho[1].split(b'\r\n\r\n', 1)[1].split(b'\r\n', 1)[0]) - ID_CONDOMINIO_BASE
+    return indice, 200, [{'status': '200', 'msg': 'Arquivo importado'}]
+
+
+def _conciliacao(manipulador, params, corpo):
+    indice = _indice_superlogica(params)
+    inicio = datetime.strptime(params['dtInicio'], '%m/%d/%Y')
+    itens = gerar_itens_conciliacao(manipulador.configuracao.itens_conciliacao, ano=inicio.year,
+                                    mes=inicio.month, semente=indice)
+    return indice, 200, itens
+
+
+def _despesas_index(manipulador, params, corpo):
+    indice = _indice_superlogica(params)
+    inicio = datetime.strptime(params['dtInicio'], '%m/%d/%Y')
+    configuracao = manipulador.configuracao
+    _, brutas = _dados_do_mes(indice, inicio.year, inicio.month, configuracao.transacoes, configuracao.despesas)
+    return indice, 200, brutas
+
+
+def _despesas_liquidar(manipulador, params, corpo):
+    dados = {chave: valores[0] for chave, valores in parse_qs(corpo.decode()).items()}
+    indice = int(dados['ID_CONDOMINIO_COND']) - ID_CONDOMINIO_BASE if 'ID_CONDOMINIO_COND' in dados else None
+    return indice, 200, [{'status': '200', 'msg': 'Despesa liquidada'}]
+
+
+ROTAS_SUPERLOGICA = {
+    ('GET', '/v2/condor/contabancos/index'): _contabancos,
+    ('POST', '/v2/condor/conciliacao/delete'): _conciliacao_delete,
+    ('POST', '/v2/condor/conciliacao/put'): _conciliacao_put,
+    ('GET', '/v2/condor/conciliacao'): _conciliacao,
+    ('GET', '/v2/condor/despesas/index'): _despesas_index,
+    ('PUT', '/v2/condor/despesas/liquidar'): _despesas_liquidar,
+}
+
+
+class _Servidor(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 128
+
+    def __init__(self, endereco, manipulador, contexto):
+        super().__init__(endereco, manipulador)
+        # O handshake fica para a thread de cada conexão, e não para o laço que aceita conexões
+        self.socket = contexto.wrap_socket(self.socket, server_side=True, do_handshake_on_connect=False)
+
+
+def iniciar_servidor(rotas, configuracao, cert_servidor, chave_servidor, certificados_clientes=None):
+    """
+    Sobe um servidor HTTPS numa porta livre de 127.0.0.1, numa thread. Com `certificados_clientes`
+    (arquivo PEM com os certificados aceitos) exige certificado do cliente, como o mTLS do Inter.
+
+    Returns:
+        (servidor, url_base)
+    """
+    contexto = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+    contexto.load_cert_chain(cert_servidor, chave_servidor)
+    if certificados_clientes:
+        contexto.verify_mode = ssl.CERT_REQUIRED
+        contexto.load_verify_locations(certificados_clientes)
+
+    manipulador = type('Manipulador', (_Manipulador,), {'configuracao': configuracao, 'rotas': rotas})
+    servidor = _Servidor(('127.0.0.1', 0), manipulador, contexto)
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    return servidor, f"https://127.0.0.1:{servidor.server_address[1]}"
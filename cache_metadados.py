@@ -0,0 +1,84 @@
+import os
+import threading
+import time
+from arquivos import caminho_cache, trava_arquivo, ler_json, gravar_json_atomico
+
+ARQUIVO_METADADOS = 'metadados_superlogica.json'
+TTL_PADRAO_HORAS = 24 * 7  # Ids de conta bancária/condomínio praticamente nunca mudam
+
+_metadados = {}
+_locks_chave = {}
+_lock_global = threading.Lock()
+
+
+def ttl_configurado():
+    """Validade dos metadados em segundos (METADADOS_TTL_HORAS do ambiente ou 7 dias)"""
+    return float(os.getenv('METADADOS_TTL_HORAS', TTL_PADRAO_HORAS)) * 3600
+
+
+def _valido(entrada):
+    return bool(entrada) and entrada.get('expira_em', 0) > time.time()
+
+
+def _lock_da_chave(chave):
+    with _lock_global:
+        return _locks_chave.setdefault(chave, threading.Lock())
+
+
+def obter_metadado(chave, buscar, ttl=None):
+    """
+    Retorna o metadado da chave (ex: 'contabanco:123') pelo cache em memória e em disco.
+    `buscar()` só é chamado quando a chave não existe ou já passou da validade; resultados vazios não são guardados.
+    """
+    entrada = _metadados.get(chave)
+    if _valido(entrada):
+        return entrada['valor']
+
+    with _lock_da_chave(chave):
+        entrada = _metadados.get(chave)
+        if _valido(entrada):
+            return entrada['valor']
+
+        caminho = caminho_cache(ARQUIVO_METADADOS)
+        with trava_arquivo(caminho):
+            entrada = ler_json(caminho, {}).get(chave)
+        if _valido(entrada):
+            _metadados[chave] = entrada
+            return entrada['valor']
+
+        valor = buscar()
+        if valor in (None, '', [], {}):
+            return valor
+        entrada = {'valor': valor, 'expira_em': time.time() + (ttl_configurado() if ttl is None else ttl)}
+        _metadados[chave] = entrada
+
+        # Relê antes de gravar para não apagar o que outro script salvou nesse meio tempo
+        with trava_arquivo(caminho):
+            salvos = ler_json(caminho, {})
+            salvos = {k: v for k, v in salvos.items() if _valido(v)}
+            salvos[chave] = entrada
+            gravar_json_atomico(caminho, salvos)
+
+        return valor
+
+
+def invalidar_metadados(prefixo=''):
+    """Descarta os metadados cujas chaves começam com `prefixo` (todos, se vazio). Retorna quantos saíram do disco"""
+    with _lock_global:
+        for chave in [k for k in _metadados if k.startswith(prefixo)]:
+            del _metadados[chave]
+    caminho = caminho_cache(ARQUIVO_METADADOS)
+    with trava_arquivo(caminho):
+        salvos = ler_json(caminho, {})
+        restantes = {k: v for k, v in salvos.items() if not k.startswith(prefixo)}
+        if len(restantes) != len(salvos):
+            gravar_json_atomico(caminho, restantes)
+    return len(salvos) - len(restantes)
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Limpa o cache de metadados da Superlógica")
+    parser.add_argument("prefixo", nargs="?", default="", help="Só as chaves com esse prefixo (ex: contabanco:123)")
+    args = parser.parse_args()
+    print(f"🧹 {invalidar_metadados(args.prefixo)} metadado(s) removido(s) do cache")
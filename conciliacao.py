@@ -1,16 +1,26 @@
-import json
+import hashlib
+import io
 import os
-from datetime import datetime, timedelta
-from extrato_mensal import build_ofx, get_mes_atual_datas
-from dotenv import dotenv_values, load_dotenv
+from datetime import datetime
+from extrato_mensal import gerar_ofx, get_mes_atual_datas
+from dotenv import load_dotenv
 import requests
-import time
-from collections import defaultdict
+from analise_conciliacao import analisar_conciliacoes
 import smtplib
 from email.message import EmailMessage
 from email.utils import formataddr
 import argparse
-import tempfile
+from http_cliente import requisitar, sessao_inter, sessao_superlogica, fechar_sessoes
+from paralelo import processar_em_paralelo, registrar_erro
+from token_inter import CabecalhosInter
+from sincronizacao import sincronizar_extrato
+from extrato_inter import iterar_extrato_completo
+from condominios import listar_condominios
+from cache_metadados import obter_metadado, invalidar_metadados
+import armazenamento
+import metricas
+import perfil
+import distribuicao
 
 BASE_PATH = '../CONDOMÍNIOS'
 
@@ -30,19 +40,14 @@ def enviar_email_resumo(assunto, corpo, remetente_nome):
     msg["To"] = email_destinatario
 
     try:
-        with smtplib.SMTP_SSL("smtp.gmail.com", 465) as smtp:
+        with metricas.etapa('email'), smtplib.SMTP_SSL("smtp.gmail.com", 465) as smtp:
             smtp.login(remetente_email, senha)
             smtp.send_message(msg)
         print("📨 E-mail enviado com sucesso.")
     except Exception as e:
         print(f"❌ Erro ao enviar e-mail: {e}")
 
-def get_id_contabanco(id_condominio):
-    headers = {
-        'app_token': os.getenv('APP_TOKEN'),
-        'access_token': os.getenv('ACCESS_TOKEN')
-    }
-
+def _buscar_id_contabanco(id_condominio):
     params = {
         'exibirDadosAgencia': 0,
         'exibirContasFechadas': 0,
@@ -51,19 +56,32 @@ def get_id_contabanco(id_condominio):
         'idCondominio': id_condominio,
     }
 
-    response = requests.get('https://api.superlogica.net/v2/condor/contabancos/index',
-        headers=headers,
+    response = requisitar('GET', 'https://api.superlogica.net/v2/condor/contabancos/index',
+        sessao=sessao_superlogica(),
         params=params
     )
     response.raise_for_status()
     return response.json()[0].get('id_contabanco_cb')
 
-def conciliar_super(local_arquivo, id_contabanco):
-    headers = {
-        'app_token': os.getenv('APP_TOKEN'),
-        'access_token': os.getenv('ACCESS_TOKEN')
-    }
-
+def get_id_contabanco(id_condominio):
+    """id_contabanco do condomínio, lido do cache de metadados (só consulta a Superlógica quando expira)"""
+    return obter_metadado(f'contabanco:{id_condominio}', lambda: _buscar_id_contabanco(id_condominio))
+
+def conteudo_ofx(ofx):
+    """Converte o OFX (str, bytes, arquivo aberto ou gerador de trechos) nos bytes que vão no upload"""
+    if hasattr(ofx, 'read'):
+        ofx = ofx.read()
+    if isinstance(ofx, str):
+        return ofx.encode("utf-8")
+    if isinstance(ofx, (bytes, bytearray)):
+        return bytes(ofx)
+    buffer = io.BytesIO()
+    for trecho in ofx:
+        buffer.write(trecho.encode("utf-8") if isinstance(trecho, str) else trecho)
+    return buffer.getvalue()
+
+def conciliar_super(ofx, id_contabanco, nome_arquivo='extrato.ofx'):
+    """Substitui o extrato do mês na conciliação da Superlógica pelo OFX informado (nada é gravado em disco)"""
     data = {
         'ID_CONTABANCO_CB': id_contabanco,
     }
@@ -76,43 +94,38 @@ def conciliar_super(local_arquivo, id_contabanco):
             'idConta': id_contabanco
         }
         # remove o arquivo anterior primeiro
-        response = requests.post('https://api.superlogica.net/v2/condor/conciliacao/delete',
-             headers=headers,
+        response = requisitar('POST', 'https://api.superlogica.net/v2/condor/conciliacao/delete',
+             sessao=sessao_superlogica(),
              params=params
         )
         response.raise_for_status()
         print(f'✅ Arquivo excluído')
     except requests.exceptions.HTTPError as e:
         print(f"❌ Erro ao excluir extrato no Super: {e}")
-        return          
+        return False
 
-    # Abre o arquivo OFX no modo binário
-    with open(local_arquivo, 'rb') as f:
-        files = {
-            'ARQUIVO': (local_arquivo, f, 'application/octet-stream')
-        }
-        response_conciliacao = requests.post("https://api.superlogica.net/v2/condor/conciliacao/put",
-            headers=headers,
-            data=data,
-            files=files
-        )
-        try:
-            response_conciliacao.raise_for_status()
-            print(f'✅ Arquivo enviado')
-        except requests.exceptions.HTTPError as e:
-            print(f"❌ Erro ao subir arquivio de conciliação: {e}")
-            return
+    # Monta o multipart a partir do OFX em memória
+    files = {
+        'ARQUIVO': (nome_arquivo, conteudo_ofx(ofx), 'application/octet-stream')
+    }
+    response_conciliacao = requisitar('POST', "https://api.superlogica.net/v2/condor/conciliacao/put",
+        sessao=sessao_superlogica(),
+        data=data,
+        files=files
+    )
+    try:
+        response_conciliacao.raise_for_status()
+        print(f'✅ Arquivo enviado')
+        return True
+    except requests.exceptions.HTTPError as e:
+        print(f"❌ Erro ao subir arquivio de conciliação: {e}")
+        return False
         
 def get_conciliacao_atual(id_contabanco, id_condominio):
     datas = get_mes_atual_datas()
     data_inicio = datetime.strptime(datas[0], "%Y-%m-%d").strftime("%m/%d/%Y")
     data_fim = datetime.strptime(datas[1], "%Y-%m-%d").strftime("%m/%d/%Y")
 
-    headers = {
-        'app_token': os.getenv('APP_TOKEN'),
-        'access_token': os.getenv('ACCESS_TOKEN')
-    }
-
     params = {
         'dtInicio': data_inicio,
         'dtFim': data_fim,
@@ -120,8 +133,8 @@ def get_conciliacao_atual(id_contabanco, id_condominio):
         'idCondominio': id_condominio,
     }
 
-    response = requests.get('https://api.superlogica.net/v2/condor/conciliacao',
-        headers=headers,
+    response = requisitar('GET', 'https://api.superlogica.net/v2/condor/conciliacao',
+        sessao=sessao_superlogica(),
         params=params
     )
     try:
@@ -139,69 +152,8 @@ def get_conciliacao_atual(id_contabanco, id_condominio):
         return
     
 def analisar_conciliacao(itens):
-    # Agrupar por data
-    totais_software = defaultdict(float)
-    totais_banco = defaultdict(float)
-    detalhes_por_data = defaultdict(lambda: {'software': [], 'banco': []})
-    
-    for item in itens:
-        # Parse valores corretamente
-        valor_banco = float(item.get("valor_banco", "0").replace(",", "."))
-        valor_software = float(item.get("valor_software", "0").replace(",", "."))
-        
-        # Pega data (de preferência a data explícita, senão a geral)
-        data_banco = item.get("data_banco") or item.get("data")
-        data_software = item.get("data_software") or item.get("data")
-
-        if item.get("valor_banco"):
-            totais_banco[data_banco] += valor_banco
-            detalhes_por_data[data_banco]['banco'].append({
-                'valor': valor_banco,
-                'descricao': item.get("descricao_banco")
-            })
-
-        if item.get("valor_software"):
-            totais_software[data_software] += valor_software
-            detalhes_por_data[data_software]['software'].append({
-                'valor': valor_software,
-                'descricao': item.get("descricao_software")
-            })
-
-    # Conciliar por data
-    todas_datas = set(totais_banco.keys()) | set(totais_software.keys())
-    diferencas = []
-    conciliado = True
-
-    for data in sorted(todas_datas):
-        valor_banco = round(totais_banco.get(data, 0.0), 2)
-        valor_software = round(totais_software.get(data, 0.0), 2)
-
-        # Converte a data da diferença para datetime
-        try:
-            data_dt = datetime.strptime(data, "%m/%d/%Y")
-        except ValueError:
-            data_dt = None  # Se não conseguir converter, considera como erro
-
-        # Só adiciona ao relatório se for até o dia atual
-        if abs(valor_banco - valor_software) > 0.001 and (data_dt is None or data_dt.date() <= datetime.today().date()):
-            conciliado = False
-            diferencas.append({
-                'data': data,
-                'valor_banco': valor_banco,
-                'valor_software': valor_software,
-                'detalhes_banco': detalhes_por_data[data]['banco'],
-                'detalhes_software': detalhes_por_data[data]['software'],
-            })
-
-    total_banco = round(sum(totais_banco.values()), 2)
-    total_software = round(sum(totais_software.values()), 2)
-
-    return {
-        'conciliado': conciliado,
-        'diferencas': diferencas,
-        'total_banco': total_banco,
-        'total_software': total_software
-    }
+    """Analisa a conciliação de um condomínio em centavos inteiros (ver analise_conciliacao)"""
+    return analisar_conciliacoes({None: itens})[None]
 
 def exibir_resultado_conciliacao(analise):
     if analise.get("conciliado", False):
@@ -236,176 +188,186 @@ def obter_ultima_transacao(transacoes):
     )
     return transacoes_ordenadas[0]
 
-def salvar_ultima_transacao(pasta_condominio, transacao):
-    """Salva a última transação em arquivo"""
-    arquivo_transacao = os.path.join(pasta_condominio, "ultima_transacao.txt")
-    
-    with open(arquivo_transacao, "w", encoding="utf-8") as f:
-        # Salva apenas os campos essenciais para comparação
-        dados_simplificados = {
-            'idTransacao': transacao.get('idTransacao'),
-            'dataTransacao': transacao.get('dataTransacao'),
-            'valor': transacao.get('valor'),
-            'tipoTransacao': transacao.get('tipoTransacao'),
-            'descricao': transacao.get('descricao')
-        }
-        json.dump(dados_simplificados, f, ensure_ascii=False, indent=2)
-
-def carregar_ultima_transacao(pasta_condominio):
-    """Carrega a última transação salva"""
-    arquivo_transacao = os.path.join(pasta_condominio, "ultima_transacao.txt")
-    
-    if not os.path.exists(arquivo_transacao):
-        return None
-    
-    try:
-        with open(arquivo_transacao, "r", encoding="utf-8") as f:
-            return json.load(f)
-    except (json.JSONDecodeError, FileNotFoundError):
-        return None
-
-def transacoes_sao_iguais(transacao1, transacao2):
-    """Compara se duas transações são iguais"""
-    if not transacao1 or not transacao2:
-        return False
-    
-    campos_comparacao = ['idTransacao', 'dataTransacao', 'valor', 'tipoTransacao']
-    
-    for campo in campos_comparacao:
-        if transacao1.get(campo) != transacao2.get(campo):
-            return False
-    
-    return True
-   
-def processar_condominio(nome_condominio, data_inicio, data_fim, resultados_conciliacao):
-    pasta_condominio = os.path.join(BASE_PATH, nome_condominio)
-    caminho_env = os.path.join(pasta_condominio, '.env')
-
-    if not os.path.exists(caminho_env):
-        print(f"⚠️  .env não encontrado para {nome_condominio}, pulando.")
-        return
-
-    # Carrega o .env daquele condomínio
-    config = dotenv_values(caminho_env)
-
-    client_id = config.get('ClientID')
-    client_secret = config.get('ClientSecret')
-
-    if not client_id or not client_secret:
-        print(f"❌ CLIENT_ID ou CLIENT_SECRET faltando em {nome_condominio}")
-        return
-    
-    # Monta caminhos absolutos dos certificados
-    cert_path = os.path.join(pasta_condominio, 'Inter API_Certificado.crt')
-    key_path = os.path.join(pasta_condominio, 'Inter API_Chave.key')
-
-    if not os.path.exists(cert_path) or not os.path.exists(key_path):
-        print(f"❌ Certificado ou chave não encontrados para {nome_condominio}")
-        return
-    
-    #capturando token
-    request_body = f'client_id={client_id}&client_secret={client_secret}&scope=extrato.read&grant_type=client_credentials'
-    
-    response = requests.post("https://cdpj.partners.bancointer.com.br/oauth/v2/token", 
-    headers={"Content-Type": "application/x-www-form-urlencoded"},
-    cert=(cert_path, key_path),
-    data=request_body)
-
-    response.raise_for_status()
-
-    token=response.json().get("access_token") #token capturado
-   
-    opFiltros={"dataInicio": data_inicio, "dataFim": data_fim}
-    cabecalhos={"Authorization": "Bearer " + token, "Content-Type": "Application/json"}
+def _centavos(valor):
+    return int(round(float(valor or 0) * 100))
+
+def calcular_digest(transacoes, saldo):
+    """
+    Digest do conjunto inteiro de transações + saldo, independente da ordem.
+    Cada transação normalizada vira um hash de 128 bits; os hashes são somados (mod 2^128),
+    então qualquer inclusão, exclusão, edição ou estorno muda o resultado.
+    """
+    modulo = 1 << 128
+    acumulado = 0
+    for t in transacoes:
+        normalizada = "\x1f".join((
+            str(t.get('idTransacao') or ''),
+            t.get('dataTransacao') or '',
+            str(_centavos(t.get('valor'))),
+            t.get('tipoOperacao') or '',
+            t.get('tipoTransacao') or '',
+            t.get('titulo') or '',
+            t.get('descricao') or '',
+        ))
+        hash_transacao = hashlib.blake2b(normalizada.encode("utf-8"), digest_size=16).digest()
+        acumulado = (acumulado + int.from_bytes(hash_transacao, "big")) % modulo
+    return f"{len(transacoes)}:{_centavos(saldo)}:{acumulado:032x}"
+
+def processar_condominio(condominio, data_inicio, data_fim, resultados_conciliacao, sincronizacao_completa=False,
+                         conciliacoes_atuais=None):
+    # .env, certificados e idCondominio já foram validados pelo registro de condomínios
+    nome_condominio = condominio.nome
+    id_condominio = condominio.id_condominio
+    cert_path, key_path = condominio.cert_path, condominio.key_path
+
+    sessao = sessao_inter((cert_path, key_path))
+
+    #capturando token (reaproveita o token em cache enquanto estiver válido)
+    with metricas.etapa('token'):
+        cabecalhos = CabecalhosInter(condominio.client_id, condominio.client_secret, (cert_path, key_path))
 
     # Saldo
     opFiltros_saldo={"dataSaldo": data_fim}
-    response_saldo = requests.get("https://cdpj.partners.bancointer.com.br/banking/v2/saldo",
-        params=opFiltros_saldo,
-        headers=cabecalhos,
-        cert=(cert_path, key_path),
-    )
-    response_saldo.raise_for_status()
-    saldo = response_saldo.json().get("disponivel")
-
-    # Extrato enriquecido
-    response_ofx = requests.get("https://cdpj.partners.bancointer.com.br/banking/v2/extrato/completo",
-        params=opFiltros,
-        headers=cabecalhos,
-         cert=(cert_path, key_path),
-    )
+    with metricas.etapa('saldo'):
+        response_saldo = requisitar('GET', "https://cdpj.partners.bancointer.com.br/banking/v2/saldo",
+            params=opFiltros_saldo,
+            headers=cabecalhos,
+            sessao=sessao,
+        )
+        response_saldo.raise_for_status()
+        saldo = response_saldo.json().get("disponivel")
+
+    # Extrato enriquecido: baixa só a janela desde a última sincronização, o resto vem do livro local
+    def baixar_extrato(inicio, fim):
+        return iterar_extrato_completo(sessao, cabecalhos, inicio, fim)
+
     try:
-        response_ofx.raise_for_status()
+        with metricas.etapa('extrato'):
+            transacoes = sincronizar_extrato(nome_condominio, baixar_extrato, data_inicio, data_fim,
+                                             completo=sincronizacao_completa)
     except requests.exceptions.HTTPError as e:
         print(f"❌ Erro ao baixar OFX do condomínio {nome_condominio}: {e}")
         return
-    transacoes = response_ofx.json().get("transacoes", [])
 
     ultima_transacao_atual = obter_ultima_transacao(transacoes)
-    ultima_transacao_salva = carregar_ultima_transacao(pasta_condominio)
+    mes = data_inicio[:7]  # YYYY-MM
+    digest_atual = calcular_digest(transacoes, saldo)
+    digest_salvo = armazenamento.ler_digest(nome_condominio, mes)
     
     print(f"📊 {len(transacoes)} transações encontradas")
     print(f"🆕 Última transação atual: {ultima_transacao_atual.get('dataTransacao') if ultima_transacao_atual else 'N/A'}")
-    print(f"💾 Última transação salva: {ultima_transacao_salva.get('dataTransacao') if ultima_transacao_salva else 'N/A'}")
 
-    # Se a última transação é a mesma, não precisa processar
-    if (ultima_transacao_salva and 
-        transacoes_sao_iguais(ultima_transacao_atual, ultima_transacao_salva)):
-        print(f"🔄 Nenhuma transação nova. Pulando conciliação.")
+    # Se nada mudou no mês (transações e saldo), não precisa reenviar para a Superlógica
+    if digest_atual == digest_salvo:
+        print(f"🔄 Nenhuma alteração no extrato. Pulando conciliação.")
         resultados_conciliacao[nome_condominio] = "✅ Sem alterações"
         return
     
-    print(f"🔄 Novas transações detectadas. Processando...")
-
-    ofx_data = build_ofx(transacoes, saldo, data_inicio, data_fim)
-    caminho_teste = tempfile.gettempdir() 
+    print(f"🔄 Alterações detectadas no extrato. Processando...")
+
+    # O OFX vai do gerador direto para o upload, sem passar pelo disco
+    ofx = gerar_ofx(transacoes, saldo, data_inicio, data_fim)
+    with metricas.etapa('contabanco'):
+        id_contabanco = get_id_contabanco(id_condominio)
+    with metricas.etapa('envio_ofx'):
+        enviado = conciliar_super(ofx, id_contabanco, f'{nome_condominio}.ofx')
+    # Só registra o estado se o envio deu certo; senão a próxima execução tenta de novo
+    if enviado:
+        armazenamento.gravar_digest(nome_condominio, mes, digest_atual)
+        print(f"💾 Estado da conciliação atualizado")
+    else:
+        # A conta pode ter sido trocada na Superlógica: busca o id de novo na próxima execução
+        invalidar_metadados(f'contabanco:{id_condominio}')
     
-    os.makedirs(caminho_teste, exist_ok=True)
-    caminho_com_nome = f'{caminho_teste}/{nome_condominio}.ofx'
-    with open(caminho_com_nome, "w", encoding="utf-8") as f:
-        f.write(ofx_data)
-    print(f'✅ OFX salvo como {nome_condominio}.ofx')
-
-    id_condominio = config.get('idCondominio')
-    if not id_condominio:
-        print(f"❌ id_condominio faltando em {nome_condominio}")
+    with metricas.etapa('conciliacao_atual'):
+        concilidacao_atual = get_conciliacao_atual(id_contabanco, id_condominio)
+    if concilidacao_atual is None:
+        raise RuntimeError("Não foi possível obter a conciliação atual na Superlógica")
+
+    # Com conciliacoes_atuais a análise fica para o final, num único lote com todos os condomínios
+    if conciliacoes_atuais is not None:
+        conciliacoes_atuais[nome_condominio] = concilidacao_atual
         return
-    
-    id_contabanco = get_id_contabanco(id_condominio)
-    conciliar_super(caminho_com_nome ,id_contabanco)
-    salvar_ultima_transacao(pasta_condominio, ultima_transacao_atual)
-    print(f"💾 Última transação atualizada")
-    os.remove(caminho_com_nome)
-    
-    concilidacao_atual = get_conciliacao_atual(id_contabanco, id_condominio)
     conciliacao_analisada = analisar_conciliacao(concilidacao_atual)
     resultado = exibir_resultado_conciliacao(conciliacao_analisada)
     resultados_conciliacao[nome_condominio] = resultado
     print(resultado)
 
 
-def main(enviar_email=False): 
-    resultados_conciliacao = {}
+def analisar_lote(lote, erros):
+    """
+    Analisa as conciliações do lote de uma vez. Se algum condomínio quebrar a análise (valor que não é
+    número, soma grande demais), refaz um a um: o erro fica só com ele, em `erros` e no log_erros.txt.
+    """
+    try:
+        return analisar_conciliacoes(lote)
+    except Exception:
+        analises = {}
+        for nome, itens in lote.items():
+            try:
+                analises.update(analisar_conciliacoes({nome: itens}))
+            except Exception as e:
+                print(f"❌ Erro ao analisar a conciliação de {nome}: {e}")
+                registrar_erro(nome, e)
+                erros[nome] = e
+        return analises
+
+
+@metricas.execucao('conciliacao')
+def main(enviar_email=False, max_workers=None, sincronizacao_completa=False, limpar_cache_metadados=False,
+         manter_conexoes=False):
+    if limpar_cache_metadados:
+        print(f"🧹 {invalidar_metadados()} metadado(s) removido(s) do cache")
+    # A sincronização incremental só re-baixa os últimos dias: uma vez por dia, a execução do relatório
+    # rebaixa o mês inteiro para pegar estornos, edições e lançamentos retroativos mais antigos
+    sincronizacao_completa = sincronizacao_completa or enviar_email
     hoje = datetime.today()
     data_inicio = hoje.replace(day=1).strftime("%Y-%m-%d")
     data_fim = hoje.strftime("%Y-%m-%d")
-    for nome_condominio in os.listdir(BASE_PATH):
-        caminho_completo = os.path.join(BASE_PATH, nome_condominio)
-        if os.path.isdir(caminho_completo):
-            try:
-                print(f"\n⏳ Processando {nome_condominio}...")
-                processar_condominio(nome_condominio, data_inicio, data_fim, resultados_conciliacao)
-                print(f"✅ {nome_condominio} concluído com sucesso")
-            except Exception as e:
-                print(f"❌ Erro ao processar {nome_condominio}: {str(e)}")
-                with open("log_erros.txt", "a") as log:
-                    log.write(f"[{datetime.now()}] {nome_condominio}: {str(e)}\n")
-            time.sleep(2) # Adiciona um atraso de 1 segundo entre cada condomínio
-    # Filtra apenas os que não foram conciliados
-    if enviar_email:
+
+    condominios = {condominio.nome: condominio for condominio in listar_condominios(BASE_PATH, exigir_id_condominio=True)}
+    nomes_condominios = list(condominios)
+
+    # Cada condomínio escreve no seu próprio dicionário; a junção final segue a ordem das pastas
+    resultados_por_condominio = {nome: {} for nome in nomes_condominios}
+    conciliacoes_atuais = {}
+    # Com DISTRIBUICAO_DB, só os condomínios que este worker reivindicar (o relatório é uma tarefa à parte)
+    with distribuicao.rodada('conciliacao-email' if enviar_email else 'conciliacao', nomes_condominios) as rodada:
+        while True:
+            erros = processar_em_paralelo(
+                rodada,
+                lambda nome: processar_condominio(condominios[nome], data_inicio, data_fim, resultados_por_condominio[nome],
+                                                  sincronizacao_completa, conciliacoes_atuais),
+                max_workers,
+            )
+
+            # Analisa as conciliações de todos os condomínios alterados de uma vez
+            lote = {nome: conciliacoes_atuais.pop(nome) for nome in nomes_condominios if nome in conciliacoes_atuais}
+            with metricas.etapa('analise'):
+                analises = analisar_lote(lote, erros)
+            for nome in lote:
+                if nome in analises:
+                    resultados_por_condominio[nome][nome] = exibir_resultado_conciliacao(analises[nome])
+                else:
+                    resultados_por_condominio[nome][nome] = f"❌ Erro na análise da conciliação: {erros[nome]}"
+                print(f"{nome}: {resultados_por_condominio[nome][nome]}")
+
+            # Só conclui com o resultado na mão: quem fechar a rodada monta o relatório de todos os workers
+            for nome, erro in erros.items():
+                rodada.concluir(nome, erro, resultados_por_condominio[nome].get(nome))
+            # Sem nenhuma lease na mão, espera os outros workers; se algum cair, assume os condomínios dele
+            if not rodada.aguardar():
+                break
+        resultados_conciliacao = rodada.resultados() if rodada.fechou else {}
+    # No agendador as conexões ficam abertas para a próxima execução
+    if not manter_conexoes:
+        fechar_sessoes()
+
+    # Filtra apenas os que não foram conciliados; com vários workers, só quem fechou a rodada envia
+    if enviar_email and rodada.fechou:
         nao_conciliados = {
             nome: resultado for nome, resultado in resultados_conciliacao.items()
-            if resultado.startswith("❌")
+            if resultado and resultado.startswith("❌")
         }
 
         if nao_conciliados:
@@ -416,10 +378,23 @@ def main(enviar_email=False):
             enviar_email_resumo("Relatório de Conciliação - Erros Encontrados", corpo_email, "Relatório de Conciliação Diária")
         else:
             print("📬 Todos os condomínios foram conciliados com sucesso.")
+    elif enviar_email:
+        print("📬 O relatório sai pelo worker que fechar a rodada.")
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser()
     parser.add_argument("--enviar-email", action="store_true", help="Enviar e-mail com o relatório de conciliação")
+    parser.add_argument("--workers", type=int, help="Condomínios processados ao mesmo tempo (padrão: MAX_WORKERS do .env ou 4)")
+    parser.add_argument("--sincronizacao-completa", action="store_true", help="Baixa o extrato do mês inteiro em vez de só a janela desde a última sincronização")
+    parser.add_argument("--limpar-cache-metadados", action="store_true", help="Descarta os ids da Superlógica em cache antes de rodar")
+    parser.add_argument("--profile", action="store_true", help="Grava perfil de CPU (.prof) e de memória da execução e de cada condomínio")
     args = parser.parse_args()
     
-    main(enviar_email=args.enviar_email)
+    if args.profile:
+        # Um condomínio por vez, para cada perfil conter só o seu condomínio
+        with perfil.perfilar('conciliacao'):
+            main(enviar_email=args.enviar_email, max_workers=1, sincronizacao_completa=args.sincronizacao_completa,
+                 limpar_cache_metadados=args.limpar_cache_metadados)
+    else:
+        main(enviar_email=args.enviar_email, max_workers=args.workers, sincronizacao_completa=args.sincronizacao_completa,
+             limpar_cache_metadados=args.limpar_cache_metadados)
@@ -0,0 +1,96 @@
+import os
+import threading
+from collections import namedtuple
+from dotenv import dotenv_values
+
+ARQUIVO_CERTIFICADO = 'Inter API_Certificado.crt'
+ARQUIVO_CHAVE = 'Inter API_Chave.key'
+
+# Descritor imutável de um condomínio pronto para processar
+Condominio = namedtuple('Condominio', 'nome pasta client_id client_secret id_condominio cert_path key_path')
+
+_registros = {}  # base_path -> (assinatura, condomínios válidos, problemas por pasta)
+_lock = threading.Lock()
+
+
+def _mtime(caminho):
+    try:
+        return os.stat(caminho).st_mtime_ns
+    except FileNotFoundError:
+        return None
+
+
+def _assinatura(base_path):
+    """mtimes da pasta base e, por condomínio, da pasta, do .env, do certificado e da chave"""
+    pastas = sorted(
+        nome for nome in os.listdir(base_path)
+        if os.path.isdir(os.path.join(base_path, nome))
+    )
+    return (_mtime(base_path),) + tuple(
+        (nome,) + tuple(
+            _mtime(os.path.join(base_path, nome, arquivo))
+            for arquivo in ('', '.env', ARQUIVO_CERTIFICADO, ARQUIVO_CHAVE)
+        )
+        for nome in pastas
+    )
+
+
+def _ler_condominio(base_path, nome):
+    """Retorna (Condominio, None) ou (None, mensagem do problema)"""
+    pasta = os.path.join(base_path, nome)
+    caminho_env = os.path.join(pasta, '.env')
+    if not os.path.exists(caminho_env):
+        return None, f"⚠️  .env não encontrado para {nome}, pulando."
+
+    config = dotenv_values(caminho_env)
+    client_id = config.get('ClientID')
+    client_secret = config.get('ClientSecret')
+    if not client_id or not client_secret:
+        return None, f"❌ CLIENT_ID ou CLIENT_SECRET faltando em {nome}"
+
+    cert_path = os.path.join(pasta, ARQUIVO_CERTIFICADO)
+    key_path = os.path.join(pasta, ARQUIVO_CHAVE)
+    if not os.path.exists(cert_path) or not os.path.exists(key_path):
+        return None, f"❌ Certificado ou chave não encontrados para {nome}"
+
+    return Condominio(nome, pasta, client_id, client_secret, config.get('idCondominio') or None,
+                      cert_path, key_path), None
+
+
+def listar_condominios(base_path, exigir_id_condominio=False):
+    """
+    Condomínios de base_path prontos para processar, em ordem alfabética.
+
+    Todas as pastas são lidas e validadas de uma vez, antes de qualquer requisição; o resultado fica
+    em memória enquanto os mtimes das pastas, .env, certificados e chaves não mudarem. Pastas com
+    problema são avisadas só quando a leitura é refeita.
+
+    Args:
+        base_path (str): Pasta CONDOMÍNIOS
+        exigir_id_condominio (bool): Também descarta os que não têm idCondominio (Superlógica)
+
+    Returns:
+        tuple: Condominio (namedtuple) de cada pasta válida
+    """
+    with _lock:
+        assinatura = _assinatura(base_path)
+        registro = _registros.get(base_path)
+        if registro is None or registro[0] != assinatura:
+            validos, problemas = [], {}
+            for nome in (item[0] for item in assinatura[1:]):
+                condominio, problema = _ler_condominio(base_path, nome)
+                if condominio:
+                    validos.append(condominio)
+                else:
+                    problemas[nome] = problema
+                    print(problema)
+            registro = (assinatura, tuple(validos), problemas)
+            _registros[base_path] = registro
+            # Avisa só na releitura, para não repetir a cada ciclo do agendador
+            for condominio in validos:
+                if not condominio.id_condominio:
+                    print(f"⚠️  idCondominio faltando em {condominio.nome}: fica fora da conciliação e da liquidação")
+
+    if exigir_id_condominio:
+        return tuple(condominio for condominio in registro[1] if condominio.id_condominio)
+    return registro[1]
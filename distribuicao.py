@@ -0,0 +1,314 @@
+"""
+Divisão dos condomínios entre vários processos (ou máquinas com um volume compartilhado).
+
+Ligada quando DISTRIBUICAO_DB aponta para o banco SQLite das leases, o mesmo para todos os
+workers. Em cada rodada (ver _entrar_na_rodada) um condomínio só é processado por um worker: quem
+o reivindica ganha uma lease com validade, renovada enquanto o processo estiver vivo, e marca o
+condomínio como concluído no fim. Se o worker morrer, a lease expira e outro assume o condomínio.
+
+O resultado de cada condomínio fica na tabela; o worker que fecha a rodada (conclui o último
+condomínio) tem `fechou` e lê todos com resultados(), para mandar um único relatório.
+
+Sem DISTRIBUICAO_DB, rodada() devolve todos os condomínios para o próprio processo, como antes.
+"""
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+VALIDADE_PADRAO = 120  # Segundos sem renovação até a lease ser considerada abandonada
+TOLERANCIA_PADRAO = 300  # Segundos depois da abertura em que quem chega ainda entra numa rodada já terminada
+MAX_TENTATIVAS = 3  # Condomínio que derrubou esse número de workers é dado como concluído com erro
+DIAS_HISTORICO = 7
+
+_ESQUEMA = """
+CREATE TABLE IF NOT EXISTS leases (
+    tarefa        TEXT    NOT NULL,
+    rodada        TEXT    NOT NULL,
+    condominio    TEXT    NOT NULL,
+    dono          TEXT,
+    expira_em     REAL    NOT NULL DEFAULT 0,
+    tentativas    INTEGER NOT NULL DEFAULT 0,
+    concluido_em  REAL,
+    erro          TEXT,
+    resultado     TEXT,  -- JSON com o resultado do condomínio, para o relatório único da rodada
+    criado_em     REAL    NOT NULL,
+    PRIMARY KEY (tarefa, rodada, condominio)
+);
+
+CREATE TABLE IF NOT EXISTS rodadas (
+    tarefa      TEXT    NOT NULL,
+    rodada      TEXT    NOT NULL,
+    aberta_em   REAL    NOT NULL,
+    vista_em    REAL    NOT NULL,  -- Último sinal de vida de algum worker da rodada
+    fechada_em  REAL,
+    PRIMARY KEY (tarefa, rodada)
+);
+"""
+
+
+def _config_numerica(variavel, padrao):
+    return float(os.getenv(variavel) or padrao)
+
+
+def _entrar_na_rodada(con, tarefa, agora, validade):
+    """
+    Rodada em que o worker entra (dentro da transação que também grava as leases dele).
+
+    Com DISTRIBUICAO_RODADA, é ela. Senão o worker entra na última rodada da tarefa se ela ainda
+    está viva (algum worker deu sinal de vida há menos de `validade` segundos) ou se foi aberta há
+    menos de DISTRIBUICAO_TOLERANCIA segundos, mesmo já terminada; fora isso abre uma rodada nova.
+    O primeiro worker abre a rodada e os outros entram nela, não importa o horário de cada um.
+    """
+    rodada = os.getenv('DISTRIBUICAO_RODADA')
+    if not rodada:
+        tolerancia = _config_numerica('DISTRIBUICAO_TOLERANCIA', TOLERANCIA_PADRAO)
+        ultima = con.execute(
+            "SELECT rodada, aberta_em, vista_em, fechada_em FROM rodadas WHERE tarefa = ? "
+            "ORDER BY aberta_em DESC LIMIT 1",
+            (tarefa,),
+        ).fetchone()
+        if ultima and ((ultima[3] is None and ultima[2] > agora - validade) or ultima[1] > agora - tolerancia):
+            rodada = ultima[0]
+        else:
+            rodada = datetime.fromtimestamp(agora).strftime('%Y-%m-%d %H:%M:%S')
+    con.execute(
+        "INSERT OR IGNORE INTO rodadas (tarefa, rodada, aberta_em, vista_em) VALUES (?, ?, ?, ?)",
+        (tarefa, rodada, agora, agora),
+    )
+    con.execute("UPDATE rodadas SET vista_em = ? WHERE tarefa = ? AND rodada = ?", (agora, tarefa, rodada))
+    return rodada
+
+
+class _RodadaLocal:
+    """Sem distribuição: o processo fica com todos os condomínios"""
+
+    def __init__(self, nomes):
+        self.nomes = list(nomes)
+        self._pendentes = list(nomes)
+        self._resultados = {}
+        self._lock = threading.Lock()
+
+    def proximo(self):
+        with self._lock:
+            return self._pendentes.pop(0) if self._pendentes else None
+
+    def concluir(self, nome, erro=None, resultado=None):
+        self._resultados[nome] = resultado
+
+    @property
+    def fechou(self):
+        return not self._pendentes
+
+    def resultados(self):
+        return {nome: self._resultados[nome] for nome in self.nomes if nome in self._resultados}
+
+    def aguardar(self):
+        return False
+
+    def __iter__(self):
+        return iter(self.proximo, None)
+
+
+class Rodada:
+    """
+    Condomínios de uma tarefa (script e parâmetros) numa rodada, divididos com os outros workers pela tabela de leases.
+
+    proximo() reivindica um condomínio livre (ou abandonado por um worker que morreu); concluir()
+    libera a lease e marca o condomínio como feito nesta rodada. aguardar() espera os outros
+    workers: volta True quando alguma lease expirou (há o que assumir) e False quando tudo acabou.
+    """
+
+    def __init__(self, caminho, tarefa, nomes, dono=None):
+        self.tarefa = tarefa
+        self.nomes = list(nomes)
+        self.dono = dono or os.getenv('WORKER_ID') or f"{socket.gethostname()}:{os.getpid()}"
+        self.validade = _config_numerica('DISTRIBUICAO_VALIDADE', VALIDADE_PADRAO)
+        self.assumidos = 0
+        self.fechou = False  # Este worker fechou a rodada: é ele quem manda o relatório
+        self._lock = threading.Lock()
+        self._parar = threading.Event()
+        # Journal padrão (não WAL): o banco pode estar num volume de rede compartilhado entre máquinas
+        self._con = sqlite3.connect(caminho, timeout=30, isolation_level=None, check_same_thread=False)
+        self._con.executescript(_ESQUEMA)
+        agora = time.time()
+        with self._transacao() as con:
+            con.execute("DELETE FROM leases WHERE criado_em < ?", (agora - DIAS_HISTORICO * 86400,))
+            con.execute("DELETE FROM rodadas WHERE aberta_em < ?", (agora - DIAS_HISTORICO * 86400,))
+            self.rodada = _entrar_na_rodada(con, tarefa, agora, self.validade)
+            con.executemany(
+                "INSERT OR IGNORE INTO leases (tarefa, rodada, condominio, criado_em) VALUES (?, ?, ?, ?)",
+                [(tarefa, self.rodada, nome, agora) for nome in self.nomes],
+            )
+        self._renovador = threading.Thread(target=self._renovar, name=f"leases-{tarefa}", daemon=True)
+        self._renovador.start()
+
+    @contextmanager
+    def _transacao(self):
+        # BEGIN IMMEDIATE pega a trava de escrita já no início: dois workers nunca leem a mesma lease livre
+        with self._lock:
+            self._con.execute("BEGIN IMMEDIATE")
+            try:
+                yield self._con
+            except BaseException:
+                self._con.execute("ROLLBACK")
+                raise
+            self._con.execute("COMMIT")
+
+    def _renovar(self):
+        while not self._parar.wait(self.validade / 3):
+            try:
+                agora = time.time()
+                with self._transacao() as con:
+                    con.execute(
+                        "UPDATE leases SET expira_em = ? WHERE tarefa = ? AND rodada = ? AND dono = ? "
+                        "AND concluido_em IS NULL",
+                        (agora + self.validade, self.tarefa, self.rodada, self.dono),
+                    )
+                    con.execute(
+                        "UPDATE rodadas SET vista_em = ? WHERE tarefa = ? AND rodada = ?",
+                        (agora, self.tarefa, self.rodada),
+                    )
+            except sqlite3.Error as e:
+                print(f"⚠️  Não foi possível renovar as leases de {self.tarefa}: {e}")
+
+    def _situacao(self, con):
+        linhas = con.execute(
+            "SELECT condominio, dono, expira_em, tentativas, concluido_em FROM leases "
+            "WHERE tarefa = ? AND rodada = ? ORDER BY condominio",
+            (self.tarefa, self.rodada),
+        ).fetchall()
+        nomes = set(self.nomes)
+        return [linha for linha in linhas if linha[0] in nomes]
+
+    def proximo(self):
+        """Reivindica o próximo condomínio disponível; None se não houver nenhum agora"""
+        while True:
+            agora = time.time()
+            with self._transacao() as con:
+                livre = next(
+                    (linha for linha in self._situacao(con) if linha[4] is None and linha[2] < agora), None
+                )
+                if livre is None:
+                    return None
+                nome, dono_anterior, _, tentativas, _ = livre
+                if tentativas >= MAX_TENTATIVAS:
+                    con.execute(
+                        "UPDATE leases SET concluido_em = ?, erro = ? WHERE tarefa = ? AND rodada = ? AND condominio = ?",
+                        (agora, f"abandonado após {tentativas} tentativa(s)", self.tarefa, self.rodada, nome),
+                    )
+                    print(f"❌ {nome} derrubou {tentativas} worker(s) nesta rodada; não será tentado de novo")
+                    continue
+                con.execute(
+                    "UPDATE leases SET dono = ?, expira_em = ?, tentativas = tentativas + 1 "
+                    "WHERE tarefa = ? AND rodada = ? AND condominio = ?",
+                    (self.dono, agora + self.validade, self.tarefa, self.rodada, nome),
+                )
+            if dono_anterior is not None:
+                self.assumidos += 1
+                print(f"♻️  Assumindo {nome}: a lease de {dono_anterior} expirou")
+            return nome
+
+    def concluir(self, nome, erro=None, resultado=None):
+        """Marca o condomínio como feito nesta rodada; `resultado` (serializável em JSON) vai para o relatório"""
+        with self._transacao() as con:
+            cursor = con.execute(
+                "UPDATE leases SET concluido_em = ?, erro = ?, resultado = ?, expira_em = 0 "
+                "WHERE tarefa = ? AND rodada = ? AND condominio = ? AND dono = ?",
+                (time.time(), None if erro is None else str(erro), json.dumps(resultado, ensure_ascii=False),
+                 self.tarefa, self.rodada, nome, self.dono),
+            )
+        if cursor.rowcount == 0:
+            print(f"⚠️  A lease de {nome} tinha expirado e foi assumida por outro worker")
+
+    def aguardar(self):
+        """Espera os condomínios com outros workers: True se algum ficou livre, False se todos terminaram"""
+        while True:
+            with self._transacao() as con:
+                pendentes = [linha for linha in self._situacao(con) if linha[4] is None]
+            agora = time.time()
+            if not pendentes:
+                self._fechar()
+                return False
+            if any(linha[2] < agora for linha in pendentes):
+                return True
+            proxima_expiracao = min(linha[2] for linha in pendentes)
+            time.sleep(min(max(0.5, proxima_expiracao - agora), self.validade / 6))
+
+    def _fechar(self):
+        # Só um worker consegue fechar: os outros encontram fechada_em preenchido
+        with self._transacao() as con:
+            cursor = con.execute(
+                "UPDATE rodadas SET fechada_em = ? WHERE tarefa = ? AND rodada = ? AND fechada_em IS NULL",
+                (time.time(), self.tarefa, self.rodada),
+            )
+        self.fechou = self.fechou or cursor.rowcount == 1
+
+    def resultados(self):
+        """Resultado de cada condomínio concluído na rodada, por qualquer worker, na ordem das pastas"""
+        with self._transacao() as con:
+            linhas = con.execute(
+                "SELECT condominio, resultado FROM leases WHERE tarefa = ? AND rodada = ? "
+                "AND concluido_em IS NOT NULL ORDER BY condominio",
+                (self.tarefa, self.rodada),
+            ).fetchall()
+        resultados = {nome: json.loads(resultado) for nome, resultado in linhas if resultado is not None}
+        ordem = {nome: posicao for posicao, nome in enumerate(self.nomes)}
+        return dict(sorted(resultados.items(), key=lambda item: ordem.get(item[0], len(ordem))))
+
+    def __iter__(self):
+        while True:
+            nome = self.proximo()
+            if nome is not None:
+                yield nome
+            elif not self.aguardar():
+                return
+
+    def resumo(self):
+        """(condomínios deste worker, dos outros, abandonados com erro)"""
+        with self._transacao() as con:
+            situacao = con.execute(
+                "SELECT dono, erro FROM leases WHERE tarefa = ? AND rodada = ? AND concluido_em IS NOT NULL",
+                (self.tarefa, self.rodada),
+            ).fetchall()
+        meus = sum(1 for dono, _ in situacao if dono == self.dono)
+        abandonados = sum(1 for _, erro in situacao if erro and erro.startswith('abandonado'))
+        return meus, len(situacao) - meus - abandonados, abandonados
+
+    def encerrar(self):
+        """Para de renovar e devolve as leases não concluídas (ex: Ctrl+C), para outro worker assumir já"""
+        self._parar.set()
+        self._renovador.join()
+        with self._transacao() as con:
+            con.execute(
+                "UPDATE leases SET dono = NULL, expira_em = 0, tentativas = MAX(0, tentativas - 1) "
+                "WHERE tarefa = ? AND rodada = ? AND dono = ? AND concluido_em IS NULL",
+                (self.tarefa, self.rodada, self.dono),
+            )
+        self._con.close()
+
+
+@contextmanager
+def rodada(tarefa, nomes):
+    """
+    Condomínios que este processo deve processar, para iterar (ou proximo()/concluir() à mão).
+    Com DISTRIBUICAO_DB, divide com os outros workers; sem ela, são todos os de `nomes`.
+    """
+    caminho = os.getenv('DISTRIBUICAO_DB')
+    if not caminho:
+        yield _RodadaLocal(nomes)
+        return
+
+    atual = Rodada(caminho, tarefa, nomes)
+    print(f"🤝 Rodada {atual.rodada} de {tarefa} dividida entre workers ({atual.dono})")
+    try:
+        yield atual
+    finally:
+        meus, dos_outros, abandonados = atual.resumo()
+        atual.encerrar()
+        print(f"🤝 {meus} condomínio(s) processados aqui ({atual.assumidos} assumidos de workers que caíram), "
+              f"{dos_outros} por outros workers, {abandonados} abandonado(s)")
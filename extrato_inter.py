@@ -0,0 +1,63 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+from http_cliente import requisitar
+from metricas import propagar
+
+URL_EXTRATO_COMPLETO = "https://cdpj.partners.bancointer.com.br/banking/v2/extrato/completo"
+TAMANHO_PAGINA_PADRAO = 1000  # Máximo aceito pelo Inter (sem o parâmetro ele devolve só 50 por página)
+PAGINAS_SIMULTANEAS_PADRAO = 4
+
+
+def _baixar_pagina(sessao, cabecalhos, data_inicio, data_fim, pagina, tamanho_pagina):
+    response = requisitar('GET', URL_EXTRATO_COMPLETO,
+        params={"dataInicio": data_inicio, "dataFim": data_fim, "pagina": pagina, "tamanhoPagina": tamanho_pagina},
+        headers=cabecalhos,
+        sessao=sessao,
+    )
+    response.raise_for_status()
+    return response.json()
+
+
+def iterar_extrato_completo(sessao, cabecalhos, data_inicio, data_fim, tamanho_pagina=None, paginas_simultaneas=None):
+    """
+    Gera as transações do /extrato/completo de todas as páginas, na ordem do banco.
+
+    A primeira página informa totalPaginas; as demais são pedidas ao mesmo tempo, no máximo
+    `paginas_simultaneas` à frente da que está sendo consumida (a memória fica limitada a essas páginas).
+
+    Args:
+        tamanho_pagina (int): Transações por página (EXTRATO_TAMANHO_PAGINA ou 1000)
+        paginas_simultaneas (int): Páginas baixadas ao mesmo tempo (EXTRATO_PAGINAS_SIMULTANEAS ou 4)
+
+    Yields:
+        dict: Cada transação, página após página
+    """
+    tamanho_pagina = tamanho_pagina or int(os.getenv('EXTRATO_TAMANHO_PAGINA', TAMANHO_PAGINA_PADRAO))
+    paginas_simultaneas = max(1, paginas_simultaneas or int(os.getenv('EXTRATO_PAGINAS_SIMULTANEAS', PAGINAS_SIMULTANEAS_PADRAO)))
+
+    primeira = _baixar_pagina(sessao, cabecalhos, data_inicio, data_fim, 0, tamanho_pagina)
+    total_paginas = int(primeira.get("totalPaginas") or 1)
+    if total_paginas <= 1:
+        yield from primeira.get("transacoes", [])
+        return
+
+    with ThreadPoolExecutor(max_workers=paginas_simultaneas) as executor:
+        def pedir(pagina):
+            return executor.submit(propagar(_baixar_pagina), sessao, cabecalhos, data_inicio, data_fim, pagina, tamanho_pagina)
+
+        pendentes = [pedir(pagina) for pagina in range(1, min(total_paginas, paginas_simultaneas + 1))]
+        proxima = len(pendentes) + 1
+        try:
+            yield from primeira.get("transacoes", [])
+            del primeira
+            while pendentes:
+                pagina = pendentes.pop(0).result()
+                # Cada página consumida abre espaço para pedir mais uma
+                if proxima < total_paginas:
+                    pendentes.append(pedir(proxima))
+                    proxima += 1
+                yield from pagina.get("transacoes", [])
+        finally:
+            # Consumidor desistiu no meio (ou deu erro): não pede as páginas que ainda não saíram
+            for futuro in pendentes:
+                futuro.cancel()
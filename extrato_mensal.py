@@ -1,13 +1,27 @@
 import os
-from dotenv import dotenv_values
 from datetime import datetime, timedelta
 import requests
-import base64
+import json
+import tempfile
 import re
-import time
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+from dotenv import load_dotenv
+from http_cliente import requisitar, sessao_inter, fechar_sessoes
+from token_inter import CabecalhosInter
+import armazenamento
+import metricas
+import perfil
+import distribuicao
+from sincronizacao import extrato_em_cache
+from condominios import listar_condominios
+from json_incremental import TAMANHO_BLOCO, gravar_base64
+from extrato_inter import iterar_extrato_completo
 
 BASE_PATH = '../CONDOMÍNIOS'
 
+load_dotenv()
+
 # --- Funções de Data ---
 def get_mes_atual_datas():
     """Retorna o primeiro e último dia do mês atual no formato YYYY-MM-DD."""
@@ -38,32 +52,46 @@ def extract_sigla(nome_condominio):
         return match.group(1) # Retorna o conteúdo dentro dos parênteses
     return None # Retorna None se não encontrar
 
-# Transforma json em ofx
-def build_ofx(transacoes, saldo_final, dt_start_filter, dt_end_filter):
+# Mapeamento de tipos de transação para TRNTYPE
+TRN_TYPE_MAP = {
+    "DEBITO_AUTOMATICO": "PAYMENT",
+    "PIX": "PAYMENT",  # Será ajustado abaixo baseado no tipoOperacao
+    "PAGAMENTO": "PAYMENT",
+    "COMPRA_DEBITO": "PAYMENT",
+    "OUTROS": "PAYMENT",
+    "DARF": "PAYMENT"
+}
+
+# Informações da conta (fixas para Banco Inter)
+ACCOUNT_INFO = {
+    "bank_org": "Banco Intermedium S/A",
+    "bank_id": "077",
+    "branch_id": "0001-9",
+    "account_id": "",  # Substitua pelo número real da conta
+}
+
+# Gera o ofx em pedaços, sem montar o documento inteiro na memória
+def gerar_ofx(transacoes, saldo_final, dt_start_filter, dt_end_filter):
     """
-    Converte a lista de transações do Banco Inter para formato OFX
+    Converte as transações do Banco Inter para OFX, devolvendo o documento em pedaços (str).
+    Percorre as transações uma única vez e aceita qualquer iterável, inclusive geradores.
     
     Args:
-        transacoes (list): Lista de transações no formato JSON
+        transacoes (iterable): Transações no formato JSON
         saldo_final (float): Saldo final da conta (opcional)
         
-    Returns:
-        str: String no formato OFX
+    Yields:
+        str: Trechos consecutivos do documento OFX
     """
-    # Informações da conta (fixas para Banco Inter)
-    account_info = {
-        "bank_org": "Banco Intermedium S/A",
-        "bank_id": "077",
-        "branch_id": "0001-9",
-        "account_id": "",  # Substitua pelo número real da conta
-    }
+    account_info = ACCOUNT_INFO
+    bank_id = account_info['bank_id']
     
     # Usar as datas de início e fim do filtro
     start_date_ofx = datetime.strptime(dt_start_filter, "%Y-%m-%d").strftime("%Y%m%d")
     end_date_ofx = datetime.strptime(dt_end_filter, "%Y-%m-%d").strftime("%Y%m%d")
 
     # Cabeçalho OFX
-    ofx = f"""OFXHEADER:100
+    yield f"""OFXHEADER:100
 
 DATA:OFXSGML
 VERSION:102
@@ -85,7 +113,7 @@ NEWFILEUID:NONE
 <LANGUAGE>POR</LANGUAGE>
 <FI>
 <ORG>{account_info['bank_org']}</ORG>
-<FID>{account_info['bank_id']}</FID>
+<FID>{bank_id}</FID>
 </FI>
 </SONRS>
 </SIGNONMSGSRSV1>
@@ -99,7 +127,7 @@ NEWFILEUID:NONE
 <STMTRS>
 <CURDEF>BRL</CURDEF>
 <BANKACCTFROM>
-<BANKID>{account_info['bank_id']}</BANKID>
+<BANKID>{bank_id}</BANKID>
 <BRANCHID>{account_info['branch_id']}</BRANCHID>
 <ACCTID>{account_info['account_id']}</ACCTID>
 <ACCTTYPE>CHECKING</ACCTTYPE>
@@ -109,80 +137,75 @@ NEWFILEUID:NONE
 <DTEND>{end_date_ofx}</DTEND>
 """
 
-    # Mapeamento de tipos de transação para TRNTYPE
-    trn_type_map = {
-        "DEBITO_AUTOMATICO": "PAYMENT",
-        "PIX": "PAYMENT",  # Será ajustado abaixo baseado no tipoOperacao
-        "PAGAMENTO": "PAYMENT",
-        "COMPRA_DEBITO": "PAYMENT",
-        "OUTROS": "PAYMENT",
-        "DARF": "PAYMENT"
-    }
-
     # Contador para gerar FITIDs sequenciais por dia
     fitid_counters = {}
+    # Datas já convertidas (um extrato tem poucas datas distintas e muitas transações)
+    datas_ofx = {}
 
     # Processar cada transação
     for trn in transacoes:
+        tipo_transacao = trn["tipoTransacao"]
+        tipo_operacao = trn["tipoOperacao"]
+
         # Determinar o tipo de transação
-        trn_type = trn_type_map.get(trn["tipoTransacao"], "OTHER")
+        trn_type = TRN_TYPE_MAP.get(tipo_transacao, "OTHER")
         
         # Ajustar para crédito/débito
-        if trn["tipoTransacao"] == "PIX":
-            trn_type = "CREDIT" if trn["tipoOperacao"] == "C" else "PAYMENT"
+        if tipo_transacao == "PIX":
+            trn_type = "CREDIT" if tipo_operacao == "C" else "PAYMENT"
         
         # Formatar valor (negativo para débitos)
         amount = float(trn["valor"])
-        if trn["tipoOperacao"] == "D":
+        if tipo_operacao == "D":
             amount = -amount
         
         # Formatar data no formato YYYYMMDD
-        dt_posted = datetime.strptime(trn["dataTransacao"], "%Y-%m-%d").strftime("%Y%m%d")
+        data_transacao = trn["dataTransacao"]
+        dt_posted = datas_ofx.get(data_transacao)
+        if dt_posted is None:
+            dt_posted = datetime.strptime(data_transacao, "%Y-%m-%d").strftime("%Y%m%d")
+            datas_ofx[data_transacao] = dt_posted
         
         # Gerar FITID no padrão do Banco Inter (YYYYMMDD + 077 + sequencial)
-        if dt_posted not in fitid_counters:
-            fitid_counters[dt_posted] = 1
-        else:
-            fitid_counters[dt_posted] += 1
+        sequencial = fitid_counters.get(dt_posted, 0) + 1
+        fitid_counters[dt_posted] = sequencial
         
-        fit_id = f"{dt_posted}{account_info['bank_id']}{fitid_counters[dt_posted]:03d}"
+        fit_id = f"{dt_posted}{bank_id}{sequencial:03d}"
         
-        memo = ""
-        if trn["tipoTransacao"] == "DEBITO_AUTOMATICO":
+        if tipo_transacao == "DEBITO_AUTOMATICO":
             memo = f'Debito automatico: "{trn.get("descricao", "")}"'
-        elif trn["tipoTransacao"] == "PIX":
+        elif tipo_transacao == "PIX":
             end_to_end = trn.get("detalhes", {}).get("endToEndId", "")
             # Extrai apenas a parte do código antes do ano (ex: E00416968202505202050bX9x5sS8lY9 -> 00416968)
             pix_id = end_to_end[1:9] if end_to_end and len(end_to_end) > 9 else ""
             
-            if trn["tipoOperacao"] == "C":
+            if tipo_operacao == "C":
                 memo = f'Pix recebido: "Cp :{pix_id}-{trn.get("descricao", "")}"'
             else:
                 memo = f'Pix enviado: "Cp :{pix_id}-{trn.get("descricao", "")}"'
-        elif trn["tipoTransacao"] == "COMPRA_DEBITO":
+        elif tipo_transacao == "COMPRA_DEBITO":
             memo = f'Compra no debito: "No estabelecimento {trn.get("descricao", "").strip()}"'
-        elif trn["tipoTransacao"] == "PAGAMENTO":
+        elif tipo_transacao == "PAGAMENTO":
             memo = f'Pagamento efetuado: "{trn.get("descricao", "")}"'
         elif "DARF" in trn.get("titulo", "").upper():
             memo = "DARF NUMERADO"
         else:
             memo = f'{trn.get("titulo", "")}: {trn.get("descricao", "")}'
 
-        # Adicionar transação ao OFX
-        ofx += f"""<STMTTRN>
+        yield f"""<STMTTRN>
 <TRNTYPE>{trn_type}</TRNTYPE>
 <DTPOSTED>{dt_posted}</DTPOSTED>
 <TRNAMT>{amount:.2f}</TRNAMT>
 <FITID>{fit_id}</FITID>
-<CHECKNUM>{account_info['bank_id']}</CHECKNUM>
-<REFNUM>{account_info['bank_id']}</REFNUM>
+<CHECKNUM>{bank_id}</CHECKNUM>
+<REFNUM>{bank_id}</REFNUM>
 <MEMO>{memo}</MEMO>
 </STMTTRN>
 """
 
     # Rodapé OFX com saldo
     saldo = saldo_final if saldo_final is not None else 0.00
-    ofx += f"""</BANKTRANLIST>
+    yield f"""</BANKTRANLIST>
 <LEDGERBAL>
 <BALAMT>{saldo:.2f}</BALAMT>
 <DTASOF>{datetime.now().strftime("%Y%m%d")}</DTASOF>
@@ -192,50 +215,103 @@ NEWFILEUID:NONE
 </BANKMSGSRSV1>
 </OFX>"""
 
-    return ofx
 
+def escrever_ofx(destino, transacoes, saldo_final, dt_start_filter, dt_end_filter):
+    """Escreve o OFX direto num objeto de arquivo (modo texto), sem guardar o documento na memória"""
+    escrever = destino.write
+    for trecho in gerar_ofx(transacoes, saldo_final, dt_start_filter, dt_end_filter):
+        escrever(trecho)
 
-def processar_condominio(nome_condominio, data_inicio, data_fim):
-    pasta_condominio = os.path.join(BASE_PATH, nome_condominio)
-    caminho_env = os.path.join(pasta_condominio, '.env')
 
-    if not os.path.exists(caminho_env):
-        print(f"⚠️  .env não encontrado para {nome_condominio}, pulando.")
-        return
+# Transforma json em ofx
+def build_ofx(transacoes, saldo_final, dt_start_filter, dt_end_filter):
+    """
+    Converte a lista de transações do Banco Inter para formato OFX
     
-    # Carrega o .env daquele condomínio
-    config = dotenv_values(caminho_env)
+    Args:
+        transacoes (list): Lista de transações no formato JSON
+        saldo_final (float): Saldo final da conta (opcional)
+        
+    Returns:
+        str: String no formato OFX
+    """
+    return "".join(gerar_ofx(transacoes, saldo_final, dt_start_filter, dt_end_filter))
 
-    client_id = config.get('ClientID')
-    client_secret = config.get('ClientSecret')
 
-    if not client_id or not client_secret:
-        print(f"❌ CLIENT_ID ou CLIENT_SECRET faltando em {nome_condominio}")
-        return
-    
-    # Monta caminhos absolutos dos certificados
-    cert_path = os.path.join(pasta_condominio, 'Inter API_Certificado.crt')
-    key_path = os.path.join(pasta_condominio, 'Inter API_Chave.key')
+@metricas.etapa('pdf')
+def salvar_pdf(sessao, cabecalhos, filtros, caminho_pdf, nome_arquivo_final, nome_condominio):
+    """Baixa o extrato em PDF do período e grava em caminho_pdf; retorna False se o banco recusar"""
+    response_pdf = requisitar('GET', "https://cdpj.partners.bancointer.com.br/banking/v2/extrato/exportar",
+        params=filtros,
+        headers=cabecalhos,
+        sessao=sessao,
+        stream=True,
+    )
+    with response_pdf:
+        try:
+            response_pdf.raise_for_status()
+        except requests.exceptions.HTTPError as e:
+            print(f"❌ Erro ao baixar PDF do condomínio {nome_condominio}: {e}")
+            return False
+
+        # O base64 é decodificado em blocos direto para o disco; o arquivo final só aparece completo
+        os.makedirs(caminho_pdf, exist_ok=True)
+        destino = f'{caminho_pdf}/{nome_arquivo_final}.pdf'
+        with open(destino + '.parcial', "wb") as f:
+            gravar_base64(response_pdf.iter_content(TAMANHO_BLOCO), "pdf", f)
+        os.replace(destino + '.parcial', destino)
+    print(f'✅ PDF salvo como {nome_arquivo_final}.pdf')
+    return True
 
-    if not os.path.exists(cert_path) or not os.path.exists(key_path):
-        print(f"❌ Certificado ou chave não encontrados para {nome_condominio}")
-        return
-    
 
-    #capturando token
-    request_body = f'client_id={client_id}&client_secret={client_secret}&scope=extrato.read&grant_type=client_credentials'
-    
-    response = requests.post("https://cdpj.partners.bancointer.com.br/oauth/v2/token", 
-    headers={"Content-Type": "application/x-www-form-urlencoded"},
-    cert=(cert_path, key_path),
-    data=request_body)
+@metricas.etapa('saldo')
+def obter_saldo(sessao, cabecalhos, data_saldo):
+    opFiltros_saldo={"dataSaldo": data_saldo}
+    response_saldo = requisitar('GET', "https://cdpj.partners.bancointer.com.br/banking/v2/saldo",
+        params=opFiltros_saldo,
+        headers=cabecalhos,
+        sessao=sessao,
+    )
+    response_saldo.raise_for_status()
+    return response_saldo.json().get("disponivel")
 
-    response.raise_for_status()
 
-    token=response.json().get("access_token") #token capturado
+@metricas.etapa('extrato')
+def obter_transacoes(sessao, cabecalhos, nome_condominio, data_inicio, data_fim):
+    """
+    Extrato enriquecido do período, como gerador lido do armazenamento local (ordem de data).
+    Só baixa se a conciliação não tiver baixado o mês recentemente (ou se ele ainda não fechou).
+    """
+    if extrato_em_cache(nome_condominio, data_inicio, data_fim):
+        print(f"📦 Extrato de {data_inicio} a {data_fim} em cache")
+        return armazenamento.iterar_transacoes_do_periodo(nome_condominio, data_inicio, data_fim)
+
+    # As transações chegam página a página e vão para um arquivo temporário; assim a escrita no
+    # SQLite (que trava o banco para os outros scripts) não fica esperando a rede
+    with tempfile.TemporaryFile("w+", encoding="utf-8") as temporario:
+        try:
+            for transacao in iterar_extrato_completo(sessao, cabecalhos, data_inicio, data_fim):
+                temporario.write(json.dumps(transacao, ensure_ascii=False) + "\n")
+        except requests.exceptions.HTTPError as e:
+            print(f"❌ Erro ao baixar OFX do condomínio {nome_condominio}: {e}")
+            return None
+        temporario.seek(0)
+        armazenamento.gravar_transacoes(nome_condominio, map(json.loads, temporario), data_inicio, data_fim)
+    return armazenamento.iterar_transacoes_do_periodo(nome_condominio, data_inicio, data_fim)
+
+
+def processar_condominio(condominio, data_inicio, data_fim):
+    # .env, credenciais e certificados já foram validados pelo registro de condomínios
+    nome_condominio = condominio.nome
+    cert_path, key_path = condominio.cert_path, condominio.key_path
+
+    sessao = sessao_inter((cert_path, key_path))
+
+    #capturando token (reaproveita o token em cache enquanto estiver válido)
+    with metricas.etapa('token'):
+        cabecalhos = CabecalhosInter(condominio.client_id, condominio.client_secret, (cert_path, key_path))
    
     opFiltros={"dataInicio": data_inicio, "dataFim": data_fim}
-    cabecalhos={"Authorization": "Bearer " + token, "Content-Type": "Application/json"}
 
     #Caminho teste
     #caminho_teste = f'C:/Users/User/Downloads/teste/{nome_condominio}' 
@@ -251,83 +327,39 @@ def processar_condominio(nome_condominio, data_inicio, data_fim):
     sigla = extract_sigla(nome_condominio)
     nome_arquivo_final = f'{ano}-{mes} EXTRATO {sigla}'
 
-    # Salva PDF
-    response_pdf = requests.get("https://cdpj.partners.bancointer.com.br/banking/v2/extrato/exportar",
-        params=opFiltros,
-        headers=cabecalhos,
-        cert=(cert_path, key_path),
-    )
-    try:
-        response_pdf.raise_for_status()
-    except requests.exceptions.HTTPError as e:
-        print(f"❌ Erro ao baixar PDF do condomínio {nome_condominio}: {e}")
-        return
-    
-    pdf_base64 = response_pdf.json().get("pdf")
     caminho_pdf = f'{caminho_drive}/EXTRATOS PDF/{ano}'
     #caminho_pdf_teste = f'{caminho_teste}/EXTRATOS PDF/{ano}'
-    os.makedirs(caminho_pdf, exist_ok=True)
-    with open(f'{caminho_pdf}/{nome_arquivo_final}.pdf', "wb") as f:
-        f.write(base64.b64decode(pdf_base64))
-    print(f'✅ PDF salvo como {nome_arquivo_final}.pdf')
-
-    # Saldo
-    opFiltros_saldo={"dataSaldo": data_fim}
-    response_saldo = requests.get("https://cdpj.partners.bancointer.com.br/banking/v2/saldo",
-        params=opFiltros_saldo,
-        headers=cabecalhos,
-        cert=(cert_path, key_path),
-    )
-    response_saldo.raise_for_status()
-    saldo = response_saldo.json().get("disponivel")
-
-    # Extrato enriquecido
-    response_ofx = requests.get("https://cdpj.partners.bancointer.com.br/banking/v2/extrato/completo",
-        params=opFiltros,
-        headers=cabecalhos,
-         cert=(cert_path, key_path),
-    )
-    try:
-        response_ofx.raise_for_status()
-    except requests.exceptions.HTTPError as e:
-        print(f"❌ Erro ao baixar OFX do condomínio {nome_condominio}: {e}")
-        return
-    
-    transacoes = response_ofx.json().get("transacoes", [])
-    ofx_data = build_ofx(transacoes, saldo, data_inicio, data_fim)
     caminho_ofx = f'{caminho_drive}/EXTRATOS OFX/{ano}'
     #caminho_ofx_teste = f'{caminho_teste}/EXTRATOS OFX/{ano}'
 
-    os.makedirs(caminho_ofx, exist_ok=True)
-    with open(f'{caminho_ofx}/{nome_arquivo_final}.ofx', "w", encoding="utf-8") as f:
-        f.write(ofx_data)
-    print(f'✅ OFX salvo como {nome_arquivo_final}.ofx')
-
-def processar_condominio_com_retry(nome_condominio, data_inicio, data_fim):
-    tentativas = 3
-    for tentativa in range(1, tentativas + 1):
-        try:
-            processar_condominio(nome_condominio, data_inicio, data_fim)
-            return  # Sucesso - sai da função
-        except (requests.exceptions.RequestException, ConnectionError) as e:
-            if tentativa == tentativas:
-                raise  # Última tentativa - re-lança a exceção
-                
-            espera = 2 ** tentativa  # Espera exponencial
-            print(f"⚠️ Tentativa {tentativa} falhou para {nome_condominio}. Tentando novamente em {espera}s...")
-            time.sleep(espera)
-        except Exception as e:
-            raise  # Outros erros não tentamos novamente
-
-
-def main():
-     # Seleção de mês no início do programa
-    texto_opcoes = """
+    # PDF, saldo e extrato são independentes: saem ao mesmo tempo. O PDF é gravado assim que chega,
+    # e o OFX assim que saldo e extrato chegarem, enquanto o PDF ainda pode estar baixando.
+    with ThreadPoolExecutor(max_workers=3) as executor:
+        futuro_pdf = executor.submit(metricas.propagar(salvar_pdf), sessao, cabecalhos, opFiltros, caminho_pdf, nome_arquivo_final, nome_condominio)
+        futuro_saldo = executor.submit(metricas.propagar(obter_saldo), sessao, cabecalhos, data_fim)
+        futuro_extrato = executor.submit(metricas.propagar(obter_transacoes), sessao, cabecalhos, nome_condominio, data_inicio, data_fim)
+
+        saldo = futuro_saldo.result()
+        transacoes = futuro_extrato.result()
+        if transacoes is not None:
+            os.makedirs(caminho_ofx, exist_ok=True)
+            with metricas.etapa('ofx'), open(f'{caminho_ofx}/{nome_arquivo_final}.ofx', "w", encoding="utf-8") as f:
+                escrever_ofx(f, transacoes, saldo, data_inicio, data_fim)
+            print(f'✅ OFX salvo como {nome_arquivo_final}.ofx')
+        futuro_pdf.result()
+
+
+@metricas.execucao('extrato_mensal')
+def main(opcao=None, manter_conexoes=False):
+    """opcao: '1' (mês atual) ou '2' (mês anterior); sem ela, pergunta no terminal"""
+    if opcao is None:
+        # Seleção de mês no início do programa
+        texto_opcoes = """
 Selecione o período para os extratos:
 1 - Mês atual
 2 - Mês anterior
 """
-    opcao = input(texto_opcoes).strip()
+        opcao = input(texto_opcoes).strip()
 
     data_inicio_selecionada = None
     data_fim_selecionada = None
@@ -344,21 +376,35 @@ Selecione o período para os extratos:
 
     print(f"Datas de Extrato: {data_inicio_selecionada} a {data_fim_selecionada}")
 
-    for nome_condominio in os.listdir(BASE_PATH):
-        caminho_completo = os.path.join(BASE_PATH, nome_condominio)
-        if os.path.isdir(caminho_completo):
+    condominios = {condominio.nome: condominio for condominio in listar_condominios(BASE_PATH)}
+    with distribuicao.rodada(f"extrato_mensal-{data_inicio_selecionada[:7]}", condominios) as rodada:
+        for nome_condominio in rodada:
+            erro = None
             try:
                 print(f"\n⏳ Processando {nome_condominio}...")
-                processar_condominio_com_retry(nome_condominio, data_inicio_selecionada, data_fim_selecionada)
+                with metricas.condominio(nome_condominio), perfil.condominio(nome_condominio):
+                    processar_condominio(condominios[nome_condominio], data_inicio_selecionada, data_fim_selecionada)
                 print(f"✅ {nome_condominio} concluído com sucesso")
             except Exception as e:
+                erro = e
                 print(f"❌ Erro ao processar {nome_condominio}: {str(e)}")
                 with open("log_erros.txt", "a") as log:
                     log.write(f"[{datetime.now()}] {nome_condominio}: {str(e)}\n")
-            time.sleep(2) # Adiciona um atraso de 1 segundo entre cada condomínio
+            rodada.concluir(nome_condominio, erro)
+    # No agendador as conexões ficam abertas para a próxima execução
+    if not manter_conexoes:
+        fechar_sessoes()
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--profile", action="store_true", help="Grava perfil de CPU (.prof) e de memória da execução e de cada condomínio")
+    args = parser.parse_args()
+
+    if args.profile:
+        with perfil.perfilar('extrato_mensal'):
+            main()
+    else:
+        main()
 
     
     
\ No newline at end of file
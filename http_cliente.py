@@ -0,0 +1,281 @@
+import os
+import random
+import ssl
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlsplit
+import requests
+from requests.adapters import HTTPAdapter
+from metricas import registrar_span
+
+INTER_HOST = 'cdpj.partners.bancointer.com.br'
+SUPERLOGICA_HOST = 'api.superlogica.net'
+
+# Limite padrão de requisições simultâneas por host (substitui o time.sleep fixo)
+LIMITES_PADRAO = {
+    INTER_HOST: ('INTER_MAX_CONEXOES', 4),
+    SUPERLOGICA_HOST: ('SUPERLOGICA_MAX_CONEXOES', 2),
+}
+
+# Timeouts (segundos) e novas tentativas de requisitar(); configuráveis pelo .env dos scripts
+TIMEOUT_CONEXAO_PADRAO = 10
+TIMEOUT_LEITURA_PADRAO = 60
+TENTATIVAS_PADRAO = 4
+ESPERA_BASE = 1          # Primeira espera do backoff exponencial
+ESPERA_MAXIMA = 60       # Teto de cada espera, inclusive a pedida no Retry-After
+
+# Respostas que indicam sobrecarga ou falha passageira. 429 e 503 são recusas: o servidor não
+# processou o pedido, então podem ser repetidas mesmo em chamadas não idempotentes
+STATUS_RECUSADO = {429, 503}
+STATUS_TRANSITORIO = {500, 502, 504} | STATUS_RECUSADO
+
+METODOS_IDEMPOTENTES = {'GET', 'HEAD', 'OPTIONS', 'PUT', 'DELETE'}
+
+# Exceções ao método HTTP: (host, caminho) -> a chamada pode ser repetida depois de enviada?
+IDEMPOTENCIA_ENDPOINTS = {
+    (INTER_HOST, '/oauth/v2/token'): True,  # Pedir outro token não tem efeito colateral
+    (SUPERLOGICA_HOST, '/v2/condor/conciliacao/delete'): True,
+    (SUPERLOGICA_HOST, '/v2/condor/conciliacao/put'): False,  # Enviar o OFX duas vezes duplica os lançamentos
+    (SUPERLOGICA_HOST, '/v2/condor/despesas/liquidar'): False,  # É PUT, mas liquidar duas vezes paga duas vezes
+}
+
+# Variáveis que apontam um host para outro endereço, ex: https://127.0.0.1:8443 (servidores
+# simulados do benchmark ponta a ponta). Vazias, as requisições vão para o endereço real
+URLS_BASE = {
+    INTER_HOST: 'INTER_URL_BASE',
+    SUPERLOGICA_HOST: 'SUPERLOGICA_URL_BASE',
+}
+
+_semaforos = {}
+_lock_semaforos = threading.Lock()
+
+_sessoes_inter = {}
+_sessao_superlogica = None
+_lock_sessoes = threading.Lock()
+
+
+def _semaforo_do_host(host):
+    with _lock_semaforos:
+        semaforo = _semaforos.get(host)
+        if semaforo is None:
+            # Lê o limite do ambiente só no primeiro uso, depois do load_dotenv dos scripts
+            limite = _limite_configurado(host) if host in LIMITES_PADRAO else 4
+            semaforo = threading.BoundedSemaphore(limite)
+            _semaforos[host] = semaforo
+        return semaforo
+
+
+def _limite_configurado(host):
+    variavel, padrao = LIMITES_PADRAO[host]
+    return max(1, int(os.getenv(variavel, padrao)))
+
+
+@contextmanager
+def limite_host(url):
+    """Segura uma vaga do host da URL enquanto a requisição estiver em andamento"""
+    semaforo = _semaforo_do_host(urlsplit(url).hostname)
+    with semaforo:
+        yield
+
+
+class AdaptadorSSL(HTTPAdapter):
+    """HTTPAdapter que usa um SSLContext já carregado em vez de reler certificado/chave a cada conexão"""
+
+    def __init__(self, ssl_context, **kwargs):
+        self.ssl_context = ssl_context
+        super().__init__(**kwargs)
+
+    def init_poolmanager(self, *args, **kwargs):
+        kwargs['ssl_context'] = self.ssl_context
+        return super().init_poolmanager(*args, **kwargs)
+
+
+def _contexto_mtls(cert_path, key_path):
+    contexto = ssl.create_default_context(cafile=requests.certs.where())
+    contexto.load_cert_chain(cert_path, key_path)
+    return contexto
+
+
+def sessao_inter(cert):
+    """
+    Sessão keep-alive do Banco Inter para o certificado (cert_path, key_path) do condomínio.
+    O certificado e a chave são lidos do disco uma única vez; as conexões TLS ficam no pool.
+    """
+    cert = tuple(cert)
+    with _lock_sessoes:
+        sessao = _sessoes_inter.get(cert)
+        if sessao is None:
+            sessao = requests.Session()
+            tamanho_pool = _limite_configurado(INTER_HOST)
+            sessao.mount('https://', AdaptadorSSL(
+                _contexto_mtls(*cert),
+                pool_connections=1,
+                pool_maxsize=tamanho_pool,
+            ))
+            _sessoes_inter[cert] = sessao
+        return sessao
+
+
+def sessao_superlogica():
+    """Sessão keep-alive compartilhada da Superlógica, já com app_token e access_token"""
+    global _sessao_superlogica
+    with _lock_sessoes:
+        if _sessao_superlogica is None:
+            sessao = requests.Session()
+            sessao.headers.update({
+                'app_token': os.getenv('APP_TOKEN'),
+                'access_token': os.getenv('ACCESS_TOKEN'),
+            })
+            sessao.mount('https://', HTTPAdapter(
+                pool_connections=1,
+                pool_maxsize=_limite_configurado(SUPERLOGICA_HOST),
+            ))
+            _sessao_superlogica = sessao
+        return _sessao_superlogica
+
+
+def fechar_sessoes():
+    """Fecha todas as conexões abertas (usado ao final da execução)"""
+    global _sessao_superlogica
+    with _lock_sessoes:
+        for sessao in _sessoes_inter.values():
+            sessao.close()
+        _sessoes_inter.clear()
+        if _sessao_superlogica is not None:
+            _sessao_superlogica.close()
+            _sessao_superlogica = None
+
+
+def _url_destino(url):
+    partes = urlsplit(url)
+    variavel = URLS_BASE.get(partes.hostname)
+    base = os.getenv(variavel) if variavel else None
+    if not base:
+        return url
+    return base.rstrip('/') + partes.path + (f'?{partes.query}' if partes.query else '')
+
+
+def _tamanho_resposta(response, kwargs):
+    """Bytes do corpo: Content-Length ou, sem streaming, o corpo já lido"""
+    tamanho = response.headers.get('Content-Length')
+    if tamanho and tamanho.isdigit():
+        return int(tamanho)
+    return None if kwargs.get('stream') else len(response.content)
+
+
+def _config_numerica(variavel, padrao):
+    return float(os.getenv(variavel, padrao))
+
+
+def eh_idempotente(metodo, url):
+    """Se a requisição pode ser repetida mesmo que o servidor já a tenha recebido"""
+    partes = urlsplit(url)
+    regra = IDEMPOTENCIA_ENDPOINTS.get((partes.hostname, partes.path.rstrip('/')))
+    return regra if regra is not None else metodo.upper() in METODOS_IDEMPOTENTES
+
+
+def _espera_retry_after(response):
+    """Segundos pedidos no Retry-After (número ou data HTTP), ou None se não veio"""
+    valor = response.headers.get('Retry-After')
+    if not valor:
+        return None
+    try:
+        return max(0.0, float(valor))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, (parsedate_to_datetime(valor) - datetime.now(timezone.utc)).total_seconds())
+    except (TypeError, ValueError):
+        return None
+
+
+def _espera_backoff(tentativa):
+    # Jitter completo: condomínios que falharam juntos não voltam todos no mesmo instante
+    teto = min(_config_numerica('HTTP_ESPERA_MAXIMA', ESPERA_MAXIMA), ESPERA_BASE * 2 ** (tentativa - 1))
+    return random.uniform(0, teto)
+
+
+def _pode_repetir_erro(erro, repetivel):
+    if isinstance(erro, requests.exceptions.ConnectTimeout):
+        return True  # A conexão nem abriu: o servidor não recebeu nada
+    if isinstance(erro, (requests.exceptions.ReadTimeout, requests.exceptions.ConnectionError,
+                         requests.exceptions.ChunkedEncodingError)):
+        return repetivel  # Pode ter sido processado sem a resposta chegar
+    return False
+
+
+def requisitar(metodo, url, sessao=None, idempotente=None, **kwargs):
+    """
+    Faz a requisição pela sessão informada, respeitando o limite de conexões simultâneas do host.
+
+    Toda chamada tem timeout de conexão e de leitura (HTTP_TIMEOUT_CONEXAO / HTTP_TIMEOUT_LEITURA)
+    e só ela é repetida em falhas passageiras, até HTTP_TENTATIVAS vezes, com backoff exponencial
+    com jitter ou a espera pedida no Retry-After (429/503). Chamadas não idempotentes (POST e os
+    endpoints de IDEMPOTENCIA_ENDPOINTS) só são repetidas quando o servidor certamente não as
+    processou: conexão não aberta, 429 ou 503.
+
+    Com cabeçalhos que sabem renovar o token (token_inter.CabecalhosInter), um 401 troca o token e
+    repete a chamada uma vez: o servidor recusou sem processar.
+
+    Se as tentativas acabarem, a última resposta é devolvida (quem chama faz o raise_for_status)
+    ou a última exceção é relançada.
+
+    Args:
+        idempotente (bool): Força a regra de repetição; por padrão vem do método e do endpoint
+    """
+    cabecalhos = kwargs.get('headers')
+    renovavel = hasattr(cabecalhos, 'renovar_token')
+    enviado = cabecalhos.get('Authorization') if renovavel else None
+    response = _requisitar_com_tentativas(metodo, url, sessao, idempotente, **kwargs)
+    if renovavel and response.status_code == 401:
+        print(f"⚠️  {metodo} {urlsplit(url).path}: HTTP 401, renovando o token e tentando de novo")
+        response.close()
+        cabecalhos.renovar_token(enviado)
+        response = _requisitar_com_tentativas(metodo, url, sessao, idempotente, **kwargs)
+    return response
+
+
+def _requisitar_com_tentativas(metodo, url, sessao, idempotente, **kwargs):
+    kwargs.setdefault('timeout', (
+        _config_numerica('HTTP_TIMEOUT_CONEXAO', TIMEOUT_CONEXAO_PADRAO),
+        _config_numerica('HTTP_TIMEOUT_LEITURA', TIMEOUT_LEITURA_PADRAO),
+    ))
+    repetivel = eh_idempotente(metodo, url) if idempotente is None else idempotente
+    status_repetiveis = STATUS_TRANSITORIO if repetivel else STATUS_RECUSADO
+    tentativas = max(1, int(_config_numerica('HTTP_TENTATIVAS', TENTATIVAS_PADRAO)))
+    destino = _url_destino(url)
+    endpoint = urlsplit(url).path
+
+    for tentativa in range(1, tentativas + 1):
+        try:
+            with limite_host(url):
+                inicio = time.perf_counter()
+                try:
+                    response = (sessao or requests).request(metodo, destino, **kwargs)
+                finally:
+                    duracao = time.perf_counter() - inicio
+        except requests.exceptions.RequestException as e:
+            registrar_span('http', duracao, status=type(e).__name__, metodo=metodo, endpoint=endpoint,
+                           tentativa=tentativa)
+            if tentativa == tentativas or not _pode_repetir_erro(e, repetivel):
+                raise
+            espera = _espera_backoff(tentativa)
+            motivo = type(e).__name__
+        else:
+            registrar_span('http', duracao, status=response.status_code, tamanho=_tamanho_resposta(response, kwargs),
+                           metodo=metodo, endpoint=endpoint, tentativa=tentativa)
+            if tentativa == tentativas or response.status_code not in status_repetiveis:
+                return response
+            espera = _espera_retry_after(response)
+            if espera is None:
+                espera = _espera_backoff(tentativa)
+            espera = min(espera, _config_numerica('HTTP_ESPERA_MAXIMA', ESPERA_MAXIMA))
+            motivo = f"HTTP {response.status_code}"
+            response.close()  # Devolve a conexão ao pool antes de esperar
+
+        # A espera acontece fora do limite do host: a vaga fica livre para outros condomínios
+        print(f"⚠️  {metodo} {endpoint}: {motivo}, tentativa {tentativa + 1}/{tentativas} em {espera:.1f}s")
+        time.sleep(espera)
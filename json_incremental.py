@@ -0,0 +1,124 @@
+"""
+Leitura incremental de respostas JSON grandes, sem materializar o documento inteiro.
+
+Serve para o formato grande do Banco Inter: {"pdf": "<base64>"} do /extrato/exportar (as páginas do
+/extrato/completo têm no máximo 1000 transações e são lidas com response.json()). Só a biblioteca
+padrão é usada (json.JSONDecoder.raw_decode e base64).
+"""
+import base64
+import codecs
+import json
+
+TAMANHO_BLOCO = 64 * 1024  # Bytes lidos da resposta por vez
+_ESPACOS = ' \t\r\n'
+_decodificador = json.JSONDecoder()
+
+
+class _Leitor:
+    """Buffer de texto sobre um iterável de blocos de bytes, descartando o que já foi consumido"""
+
+    def __init__(self, blocos):
+        self._blocos = iter(blocos)
+        self._utf8 = codecs.getincrementaldecoder('utf-8')()
+        self.texto = ''
+        self.pos = 0
+        self.fim = False
+
+    def carregar(self):
+        """Lê mais um bloco; retorna False se a resposta acabou"""
+        if self.fim:
+            return False
+        if self.pos > len(self.texto) // 2:
+            self.texto = self.texto[self.pos:]
+            self.pos = 0
+        bloco = next(self._blocos, None)
+        if bloco is None:
+            self.fim = True
+            self.texto += self._utf8.decode(b'', final=True)
+            return False
+        self.texto += self._utf8.decode(bloco) if isinstance(bloco, bytes) else bloco
+        return True
+
+    def pular_espacos(self):
+        while True:
+            while self.pos < len(self.texto) and self.texto[self.pos] in _ESPACOS:
+                self.pos += 1
+            if self.pos < len(self.texto) or not self.carregar():
+                return
+
+    def caractere(self):
+        """Próximo caractere relevante (sem consumir), ou '' no fim da resposta"""
+        self.pular_espacos()
+        return self.texto[self.pos] if self.pos < len(self.texto) else ''
+
+    def esperar(self, caractere):
+        if self.caractere() != caractere:
+            raise ValueError(f"JSON inesperado: esperava {caractere!r} na posição {self.pos}")
+        self.pos += 1
+
+    def valor(self):
+        """Decodifica o próximo valor JSON completo, lendo mais blocos enquanto ele estiver cortado"""
+        self.pular_espacos()
+        while True:
+            try:
+                valor, fim = _decodificador.raw_decode(self.texto, self.pos)
+            except json.JSONDecodeError:
+                if not self.carregar():
+                    raise
+                continue
+            # Um número no fim do buffer pode continuar no próximo bloco
+            if fim == len(self.texto) and not self.fim and self.carregar():
+                continue
+            self.pos = fim
+            return valor
+
+    def chaves(self):
+        """Percorre as chaves do objeto do topo; quem chama consome (ou pula) cada valor"""
+        self.esperar('{')
+        if self.caractere() == '}':
+            self.pos += 1
+            return
+        while True:
+            chave = self.valor()
+            self.esperar(':')
+            yield chave
+            if self.caractere() == ',':
+                self.pos += 1
+                continue
+            self.esperar('}')
+            return
+
+
+def gravar_base64(blocos, campo, arquivo):
+    """
+    Decodifica o texto base64 do campo `campo` do objeto JSON do topo direto para `arquivo` (binário),
+    em pedaços de tamanho fixo. Retorna o número de bytes gravados.
+    """
+    leitor = _Leitor(blocos)
+    for chave in leitor.chaves():
+        if chave != campo:
+            leitor.valor()
+            continue
+        leitor.esperar('"')
+        gravados, resto = 0, ''
+        while True:
+            fechamento = leitor.texto.find('"', leitor.pos)
+            trecho = leitor.texto[leitor.pos:len(leitor.texto) if fechamento < 0 else fechamento]
+            # Uma barra no fim do trecho é o começo de um escape que continua no próximo bloco
+            if fechamento < 0 and trecho.endswith('\\'):
+                trecho = trecho[:-1]
+            leitor.pos += len(trecho)
+            # Em base64 os únicos escapes JSON possíveis são \/ e quebras de linha
+            trecho = resto + trecho.replace('\\/', '/').replace('\\n', '').replace('\\r', '')
+            utilizavel = len(trecho) - len(trecho) % 4
+            if utilizavel:
+                gravados += arquivo.write(base64.b64decode(trecho[:utilizavel]))
+            resto = trecho[utilizavel:]
+            if fechamento >= 0:
+                leitor.pos = fechamento + 1
+                if resto:
+                    raise ValueError(f"Base64 truncado no campo {campo!r}")
+                return gravados
+            if not leitor.carregar():
+                raise ValueError(f"Resposta terminou antes do fim do campo {campo!r}")
+    raise ValueError(f"Campo {campo!r} não encontrado na resposta")
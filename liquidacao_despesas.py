@@ -1,18 +1,35 @@
 from datetime import datetime, timedelta
-import time
+from concurrent.futures import ThreadPoolExecutor
 import requests
-import os
-from dotenv import dotenv_values
+import argparse
 from conciliacao import enviar_email_resumo
-hoje = datetime.today()
-data_inicio = hoje.replace(day=1)
-proximo_mes = (hoje.replace(day=28) + timedelta(days=4)).replace(day=1)
-data_fim = (proximo_mes - timedelta(days=1))
+from http_cliente import requisitar, sessao_inter, sessao_superlogica, fechar_sessoes
+from token_inter import CabecalhosInter
+from sincronizacao import sincronizar_extrato
+from extrato_inter import iterar_extrato_completo
+from analise_conciliacao import para_centavos
+from pareamento import converter_data, parear_despesas
+from paralelo import max_workers_configurado
+from condominios import listar_condominios
+import armazenamento
+import metricas
+import perfil
+import distribuicao
+from regras_concessionarias import classificar_transacoes, concessionaria_da_despesa, contas_das_regras
 
 
 BASE_PATH = '../CONDOMÍNIOS'
 
 
+def periodo_do_mes():
+    """(hoje, primeiro dia, último dia) do mês atual, calculado a cada execução (o agendador fica no ar por dias)"""
+    hoje = datetime.today()
+    data_inicio = hoje.replace(day=1)
+    proximo_mes = (hoje.replace(day=28) + timedelta(days=4)).replace(day=1)
+    data_fim = (proximo_mes - timedelta(days=1))
+    return hoje, data_inicio, data_fim
+
+
 def tratar_despesas_superlogica(dados_brutos):
     despesas_tratadas  = []
 
@@ -44,6 +61,7 @@ def tratar_despesas_superlogica(dados_brutos):
 
 def get_despesas_pendentes_superlogica(id_condominio):  
     url = 'https://api.superlogica.net/v2/condor/despesas/index'
+    _, data_inicio, data_fim = periodo_do_mes()
     
     params = {
         'comStatus': 'pendentes',
@@ -51,199 +69,217 @@ def get_despesas_pendentes_superlogica(id_condominio):
         'dtFim': data_fim.strftime('%m/%d/%Y'),
         'filtrarpor': 'vencimento',
         'idCondominio': id_condominio,
-        'CONTAS[0]': '2.2.2', # Conta categoria de água
-        'CONTAS[1]': '2.2.1' # Conta categoria de luz
     }
+    # Contas categoria das regras de concessionárias (concessionarias.json)
+    for i, conta in enumerate(contas_das_regras()):
+        params[f'CONTAS[{i}]'] = conta
 
     headers = {
         'Content-Type': 'application/json',
-        'app_token': os.getenv('APP_TOKEN'),
-        'access_token': os.getenv('ACCESS_TOKEN')
     }
 
 
     try:
-        response = requests.get(url, headers=headers, params=params)
+        response = requisitar('GET', url, sessao=sessao_superlogica(), headers=headers, params=params)
         response.raise_for_status() # Levanta HTTPError para 4xx/5xx
         dados_brutos = response.json()
         print(f"  Superlógica: {len(dados_brutos)} despesa(s) bruta(s) encontrada(s)")
         return tratar_despesas_superlogica(dados_brutos)
     except requests.exceptions.RequestException as e:
         print(f"  Erro ao buscar despesas na Superlógica (Condomínio {id_condominio})): {e}")
-        return []
-
-def get_extrato_inter(pasta_condominio ,client_id, client_secret):
-        # Monta caminhos absolutos dos certificados
-        cert_path = os.path.join(pasta_condominio, 'Inter API_Certificado.crt')
-        key_path = os.path.join(pasta_condominio, 'Inter API_Chave.key')
-
-        if not (os.path.exists(cert_path) and os.path.exists(key_path)):
-            print(f"  Erro: Certificados Inter não encontrados em {pasta_condominio}. Verifique 'Inter API_Certificado.crt' e 'Inter API_Chave.key'.")
-            return None
+        return None  # Diferente de [] (nenhuma pendente): sem a lista não dá para conferir os envios
 
-        request_body = f'client_id={client_id}&client_secret={client_secret}&scope=extrato.read&grant_type=client_credentials'
+def get_extrato_inter(condominio):
+        cert_path, key_path = condominio.cert_path, condominio.key_path
+        with metricas.etapa('token'):
+            cabecalhos = CabecalhosInter(condominio.client_id, condominio.client_secret, (cert_path, key_path))
 
-        response = requests.post("https://cdpj.partners.bancointer.com.br/oauth/v2/token",
-        headers={"Content-Type": "application/x-www-form-urlencoded"},
-        cert=(cert_path, key_path),
-        data=request_body)
+        sessao = sessao_inter((cert_path, key_path))
 
-        response.raise_for_status()
-
-        token=response.json().get("access_token")
-
-        opFiltros={"dataInicio": data_inicio.strftime("%Y-%m-%d"), "dataFim": data_fim.strftime("%Y-%m-%d")}
-        cabecalhos={"Authorization": "Bearer " + token, "Content-Type": "Application/json"}
+        # Usa o extrato enriquecido sincronizado no armazenamento local, o mesmo da conciliação
+        def baixar_extrato(inicio, fim):
+            return iterar_extrato_completo(sessao, cabecalhos, inicio, fim)
 
+        hoje, data_inicio, data_fim = periodo_do_mes()
         try:
-            extrato_response = requests.get("https://cdpj.partners.bancointer.com.br/banking/v2/extrato",
-                params=opFiltros,
-                headers=cabecalhos,
-                cert=(cert_path, key_path)
-            )
-            extrato_response.raise_for_status()
-            return extrato_response.json()
+            with metricas.etapa('extrato'):
+                transacoes = sincronizar_extrato(condominio.nome, baixar_extrato,
+                                                 data_inicio.strftime("%Y-%m-%d"), min(data_fim, hoje).strftime("%Y-%m-%d"))
         except requests.exceptions.RequestException as e:
             print(f"  Erro ao buscar extrato do Banco Inter: {e}")
-        return None
+            return None
 
-def localizar_pagamentos_concessionarias(extrato_data):
-    pagamentos_encontrados = {
-        'CEMIG': [],
-        'COPASA': []
-    }
+        # No extrato enriquecido a data de entrada vem em dataTransacao
+        return {'transacoes': [dict(t, dataEntrada=t.get('dataTransacao')) for t in transacoes]}
 
+def localizar_pagamentos_concessionarias(extrato_data):
     if not extrato_data or 'transacoes' not in extrato_data:
         print("Erro: O extrato não contém a chave 'transacoes'.")
-        return pagamentos_encontrados
+        return classificar_transacoes([])
 
-    for transacao in extrato_data['transacoes']:
-        # Verifica se é uma transação de débito (saída de dinheiro)
-        if transacao.get('tipoOperacao') == 'D':
-            descricao = transacao.get('descricao', '').upper()
-            titulo = transacao.get('titulo', '').upper()
+    return classificar_transacoes(extrato_data['transacoes'])
 
-            # Procura por CEMIG
-            if 'CEMIG' in descricao or 'CEMIG' in titulo:
-                pagamentos_encontrados['CEMIG'].append(transacao)
-            
-            # Procura por COPASA
-            if 'COPASA' in descricao or 'COPASA' in titulo:
-                pagamentos_encontrados['COPASA'].append(transacao)
-                
-    return pagamentos_encontrados
-
-def datas_compativeis(data_vencimento, data_pagamento, tolerancia_dias=5):
-    """Retorna True se o pagamento for >= vencimento e <= vencimento + tolerância"""
-    # tenta converter data no formato esperado
-    formatos = ["%Y-%m-%d", "%m/%d/%Y %H:%M:%S", "%m/%d/%Y"]
-    def parse_data(data_str):
-        for f in formatos:
+def conciliar_despesas(despesas, pagamentos):
+    """Pareia as despesas pendentes com os pagamentos do extrato, sem liquidar nada"""
+    # Converte valores e datas uma única vez; registros com data inválida ficam de fora do pareamento
+    chaves_pagamentos, lista_pagamentos = [], []
+    for concessionaria, pagamentos_concessionaria in pagamentos.items():
+        for pagamento in pagamentos_concessionaria:
             try:
-                return datetime.strptime(data_str, f)
-            except ValueError:
+                data = converter_data(pagamento['dataEntrada'])
+            except (TypeError, ValueError):
+                print(f"  ⚠️  Pagamento {concessionaria} com data inválida ignorado: {pagamento.get('dataEntrada')}")
                 continue
-        raise ValueError(f"Formato de data inválido: {data_str}")
-    
-    dt_venc = parse_data(data_vencimento)
-    dt_pag = parse_data(data_pagamento)
-    
-    return dt_venc <= dt_pag <= (dt_venc + timedelta(days=tolerancia_dias))
-
-def conciliar_e_liquidar(despesas, pagamentos):
-    liquidadas = []
+            chaves_pagamentos.append((concessionaria, para_centavos(pagamento['valor']), data))
+            lista_pagamentos.append(pagamento)
 
+    chaves_despesas, lista_despesas = [], []
     for despesa in despesas:
-        valor = float(despesa['VL_VALOR_PDES'])
-
-        if '2.2.1' in despesa['ID_CONTA_CATEGORIA']:  # CEMIG
-            for pagamento in pagamentos['CEMIG']:
-                if (
-                    abs(float(pagamento['valor']) - valor) < 0.01 
-                    and datas_compativeis(despesa['DT_VENCIMENTO_PDES'], pagamento['dataEntrada'])
-                ):
-                    data_pagamento = pagamento['dataEntrada']
-                    print(f"  🔄 Conciliando e liquidando despesa CEMIG ID {despesa['ID_DESPESA_DES']}")
-                    liquidar_despesa(despesa, data_pagamento)
-
-                    liquidadas.append({
-                        'nome': 'CEMIG',
-                        'id_despesa': despesa['ID_DESPESA_DES'],
-                        'valor': valor,
-                        'data_pagamento': data_pagamento
-                    })
-
-                    break
-
-        elif '2.2.2' in despesa['ID_CONTA_CATEGORIA']:  # COPASA
-            for pagamento in pagamentos['COPASA']:
-                if (
-                    abs(float(pagamento['valor']) - valor) < 0.01 
-                    and datas_compativeis(despesa['DT_VENCIMENTO_PDES'], pagamento['dataEntrada'])
-                ):
-                    data_pagamento = pagamento['dataEntrada']
-                    print(f"  🔄 Conciliando e liquidando despesa COPASA ID {despesa['ID_DESPESA_DES']}")
-                    liquidar_despesa(despesa, data_pagamento)
-
-                    liquidadas.append({
-                        'nome': 'COPASA',
-                        'id_despesa': despesa['ID_DESPESA_DES'],
-                        'valor': valor,
-                        'data_pagamento': data_pagamento
-                    })
-
-                    break
+        concessionaria = concessionaria_da_despesa(despesa['ID_CONTA_CATEGORIA'])
+        if concessionaria is None:
+            continue
+        try:
+            vencimento = converter_data(despesa['DT_VENCIMENTO_PDES'])
+        except (TypeError, ValueError):
+            print(f"  ⚠️  Despesa ID {despesa['ID_DESPESA_DES']} com vencimento inválido ignorada: {despesa['DT_VENCIMENTO_PDES']}")
+            continue
+        chaves_despesas.append((concessionaria, para_centavos(despesa['VL_VALOR_PDES']), vencimento))
+        lista_despesas.append(despesa)
+
+    pares = []
+    escolhidos = parear_despesas(chaves_despesas, chaves_pagamentos)
+    for despesa, (concessionaria, centavos, _), escolhido in zip(lista_despesas, chaves_despesas, escolhidos):
+        if escolhido is None:
+            continue
+        pares.append({
+            'despesa': despesa,
+            'nome': concessionaria,
+            'valor': centavos / 100,
+            'data_pagamento': lista_pagamentos[escolhido]['dataEntrada'],
+        })
         
+    return pares
+
+def _liquidar_par(nome_condominio, par):
+    despesa = par['despesa']
+    registro = dict(
+        id_parcela=despesa['ID_PARCELA_PDES'], condominio=nome_condominio, id_despesa=despesa['ID_DESPESA_DES'],
+        data_pagamento=par['data_pagamento'], valor_centavos=round(par['valor'] * 100),
+    )
+    # Registra antes de enviar: se o processo cair no meio, a parcela não é reenviada às cegas
+    armazenamento.registrar_liquidacao(status=armazenamento.LIQUIDACAO_ENVIANDO, **registro)
+    print(f"  🔄 Liquidando despesa {par['nome']} ID {despesa['ID_DESPESA_DES']} ({nome_condominio})")
+    try:
+        # Nova tentativa só acontece em requisitar(), quando a Superlógica certamente não recebeu o PUT
+        status, mensagem = liquidar_despesa(despesa, par['data_pagamento'])
+    except (requests.exceptions.ConnectTimeout, requests.exceptions.HTTPError) as e:
+        # A requisição não chegou ou foi respondida com erro: nada foi liquidado
+        armazenamento.registrar_liquidacao(status=armazenamento.LIQUIDACAO_RECUSADA, mensagem=str(e), **registro)
+        print(f"  ❌ Erro ao liquidar despesa ID {despesa['ID_DESPESA_DES']}: {e}")
+        return False
+    except requests.exceptions.RequestException as e:
+        # Sem resposta: a parcela fica como 'enviando' e não é reenviada automaticamente
+        print(f"  ⚠️  Liquidação da despesa ID {despesa['ID_DESPESA_DES']} sem resposta, confira na Superlógica: {e}")
+        return False
+
+    liquidada = str(status) == '200'
+    armazenamento.registrar_liquidacao(
+        status=armazenamento.LIQUIDACAO_LIQUIDADA if liquidada else armazenamento.LIQUIDACAO_RECUSADA,
+        mensagem=mensagem, **registro,
+    )
+    return liquidada
+
+def liquidar_em_lote(pares_por_condominio, max_workers=None):
+    """
+    Envia as liquidações de todos os condomínios num pool limitado de threads.
+    Cada parcela (ID_PARCELA_PDES) passa pelo diário de liquidações: as já liquidadas ou com envio
+    sem resposta em execuções anteriores são puladas sem chamar a API.
+
+    Returns:
+        dict: {nome_condominio: [despesas liquidadas]}
+    """
+    ja_registradas = armazenamento.liquidacoes_registradas(
+        par['despesa']['ID_PARCELA_PDES'] for pares in pares_por_condominio.values() for par in pares
+    )
+    envios = []
+    for nome_condominio, pares in pares_por_condominio.items():
+        for par in pares:
+            if str(par['despesa']['ID_PARCELA_PDES']) in ja_registradas:
+                print(f"  ⏭️  Parcela {par['despesa']['ID_PARCELA_PDES']} ({nome_condominio}) já está no diário, pulando")
+            else:
+                envios.append((nome_condominio, par))
+
+    def enviar(nome_condominio, par):
+        with metricas.condominio(nome_condominio), metricas.etapa('liquidacao'):
+            return _liquidar_par(nome_condominio, par)
+
+    with ThreadPoolExecutor(max_workers=max_workers_configurado(max_workers)) as executor:
+        futuros = [executor.submit(metricas.propagar(enviar), *envio) for envio in envios]
+        sucessos = [futuro.result() for futuro in futuros]
+
+    liquidadas = {nome_condominio: [] for nome_condominio in pares_por_condominio}
+    for (nome_condominio, par), sucesso in zip(envios, sucessos):
+        if sucesso:
+            liquidadas[nome_condominio].append({
+                'nome': par['nome'],
+                'id_despesa': par['despesa']['ID_DESPESA_DES'],
+                'valor': par['valor'],
+                'data_pagamento': par['data_pagamento'],
+            })
     return liquidadas
 
-def processar_condominio(nome_condominio, resultado_liquidacao):
-    pasta_condominio = os.path.join(BASE_PATH, nome_condominio)
-    caminho_env = os.path.join(pasta_condominio, '.env')
-    
-
-    if not os.path.exists(caminho_env):
-        print(f"⚠️  .env não encontrado para {nome_condominio}, pulando.")
-        return
-    
-    config = dotenv_values(caminho_env)
-    
-    idCondominio = config.get('idCondominio')
-
-    if not idCondominio:
-        print(f"❌ idCondominio faltando em {nome_condominio}")
-        return
-    
-    client_id = config.get('ClientID')
-    client_secret = config.get('ClientSecret')
-
-    # Caminhos absolutos para os certificados devem estar DENTRO da pasta do condomínio
-    inter_cert_path = os.path.join(pasta_condominio, 'Inter API_Certificado.crt')
-    inter_key_path = os.path.join(pasta_condominio, 'Inter API_Chave.key')
+def reconciliar_envios(nome_condominio, despesas_pendentes, desde):
+    """
+    Resolve as parcelas do condomínio que ficaram como 'enviando' (PUT sem resposta) conferindo a
+    situação real delas nas despesas pendentes recém-buscadas da Superlógica: a parcela que continua
+    pendente não foi liquidada e pode ser enviada de novo; a que saiu das pendentes foi liquidada.
+    Só entram as registradas desde `desde` (início do mês): a busca de pendentes cobre só o mês atual.
+    """
+    pendentes = {str(despesa['ID_PARCELA_PDES']) for despesa in despesas_pendentes}
+    for envio in armazenamento.liquidacoes_enviando(nome_condominio, desde):
+        registro = {chave: envio[chave] for chave in ('id_parcela', 'condominio', 'id_despesa', 'data_pagamento', 'valor_centavos')}
+        if envio['id_parcela'] in pendentes:
+            armazenamento.registrar_liquidacao(
+                status=armazenamento.LIQUIDACAO_RECUSADA,
+                mensagem='Envio sem resposta; a parcela continua pendente na Superlógica', **registro,
+            )
+            print(f"  🔁 Parcela {envio['id_parcela']} ({nome_condominio}) continua pendente na Superlógica, será enviada de novo")
+        else:
+            armazenamento.registrar_liquidacao(
+                status=armazenamento.LIQUIDACAO_LIQUIDADA,
+                mensagem='Envio sem resposta; a parcela saiu das pendentes na Superlógica', **registro,
+            )
+            print(f"  ✔️  Parcela {envio['id_parcela']} ({nome_condominio}) já está liquidada na Superlógica")
 
-    if not all([client_id, client_secret, os.path.exists(inter_cert_path), os.path.exists(inter_key_path)]):
-        print(f"  ❌ Credenciais ou certificados do Banco Inter ausentes ou inválidos para {nome_condominio}. Verifique o .env e os arquivos de certificado/chave.")
-        return
+def processar_condominio(condominio, pares_liquidacao):
+    # .env, credenciais, certificados e idCondominio já foram validados pelo registro de condomínios
+    nome_condominio = condominio.nome
     
     # 1. Buscar todas as despesas pendentes na Superlógica (em um período maior)
     print(f"  Buscando despesas pendentes na Superlógica para {nome_condominio}...")
-    todas_despesas_superlogica = get_despesas_pendentes_superlogica(idCondominio)
+    with metricas.etapa('despesas'):
+        todas_despesas_superlogica = get_despesas_pendentes_superlogica(condominio.id_condominio)
+    if todas_despesas_superlogica is not None:
+        _, data_inicio, _ = periodo_do_mes()
+        reconciliar_envios(nome_condominio, todas_despesas_superlogica, data_inicio.strftime('%Y-%m-%d'))
     if not todas_despesas_superlogica:
         print(f"  Nenhuma despesa pendente encontrada na Superlógica para {nome_condominio}. Nenhuma conciliação necessária.")
         return
     else:
         #print(todas_despesas_superlogica)
         print(f"  Buscando extrato do Banco Inter para {nome_condominio}...")
-        extrato_banco_raw = get_extrato_inter(pasta_condominio, client_id, client_secret)
+        extrato_banco_raw = get_extrato_inter(condominio)
 
         if not extrato_banco_raw:
             print(f"  Não foi possível obter o extrato para {nome_condominio}. Continuando...")
             return
     
         print(f"  Localizando pagamentos de concessionárias no extrato...")
-        pagamentos_concessionarias_extrato = localizar_pagamentos_concessionarias(extrato_banco_raw)
-        resultado = conciliar_e_liquidar(todas_despesas_superlogica, pagamentos_concessionarias_extrato)
-        resultado_liquidacao[nome_condominio] = resultado
-        print(f"🔍 Resultado da liquidação para {nome_condominio}: {resultado}")
+        with metricas.etapa('pareamento'):
+            pagamentos_concessionarias_extrato = localizar_pagamentos_concessionarias(extrato_banco_raw)
+            pares = conciliar_despesas(todas_despesas_superlogica, pagamentos_concessionarias_extrato)
+        pares_liquidacao[nome_condominio] = pares
+        print(f"🔍 {len(pares)} despesa(s) a liquidar em {nome_condominio}")
         
 
 def liquidar_despesa(dados_liquid, data_pagamento):
@@ -263,8 +299,6 @@ def liquidar_despesa(dados_liquid, data_pagamento):
 
     headers = {
         'Content-Type': 'application/x-www-form-urlencoded',
-        'app_token': os.getenv('APP_TOKEN'),
-        'access_token': os.getenv('ACCESS_TOKEN')
     }   
 
     payload = {
@@ -288,7 +322,7 @@ def liquidar_despesa(dados_liquid, data_pagamento):
         # 'ARQUIVOS[]': dados_liquid.get('ARQUIVOS_IDS', [])
     }
   
-    response = requests.put(url, headers=headers, data=payload)
+    response = requisitar('PUT', url, sessao=sessao_superlogica(), headers=headers, data=payload)
     response.raise_for_status()
     
      # Acesse o conteúdo JSON da resposta
@@ -300,36 +334,69 @@ def liquidar_despesa(dados_liquid, data_pagamento):
         status = primeiro_item.get('status')
         mensagem = primeiro_item.get('msg')
         print(f"Liquidação: Status: {status} - Mensagem: {mensagem}")
+        return status, mensagem
     else:
         print(f"Liquidação: Resposta inesperada da API: {response.text}")
-
-def main():
-    resultado_liquidacao = {}
-    for nome_condominio in os.listdir(BASE_PATH):
-        caminho_completo = os.path.join(BASE_PATH, nome_condominio)
-        if os.path.isdir(caminho_completo):
-            try:
-                print(f"\n⏳ Processando {nome_condominio}...")
-                processar_condominio(nome_condominio, resultado_liquidacao)
-                print(f"✅ {nome_condominio} concluído com sucesso")
-            except Exception as e:
-                print(f"❌ Erro ao processar {nome_condominio}: {str(e)}")
-                with open("log_erros.txt", "a") as log:
-                    log.write(f"[{datetime.now()}] {nome_condominio}: {str(e)}\n")
-            time.sleep(2) # Adiciona um atraso de 1 segundo entre cada condomínio
-    
+        return None, response.text
+
+@metricas.execucao('liquidacao_despesas')
+def main(manter_conexoes=False):
+    condominios = {condominio.nome: condominio for condominio in listar_condominios(BASE_PATH, exigir_id_condominio=True)}
+    with distribuicao.rodada('liquidacao_despesas', condominios) as rodada:
+        while True:
+            # Os condomínios reivindicados ficam com este worker até as liquidações deles serem enviadas
+            pares_liquidacao, erros = {}, {}
+            for nome_condominio in iter(rodada.proximo, None):
+                erros[nome_condominio] = None
+                try:
+                    print(f"\n⏳ Processando {nome_condominio}...")
+                    with metricas.condominio(nome_condominio), perfil.condominio(nome_condominio):
+                        processar_condominio(condominios[nome_condominio], pares_liquidacao)
+                    print(f"✅ {nome_condominio} concluído com sucesso")
+                except Exception as e:
+                    erros[nome_condominio] = e
+                    print(f"❌ Erro ao processar {nome_condominio}: {str(e)}")
+                    with open("log_erros.txt", "a") as log:
+                        log.write(f"[{datetime.now()}] {nome_condominio}: {str(e)}\n")
+
+            # Só depois de parear todos os condomínios as liquidações são enviadas
+            liquidadas = liquidar_em_lote(pares_liquidacao)
+            # O resultado de cada condomínio fica na rodada: quem fechá-la manda o relatório de todos os workers
+            for nome_condominio, erro in erros.items():
+                rodada.concluir(nome_condominio, erro, liquidadas.get(nome_condominio))
+            # Sem nenhuma lease na mão, espera os outros workers; se algum cair, assume os condomínios dele
+            if not rodada.aguardar():
+                break
+        resultado_liquidacao = rodada.resultados() if rodada.fechou else None
+    # No agendador as conexões ficam abertas para a próxima execução
+    if not manter_conexoes:
+        fechar_sessoes()
+
+    if resultado_liquidacao is None:
+        print("📬 O relatório sai pelo worker que fechar a rodada.")
+        return
     liquidados = {
         nome: resultado for nome, resultado in resultado_liquidacao.items()
         if resultado is not None and len(resultado) > 0
     }
-    if liquidados:
-        corpo_email = "Condomínios com liquidações realizadas:\n\n"
+    # Envios sem resposta que a conferência com a Superlógica não resolveu (ex: de meses anteriores)
+    sem_resposta = armazenamento.liquidacoes_enviando()
+    if liquidados or sem_resposta:
+        corpo_email = "Condomínios com liquidações realizadas:\n\n" if liquidados else ""
 
         for nome, despesas in liquidados.items():
             corpo_email += f"🏢 {nome}:\n"
             for d in despesas:
                 corpo_email += f"   ✅ {d['nome']}: R${d['valor']:.2f} em {d['data_pagamento']} (ID {d['id_despesa']})\n"
             corpo_email += "\n"
+        if sem_resposta:
+            corpo_email += ("⚠️ Liquidações sem resposta da Superlógica (não são reenviadas; depois de conferir, "
+                            "libere com liquidacao_despesas.py --limpar-enviando ID_PARCELA):\n\n")
+            for envio in sem_resposta:
+                valor = (envio['valor_centavos'] or 0) / 100
+                corpo_email += (f"   ⏳ {envio['condominio']}: parcela {envio['id_parcela']} (despesa {envio['id_despesa']}), "
+                                f"R${valor:.2f} em {envio['data_pagamento']}, enviada em {envio['registrado_em']}\n")
+            corpo_email += "\n"
         enviar_email_resumo("✅ Relatório de Liquidações Realizadas", corpo_email, "Relatório de Liquidações Automáticas Diárias")
 
     else:
@@ -337,4 +404,17 @@ def main():
     
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--profile", action="store_true", help="Grava perfil de CPU (.prof) e de memória da execução e de cada condomínio")
+    parser.add_argument("--limpar-enviando", nargs="*", metavar="ID_PARCELA",
+                        help="Tira do diário as parcelas com envio sem resposta (todas, ou só as informadas) para que sejam enviadas de novo e sai")
+    args = parser.parse_args()
+
+    if args.limpar_enviando is not None:
+        removidas = armazenamento.limpar_liquidacoes_enviando(args.limpar_enviando)
+        print(f"🧹 {removidas} parcela(s) 'enviando' removida(s) do diário")
+    elif args.profile:
+        with perfil.perfilar('liquidacao_despesas'):
+            main()
+    else:
+        main()
\ No newline at end of file
@@ -0,0 +1,186 @@
+"""
+Medição de tempo por etapa e por chamada externa, com resumo de cada execução dos scripts.
+
+Cada execução (execucao('conciliacao')) junta os spans registrados dentro dela, em qualquer thread
+que herdou o contexto (ver propagar). Um span tem nome, duração e, quando houver, condomínio, status
+HTTP e tamanho da resposta. Ao terminar, a execução:
+
+- acrescenta uma linha JSON por span em METRICAS_JSONL (padrão: .cache/metricas.jsonl);
+- grava o resumo em formato Prometheus (coletor textfile do node_exporter) em
+  METRICAS_PROMETHEUS_DIR/api_inter_<script>.prom (padrão: .cache), com p50/p95 por etapa e endpoint.
+"""
+import contextvars
+import json
+import math
+import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import datetime
+from arquivos import caminho_cache
+
+ARQUIVO_JSONL = 'metricas.jsonl'
+QUANTIS = (0.5, 0.95)
+
+_execucao = contextvars.ContextVar('execucao', default=None)
+_condominio = contextvars.ContextVar('condominio', default=None)
+_lock_jsonl = threading.Lock()
+
+
+class _Execucao:
+    def __init__(self, script):
+        self.script = script
+        self.id = uuid.uuid4().hex[:12]
+        self.inicio = time.time()
+        self.spans = []
+        self.lock = threading.Lock()
+
+
+def registrar_span(nome, duracao, status=None, tamanho=None, **atributos):
+    """Registra um span pronto na execução atual (sem execução em andamento, não faz nada)"""
+    execucao = _execucao.get()
+    if execucao is None:
+        return
+    span = {'nome': nome, 'duracao': round(duracao, 6), 'condominio': _condominio.get()}
+    if status is not None:
+        span['status'] = status
+    if tamanho is not None:
+        span['bytes'] = tamanho
+    span.update(atributos)
+    with execucao.lock:
+        execucao.spans.append(span)
+
+
+@contextmanager
+def etapa(nome, **atributos):
+    """Mede o bloco como um span; se ele falhar, o status do span é o nome da exceção"""
+    inicio = time.perf_counter()
+    status = None
+    try:
+        yield
+    except BaseException as e:
+        status = type(e).__name__
+        raise
+    finally:
+        registrar_span(nome, time.perf_counter() - inicio, status=status, **atributos)
+
+
+@contextmanager
+def condominio(nome):
+    """Os spans registrados dentro do bloco ficam associados ao condomínio"""
+    token = _condominio.set(nome)
+    try:
+        yield
+    finally:
+        _condominio.reset(token)
+
+
+def propagar(funcao):
+    """
+    Versão de `funcao` que roda no contexto atual (execução e condomínio), para entregar a um
+    ThreadPoolExecutor: as threads do pool não herdam o contexto de quem submeteu a tarefa.
+    """
+    contexto = contextvars.copy_context()
+    return lambda *args, **kwargs: contexto.run(funcao, *args, **kwargs)
+
+
+def _quantil(valores_ordenados, quantil):
+    # Nearest-rank: sempre um valor observado
+    return valores_ordenados[max(0, math.ceil(quantil * len(valores_ordenados)) - 1)]
+
+
+def _escapar(valor):
+    return str(valor).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _rotulos(**rotulos):
+    return '{' + ','.join(f'{chave}="{_escapar(valor)}"' for chave, valor in rotulos.items()) + '}'
+
+
+def _texto_prometheus(execucao, fim):
+    grupos_etapas, grupos_http, requisicoes, bytes_http = {}, {}, {}, {}
+    for span in execucao.spans:
+        if span['nome'] == 'http':
+            grupos_http.setdefault((span['metodo'], span['endpoint']), []).append(span['duracao'])
+            chave_status = (span['metodo'], span['endpoint'], span.get('status', ''))
+            requisicoes[chave_status] = requisicoes.get(chave_status, 0) + 1
+            chave_bytes = (span['metodo'], span['endpoint'])
+            bytes_http[chave_bytes] = bytes_http.get(chave_bytes, 0) + (span.get('bytes') or 0)
+        else:
+            grupos_etapas.setdefault(span['nome'], []).append(span['duracao'])
+
+    script = execucao.script
+    linhas = [
+        '# HELP api_inter_execucao_segundos Duração da última execução do script',
+        '# TYPE api_inter_execucao_segundos gauge',
+        f'api_inter_execucao_segundos{_rotulos(script=script)} {fim - execucao.inicio:.6f}',
+        '# HELP api_inter_execucao_timestamp_segundos Fim da última execução do script (epoch)',
+        '# TYPE api_inter_execucao_timestamp_segundos gauge',
+        f'api_inter_execucao_timestamp_segundos{_rotulos(script=script)} {fim:.3f}',
+    ]
+
+    def resumo(metrica, descricao, grupos, rotulos_do_grupo):
+        linhas.append(f'# HELP {metrica} {descricao}')
+        linhas.append(f'# TYPE {metrica} summary')
+        for grupo, duracoes in sorted(grupos.items()):
+            rotulos = rotulos_do_grupo(grupo)
+            duracoes.sort()
+            for quantil in QUANTIS:
+                linhas.append(f'{metrica}{_rotulos(**rotulos, quantile=quantil)} {_quantil(duracoes, quantil):.6f}')
+            linhas.append(f'{metrica}_sum{_rotulos(**rotulos)} {sum(duracoes):.6f}')
+            linhas.append(f'{metrica}_count{_rotulos(**rotulos)} {len(duracoes)}')
+
+    resumo('api_inter_etapa_segundos', 'Duração das etapas na última execução', grupos_etapas,
+           lambda nome: {'script': script, 'etapa': nome})
+    resumo('api_inter_http_segundos', 'Duração das requisições na última execução', grupos_http,
+           lambda grupo: {'script': script, 'metodo': grupo[0], 'endpoint': grupo[1]})
+
+    linhas.append('# HELP api_inter_http_requisicoes Requisições por endpoint e status na última execução')
+    linhas.append('# TYPE api_inter_http_requisicoes gauge')
+    for (metodo, endpoint, status), quantidade in sorted(requisicoes.items()):
+        linhas.append(f'api_inter_http_requisicoes'
+                      f'{_rotulos(script=script, metodo=metodo, endpoint=endpoint, status=status)} {quantidade}')
+    linhas.append('# HELP api_inter_http_bytes Bytes recebidos por endpoint na última execução')
+    linhas.append('# TYPE api_inter_http_bytes gauge')
+    for (metodo, endpoint), quantidade in sorted(bytes_http.items()):
+        linhas.append(f'api_inter_http_bytes{_rotulos(script=script, metodo=metodo, endpoint=endpoint)} {quantidade}')
+    return '\n'.join(linhas) + '\n'
+
+
+def _exportar(execucao):
+    fim = time.time()
+    caminho_jsonl = os.getenv('METRICAS_JSONL') or caminho_cache(ARQUIVO_JSONL)
+    base = {'execucao': execucao.id, 'script': execucao.script,
+            'inicio': datetime.fromtimestamp(execucao.inicio).isoformat(timespec='seconds')}
+    with _lock_jsonl, open(caminho_jsonl, 'a', encoding='utf-8') as arquivo:
+        for span in execucao.spans:
+            arquivo.write(json.dumps({**base, **span}, ensure_ascii=False) + '\n')
+
+    # O coletor textfile lê o diretório a qualquer momento: grava num temporário e troca de uma vez
+    pasta = os.getenv('METRICAS_PROMETHEUS_DIR')
+    if pasta:
+        os.makedirs(pasta, exist_ok=True)
+        caminho_prom = os.path.join(pasta, f'api_inter_{execucao.script}.prom')
+    else:
+        caminho_prom = caminho_cache(f'api_inter_{execucao.script}.prom')
+    temporario = f'{caminho_prom}.{os.getpid()}.tmp'
+    with open(temporario, 'w', encoding='utf-8') as arquivo:
+        arquivo.write(_texto_prometheus(execucao, fim))
+    os.replace(temporario, caminho_prom)
+
+
+@contextmanager
+def execucao(script):
+    """Agrupa os spans de uma execução do script e exporta o resumo no final (mesmo se ela falhar)"""
+    atual = _Execucao(script)
+    token = _execucao.set(atual)
+    try:
+        with etapa('execucao'):
+            yield atual
+    finally:
+        _execucao.reset(token)
+        try:
+            _exportar(atual)
+        except OSError as e:
+            print(f"⚠️  Não foi possível gravar as métricas de {script}: {e}")
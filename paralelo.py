@@ -0,0 +1,65 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+import metricas
+import perfil
+
+MAX_WORKERS_PADRAO = 4
+
+_lock_log = threading.Lock()
+
+
+def max_workers_configurado(valor=None):
+    """Retorna o número de condomínios processados ao mesmo tempo (argumento > MAX_WORKERS > padrão)"""
+    if valor is None:
+        valor = os.getenv('MAX_WORKERS', MAX_WORKERS_PADRAO)
+    return max(1, int(valor))
+
+
+def registrar_erro(nome_condominio, erro):
+    """Acrescenta o erro do condomínio em log_erros.txt (seguro entre threads)"""
+    with _lock_log:
+        with open("log_erros.txt", "a") as log:
+            log.write(f"[{datetime.now()}] {nome_condominio}: {str(erro)}\n")
+
+
+def _executar(nome_condominio, funcao):
+    with metricas.condominio(nome_condominio), perfil.condominio(nome_condominio):
+        try:
+            print(f"\n⏳ Processando {nome_condominio}...")
+            funcao(nome_condominio)
+            print(f"✅ {nome_condominio} concluído com sucesso")
+        except Exception as e:
+            print(f"❌ Erro ao processar {nome_condominio}: {str(e)}")
+            registrar_erro(nome_condominio, e)
+            return e
+    return None
+
+
+def _consumir_rodada(rodada, funcao, erros):
+    # Cada thread só reivindica o próximo condomínio quando fica livre: os outros workers pegam o resto
+    for nome_condominio in iter(rodada.proximo, None):
+        erros[nome_condominio] = _executar(nome_condominio, funcao)
+
+
+def processar_em_paralelo(rodada, funcao, max_workers=None):
+    """
+    Executa funcao(nome_condominio) num pool limitado de threads para os condomínios que conseguir
+    reivindicar agora na `rodada` (distribuicao.rodada), sem concluí-los: quem chama conclui com o
+    resultado. Erros de um condomínio são registrados em log_erros.txt e não interrompem os demais.
+
+    Returns:
+        dict: {nome_condominio: exceção ou None}
+    """
+    max_workers = max_workers_configurado(max_workers)
+    erros = {}
+    if max_workers == 1:
+        _consumir_rodada(rodada, funcao, erros)
+        return erros
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futuros = [executor.submit(metricas.propagar(_consumir_rodada), rodada, funcao, erros)
+                   for _ in range(max_workers)]
+        for futuro in futuros:
+            futuro.result()
+    return erros
@@ -0,0 +1,60 @@
+from datetime import datetime, timedelta
+from functools import lru_cache
+
+TOLERANCIA_DIAS = 5  # O pagamento pode sair do vencimento até vencimento + 5 dias
+FORMATOS_DATA = ("%Y-%m-%d", "%m/%d/%Y %H:%M:%S", "%m/%d/%Y")
+
+
+@lru_cache(maxsize=4096)
+def converter_data(data_str):
+    """Converte as datas da Superlógica/Inter (AAAA-MM-DD, MM/DD/AAAA [HH:MM:SS]) em date; cada texto é convertido uma vez"""
+    for formato in FORMATOS_DATA:
+        try:
+            return datetime.strptime(data_str, formato).date()
+        except ValueError:
+            continue
+    raise ValueError(f"Formato de data inválido: {data_str}")
+
+
+def parear_despesas(despesas, pagamentos, tolerancia_dias=TOLERANCIA_DIAS):
+    """
+    Associa cada despesa a no máximo um pagamento, e cada pagamento a no máximo uma despesa.
+
+    Os pagamentos são indexados por (grupo, centavos) em listas ordenadas por data. As despesas são
+    atendidas em ordem de vencimento, o que maximiza o número de pares (todas as janelas têm o mesmo
+    tamanho), e por isso cada lista só é percorrida para a frente: um ponteiro por lista pula os
+    pagamentos anteriores ao vencimento (nenhuma despesa seguinte vence antes) e o primeiro dentro
+    da janela é escolhido e deixado para trás. Custo O(n log n + m log m), das ordenações.
+
+    Args:
+        despesas (list): (grupo, centavos, vencimento) de cada despesa
+        pagamentos (list): (grupo, centavos, data) de cada pagamento
+
+    Returns:
+        list: índice do pagamento escolhido para cada despesa, ou None
+    """
+    indice = {}
+    for posicao, (grupo, centavos, data) in enumerate(pagamentos):
+        indice.setdefault((grupo, centavos), []).append((data, posicao))
+    for candidatos in indice.values():
+        candidatos.sort()
+    proximo = dict.fromkeys(indice, 0)  # Primeiro pagamento ainda livre de cada lista
+
+    tolerancia = timedelta(days=tolerancia_dias)
+    escolhidos = [None] * len(despesas)
+    ordem = sorted(range(len(despesas)), key=lambda i: despesas[i][2])
+    for i in ordem:
+        grupo, centavos, vencimento = despesas[i]
+        chave = (grupo, centavos)
+        candidatos = indice.get(chave)
+        if candidatos is None:
+            continue
+        posicao = proximo[chave]
+        while posicao < len(candidatos) and candidatos[posicao][0] < vencimento:
+            posicao += 1
+        if posicao < len(candidatos) and candidatos[posicao][0] <= vencimento + tolerancia:
+            # Pagamento usado fica para trás do ponteiro: um débito nunca liquida duas despesas
+            escolhidos[i] = candidatos[posicao][1]
+            posicao += 1
+        proximo[chave] = posicao
+    return escolhidos
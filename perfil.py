@@ -0,0 +1,207 @@
+"""
+Modo de perfil (--profile) dos três scripts: cProfile da execução inteira e de cada condomínio,
+mais os maiores alocadores de memória (tracemalloc).
+
+Com o perfil ligado os condomínios são processados um de cada vez, para cada .prof conter só o
+trabalho do seu condomínio; threads criadas durante o condomínio (páginas do extrato, PDF, saldo)
+entram no perfil dele. Grava em PERFIL_DIR (padrão: .cache/perfis)/<script>-<data-hora>/:
+
+- execucao.prof e <condomínio>.prof (abrir com `python -m pstats` ou snakeviz);
+- memoria.tracemalloc (tracemalloc.Snapshot.load);
+- resumo.txt com as funções mais caras e os maiores alocadores.
+
+Desligado, condominio() devolve um contexto vazio e nada mais é feito.
+"""
+import cProfile
+import io
+import os
+import pstats
+import re
+import sys
+import threading
+import tracemalloc
+from contextlib import contextmanager, nullcontext
+from datetime import datetime
+from arquivos import caminho_cache
+
+FRAMES_TRACEMALLOC = 10
+# Alocações do próprio perfil (profilers, pstats, snapshots) não entram nas listas de memória
+_FILTRO_MEMORIA = [tracemalloc.Filter(False, modulo.__file__) for modulo in (tracemalloc, cProfile, pstats)] + [
+    tracemalloc.Filter(False, __file__),
+]
+LINHAS_RESUMO = 25
+LINHAS_RESUMO_CONDOMINIO = 10
+
+_ativo = None  # _Perfil em andamento, ou None
+_NADA = nullcontext()
+
+
+class _Estatisticas:
+    """Entrega ao pstats as estatísticas de um profiler de outra thread sem desligá-lo"""
+
+    def __init__(self, profiler):
+        profiler.snapshot_stats()
+        self.stats = profiler.stats
+
+    def create_stats(self):
+        pass
+
+
+class _Segmento:
+    """Profilers de um trecho da execução: o da thread principal e os das threads criadas nele"""
+
+    def __init__(self, nome):
+        self.nome = nome
+        self.profilers = []
+        self.memoria_inicial = _snapshot()
+
+    def estatisticas(self):
+        estatisticas = pstats.Stats()
+        for profiler in self.profilers:
+            coletadas = _Estatisticas(profiler)
+            if coletadas.stats:  # O pstats recusa perfis vazios (thread que não chegou a rodar nada)
+                estatisticas.add(coletadas)
+        return estatisticas
+
+
+class _Perfil:
+    def __init__(self, script):
+        pasta_base = os.getenv('PERFIL_DIR') or caminho_cache('perfis')
+        self.pasta = os.path.join(pasta_base, f"{script}-{datetime.now():%Y%m%d-%H%M%S}")
+        os.makedirs(self.pasta, exist_ok=True)
+        self.script = script
+        self.lock = threading.Lock()
+        self.execucao = _Segmento('execucao')
+        self.atual = self.execucao
+        self.condominios = []  # (nome, estatísticas, maiores alocações do condomínio)
+        self.profiler = None  # Profiler da thread principal no segmento atual
+
+    def _iniciar_thread(self, *_):
+        # Chamado no primeiro evento de cada thread nova: cada thread tem o seu profiler (até o
+        # Python 3.11 o cProfile só mede a thread que o ligou; no 3.12+ ele já mede todas)
+        sys.setprofile(None)
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:
+            return  # Profiler global já ativo (Python 3.12+)
+        with self.lock:
+            self.atual.profilers.append(profiler)
+
+    def pausar(self):
+        self.profiler.disable()
+
+    def trocar_segmento(self, segmento):
+        """Liga o profiler da thread principal no novo segmento (o anterior já deve estar pausado)"""
+        profiler = cProfile.Profile()
+        with self.lock:
+            self.atual = segmento
+            segmento.profilers.append(profiler)
+        self.profiler = profiler
+        profiler.enable()
+
+
+def _snapshot():
+    return tracemalloc.take_snapshot().filter_traces(_FILTRO_MEMORIA)
+
+
+def _nome_arquivo(nome):
+    return re.sub(r'[^\w.-]+', '_', nome).strip('_') or 'condominio'
+
+
+def _texto_estatisticas(estatisticas, ordem, linhas):
+    saida = io.StringIO()
+    estatisticas.stream = saida
+    estatisticas.sort_stats(ordem).print_stats(linhas)
+    return saida.getvalue()
+
+
+def _texto_alocacoes(estatisticas, linhas, diferenca=False):
+    texto = ''
+    for estatistica in estatisticas[:linhas]:
+        tamanho = estatistica.size_diff if diferenca else estatistica.size
+        blocos = estatistica.count_diff if diferenca else estatistica.count
+        texto += f"  {tamanho / 1024:+10.1f} KiB  {blocos:+8d} blocos  {estatistica.traceback[0]}\n" if diferenca \
+            else f"  {tamanho / 1024:10.1f} KiB  {blocos:8d} blocos  {estatistica.traceback[0]}\n"
+    return texto
+
+
+@contextmanager
+def perfilar(script):
+    """Perfila o bloco (a execução do script); no fim grava os .prof e o resumo"""
+    global _ativo
+    if _ativo is not None:
+        yield  # Já está perfilando (ex: um script chamando outro)
+        return
+    tracemalloc.start(FRAMES_TRACEMALLOC)
+    perfil = _Perfil(script)
+    _ativo = perfil
+    threading.setprofile(perfil._iniciar_thread)
+    perfil.trocar_segmento(perfil.execucao)
+    print("🔬 Perfil ativo: condomínios processados um de cada vez")
+    try:
+        yield
+    finally:
+        perfil.pausar()
+        threading.setprofile(None)
+        _ativo = None
+        memoria = _snapshot()
+        _, pico = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        _gravar(perfil, memoria, pico)
+
+
+@contextmanager
+def _perfilar_condominio(perfil, nome):
+    # O trabalho do próprio perfil (snapshots, pstats) roda com o profiler pausado
+    perfil.pausar()
+    segmento = _Segmento(nome)
+    perfil.trocar_segmento(segmento)
+    try:
+        yield
+    finally:
+        perfil.pausar()
+        with perfil.lock:
+            perfil.atual = perfil.execucao
+        alocacoes = _snapshot().compare_to(segmento.memoria_inicial, 'lineno')
+        estatisticas = segmento.estatisticas()
+        estatisticas.dump_stats(os.path.join(perfil.pasta, f"{_nome_arquivo(nome)}.prof"))
+        perfil.condominios.append((nome, estatisticas, alocacoes))
+        perfil.trocar_segmento(perfil.execucao)
+
+
+def condominio(nome):
+    """Perfil separado do condomínio enquanto o bloco roda (sem perfil ativo, não faz nada)"""
+    perfil = _ativo
+    if perfil is None:
+        return _NADA
+    return _perfilar_condominio(perfil, nome)
+
+
+def _gravar(perfil, memoria, pico):
+    # A execução inteira: o que rodou fora dos condomínios mais cada condomínio
+    total = perfil.execucao.estatisticas()
+    for _, estatisticas, _ in perfil.condominios:
+        total.add(estatisticas)
+    total.dump_stats(os.path.join(perfil.pasta, 'execucao.prof'))
+    memoria.dump(os.path.join(perfil.pasta, 'memoria.tracemalloc'))
+
+    mais_caras = _texto_estatisticas(total, 'cumulative', LINHAS_RESUMO)
+    partes = [
+        f"Perfil de {perfil.script} ({len(perfil.condominios)} condomínio(s))\n\n",
+        f"== Execução inteira: tempo acumulado ==\n{mais_caras}\n",
+        f"== Execução inteira: tempo próprio ==\n{_texto_estatisticas(total, 'tottime', LINHAS_RESUMO)}\n",
+        f"== Maiores alocadores no fim da execução (pico {pico / 1024 / 1024:.1f} MiB) ==\n",
+        _texto_alocacoes(memoria.statistics('lineno'), LINHAS_RESUMO) + "\n",
+    ]
+    for nome, estatisticas, alocacoes in perfil.condominios:
+        partes.append(f"== {nome} ==\n")
+        partes.append(_texto_estatisticas(estatisticas, 'cumulative', LINHAS_RESUMO_CONDOMINIO))
+        partes.append("Memória que o condomínio deixou alocada (por linha):\n")
+        partes.append(_texto_alocacoes(alocacoes, LINHAS_RESUMO_CONDOMINIO, diferenca=True) + "\n")
+    with open(os.path.join(perfil.pasta, 'resumo.txt'), 'w', encoding='utf-8') as arquivo:
+        arquivo.write(''.join(partes))
+
+    print(f"\n🔬 Funções mais caras de {perfil.script}:")
+    print(_texto_estatisticas(total, 'cumulative', 10))
+    print(f"🔬 Perfil gravado em {perfil.pasta}")
@@ -0,0 +1,120 @@
+import json
+import os
+import re
+
+ARQUIVO_REGRAS = os.getenv('REGRAS_CONCESSIONARIAS', 'concessionarias.json')
+
+# Usadas quando não existe concessionarias.json na pasta dos scripts
+REGRAS_PADRAO = [
+    {'nome': 'CEMIG', 'palavras': ['CEMIG'], 'contas': ['2.2.1']},  # Conta categoria de luz
+    {'nome': 'COPASA', 'palavras': ['COPASA'], 'contas': ['2.2.2']},  # Conta categoria de água
+]
+
+_regras = None
+
+
+def validar_regras(regras):
+    """Confere o formato [{'nome', 'palavras', 'contas'}, ...] e devolve as palavras em maiúsculas"""
+    if not isinstance(regras, list) or not regras:
+        raise ValueError(f"As regras de concessionárias devem ser uma lista não vazia: {regras!r}")
+    validadas = []
+    nomes = set()
+    for regra in regras:
+        if not isinstance(regra, dict):
+            raise ValueError(f"Regra de concessionária deve ser um objeto com nome, palavras e contas: {regra!r}")
+        nome, palavras, contas = regra.get('nome'), regra.get('palavras'), regra.get('contas')
+        if not nome or not palavras or not contas:
+            raise ValueError(f"Regra de concessionária incompleta (precisa de nome, palavras e contas): {regra}")
+        # Uma string solta no lugar da lista viraria uma palavra-chave por letra
+        for campo, valores in (('palavras', palavras), ('contas', contas)):
+            if not isinstance(valores, list) or not all(isinstance(v, str) and v for v in valores):
+                raise ValueError(f"'{campo}' da regra {nome} deve ser uma lista de textos não vazios: {valores!r}")
+        if nome in nomes:
+            raise ValueError(f"Regra de concessionária repetida: {nome}")
+        nomes.add(nome)
+        validadas.append({
+            'nome': nome,
+            'palavras': [palavra.upper() for palavra in palavras],
+            'contas': list(contas),
+        })
+    return validadas
+
+
+def compilar_regras(regras):
+    """
+    Junta as palavras-chave de todas as regras numa única regex, com um grupo nomeado por regra.
+    Cada texto é percorrido uma vez só, qualquer que seja o número de regras.
+    """
+    partes = []
+    for i, regra in enumerate(regras):
+        # Palavras mais longas primeiro, para a alternância não parar num prefixo
+        palavras = sorted(regra['palavras'], key=len, reverse=True)
+        partes.append(f"(?P<r{i}>{'|'.join(map(re.escape, palavras))})")
+    return re.compile("|".join(partes))
+
+
+def ler_arquivo_regras(caminho):
+    """
+    Regras do arquivo JSON, ou REGRAS_PADRAO só se o arquivo não existir.
+    Arquivo com JSON inválido ou regras mal formadas dá ValueError: liquidar com as regras padrão
+    no lugar das configuradas passaria despercebido.
+    """
+    try:
+        with open(caminho, "r", encoding="utf-8") as f:
+            regras = json.load(f)
+    except FileNotFoundError:
+        return validar_regras(REGRAS_PADRAO)
+    except json.JSONDecodeError as e:
+        raise ValueError(f"Arquivo de regras de concessionárias {caminho} com JSON inválido: {e}") from e
+    try:
+        return validar_regras(regras)
+    except ValueError as e:
+        raise ValueError(f"Arquivo de regras de concessionárias {caminho}: {e}") from e
+
+
+def carregar_regras(caminho=None):
+    """Lê as regras de concessionarias.json (ou REGRAS_CONCESSIONARIAS); sem o arquivo valem as REGRAS_PADRAO"""
+    global _regras
+    if caminho is None and _regras is not None:
+        return _regras
+    regras = ler_arquivo_regras(caminho or ARQUIVO_REGRAS)
+    compiladas = (regras, compilar_regras(regras))
+    if caminho is None:
+        _regras = compiladas
+    return compiladas
+
+
+def contas_das_regras():
+    """Todas as contas categoria das regras, na ordem em que aparecem (filtro das despesas pendentes)"""
+    regras, _ = carregar_regras()
+    return list(dict.fromkeys(conta for regra in regras for conta in regra['contas']))
+
+
+def concessionaria_da_despesa(contas_despesa):
+    """Nome da primeira regra cuja conta categoria aparece nas apropriações da despesa (ou None)"""
+    regras, _ = carregar_regras()
+    for regra in regras:
+        if any(conta in contas_despesa for conta in regra['contas']):
+            return regra['nome']
+    return None
+
+
+def classificar_transacoes(transacoes):
+    """
+    Separa os débitos do extrato por concessionária numa única passada.
+
+    Returns:
+        dict: {nome da concessionária: [transações]}, com uma chave para cada regra
+    """
+    regras, padrao = carregar_regras()
+    nomes = [regra['nome'] for regra in regras]
+    encontrados = {nome: [] for nome in nomes}
+    for transacao in transacoes:
+        # Verifica se é uma transação de débito (saída de dinheiro)
+        if transacao.get('tipoOperacao') != 'D':
+            continue
+        texto = f"{transacao.get('descricao', '')}\n{transacao.get('titulo', '')}".upper()
+        # Um débito pode citar mais de uma concessionária; entra na lista de cada uma, uma vez
+        for indice in {int(achado.lastgroup[1:]) for achado in padrao.finditer(texto)}:
+            encontrados[nomes[indice]].append(transacao)
+    return encontrados
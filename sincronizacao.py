@@ -0,0 +1,71 @@
+import os
+import time
+from datetime import datetime, timedelta
+import armazenamento
+
+JANELA_SOBREPOSICAO_DIAS = 3  # Dias re-baixados antes do cursor para pegar lançamentos retroativos
+EXTRATO_CACHE_MINUTOS_PADRAO = 20  # Validade de um download que inclui o mês em andamento
+
+
+def _ultimo_dia_do_mes(data):
+    proximo_mes = (data.replace(day=28) + timedelta(days=4)).replace(day=1)
+    return proximo_mes - timedelta(days=1)
+
+
+def extrato_em_cache(condominio, data_inicio, data_fim, agora=None):
+    """
+    True se o armazenamento local já tem o extrato completo do período com dados frescos:
+    - mês fechado (baixado depois do último dia do mês): não expira nunca;
+    - mês em andamento: vale por EXTRATO_CACHE_MINUTOS (padrão 20) desde o download.
+    """
+    agora = time.time() if agora is None else agora
+    validade = float(os.getenv('EXTRATO_CACHE_MINUTOS', EXTRATO_CACHE_MINUTOS_PADRAO)) * 60
+    fim_do_mes = _ultimo_dia_do_mes(datetime.strptime(data_fim, "%Y-%m-%d").date())
+    for baixado_em in armazenamento.downloads_cobrindo(condominio, data_inicio, data_fim):
+        if datetime.fromtimestamp(baixado_em).date() > fim_do_mes or agora - baixado_em < validade:
+            return True
+    return False
+
+
+def inicio_da_janela(cursor, data_inicio, sobreposicao_dias=JANELA_SOBREPOSICAO_DIAS):
+    """Primeiro dia a re-baixar: cursor menos a sobreposição, nunca antes do início do mês"""
+    if not cursor:
+        return data_inicio
+    inicio = (datetime.strptime(cursor, "%Y-%m-%d") - timedelta(days=sobreposicao_dias)).strftime("%Y-%m-%d")
+    return max(inicio, data_inicio)
+
+
+def sincronizar_extrato(condominio, baixar_extrato, data_inicio, data_fim, completo=False):
+    """
+    Sincroniza o extrato do mês de forma incremental com o armazenamento local.
+
+    Dentro da janela re-baixada o banco é a fonte da verdade (estornos e edições substituem o que
+    estava salvo); fora dela vale o que já estava no armazenamento.
+
+    Args:
+        condominio (str): Nome do condomínio (pasta em CONDOMÍNIOS)
+        baixar_extrato (callable): baixar_extrato(inicio, fim) -> iterável com as transações do banco
+        data_inicio (str): Primeiro dia do mês (YYYY-MM-DD)
+        data_fim (str): Último dia a sincronizar (YYYY-MM-DD)
+        completo (bool): Ignora o cursor e o cache e baixa o mês inteiro
+
+    Returns:
+        list: Todas as transações do mês até data_fim, lidas do armazenamento local atualizado
+    """
+    mes = data_inicio[:7]  # YYYY-MM
+    cursor = None if completo else armazenamento.ler_cursor(condominio, mes)
+    inicio_janela = inicio_da_janela(cursor, data_inicio)
+
+    # Outro script (ou esta mesma execução) acabou de baixar essa janela: usa o armazenamento local
+    if not completo and extrato_em_cache(condominio, inicio_janela, data_fim):
+        transacoes = armazenamento.transacoes_do_periodo(condominio, data_inicio, data_fim)
+        print(f"📦 Extrato de {inicio_janela} a {data_fim} em cache: {len(transacoes)} no mês")
+        return transacoes
+
+    # A janela é pequena (poucos dias): baixa todas as páginas antes de abrir a escrita no banco
+    transacoes_novas = list(baixar_extrato(inicio_janela, data_fim))
+    armazenamento.sincronizar(condominio, mes, transacoes_novas, inicio_janela, data_fim)
+
+    transacoes = armazenamento.transacoes_do_periodo(condominio, data_inicio, data_fim)
+    print(f"🔁 Sincronizado de {inicio_janela} a {data_fim}: {len(transacoes_novas)} baixada(s), {len(transacoes)} no mês")
+    return transacoes
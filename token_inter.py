@@ -0,0 +1,112 @@
+import threading
+import time
+from arquivos import caminho_cache, trava_arquivo, ler_json, gravar_json_atomico
+from http_cliente import requisitar, sessao_inter
+
+URL_TOKEN = "https://cdpj.partners.bancointer.com.br/oauth/v2/token"
+ARQUIVO_TOKENS = 'tokens_inter.json'
+MARGEM_RENOVACAO = 300  # Renova o token 5 minutos antes de expirar
+
+_tokens = {}
+_locks_chave = {}
+_lock_global = threading.Lock()
+
+
+def _chave(client_id, scope):
+    return f'{client_id}|{scope}'
+
+
+def _valido(entrada):
+    return bool(entrada) and entrada.get('expira_em', 0) - MARGEM_RENOVACAO > time.time()
+
+
+def _lock_da_chave(chave):
+    with _lock_global:
+        return _locks_chave.setdefault(chave, threading.Lock())
+
+
+def _buscar_token(client_id, client_secret, cert, scope):
+    request_body = f'client_id={client_id}&client_secret={client_secret}&scope={scope}&grant_type=client_credentials'
+
+    response = requisitar('POST', URL_TOKEN,
+        sessao=sessao_inter(cert),
+        headers={"Content-Type": "application/x-www-form-urlencoded"},
+        data=request_body)
+
+    response.raise_for_status()
+
+    dados = response.json()
+    return {
+        'access_token': dados.get("access_token"),
+        'expira_em': time.time() + int(dados.get("expires_in", 3600)),
+    }
+
+
+def obter_token(client_id, client_secret, cert, scope='extrato.read'):
+    """
+    Retorna um token OAuth do Banco Inter para (ClientID, scope).
+    Usa o cache em memória e em disco, pedindo um novo token só quando o atual está perto de expirar.
+    """
+    chave = _chave(client_id, scope)
+    entrada = _tokens.get(chave)
+    if _valido(entrada):
+        return entrada['access_token']
+
+    with _lock_da_chave(chave):
+        entrada = _tokens.get(chave)
+        if _valido(entrada):
+            return entrada['access_token']
+
+        caminho = caminho_cache(ARQUIVO_TOKENS)
+        with trava_arquivo(caminho):
+            entrada = ler_json(caminho, {}).get(chave)
+        if _valido(entrada):
+            _tokens[chave] = entrada
+            return entrada['access_token']
+
+        entrada = _buscar_token(client_id, client_secret, cert, scope)
+        _tokens[chave] = entrada
+
+        # Relê antes de gravar para não apagar tokens salvos por outro script nesse meio tempo
+        with trava_arquivo(caminho):
+            salvos = ler_json(caminho, {})
+            salvos = {k: v for k, v in salvos.items() if _valido(v)}
+            salvos[chave] = entrada
+            gravar_json_atomico(caminho, salvos)
+
+        return entrada['access_token']
+
+
+def invalidar_token(client_id, scope='extrato.read'):
+    """Descarta o token em cache (ex: depois de um 401), forçando um novo na próxima chamada"""
+    chave = _chave(client_id, scope)
+    _tokens.pop(chave, None)
+    caminho = caminho_cache(ARQUIVO_TOKENS)
+    with trava_arquivo(caminho):
+        salvos = ler_json(caminho, {})
+        if salvos.pop(chave, None) is not None:
+            gravar_json_atomico(caminho, salvos)
+
+
+class CabecalhosInter(dict):
+    """
+    Cabeçalhos das chamadas ao Banco Inter de um condomínio, com o token OAuth em Authorization.
+    requisitar() chama renovar_token() quando o Inter responde 401 (token revogado ou expirado antes
+    da hora) e repete a chamada uma vez; como o dicionário é o mesmo, as chamadas seguintes já saem
+    com o token novo.
+    """
+
+    def __init__(self, client_id, client_secret, cert, scope='extrato.read'):
+        super().__init__({"Content-Type": "Application/json"})
+        self._credenciais = (client_id, client_secret, cert, scope)
+        self._lock = threading.Lock()
+        self['Authorization'] = "Bearer " + obter_token(client_id, client_secret, cert, scope)
+
+    def renovar_token(self, recusado):
+        """Troca o token `recusado` ('Bearer ...') por um novo, uma vez só mesmo com várias threads recusadas"""
+        client_id, client_secret, cert, scope = self._credenciais
+        with self._lock:
+            if self['Authorization'] != recusado:
+                return  # Outra thread já renovou
+            invalidar_token(client_id, scope)
+            self['Authorization'] = "Bearer " + obter_token(client_id, client_secret, cert, scope)